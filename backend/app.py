@@ -1,13 +1,84 @@
+import csv
+import gzip
+import hashlib
+import io
+import mimetypes
 import os
+import re
 import secrets
+import sqlite3
+import sys
+import tempfile
+import threading
 import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, timezone
 from functools import wraps
 from pathlib import Path
-from uuid import uuid4
-from flask import Flask, request, jsonify, render_template, redirect, session, url_for
+import click
+from flask import Flask, g, has_request_context, request, jsonify, render_template, redirect, send_from_directory, session, stream_with_context, url_for
 import json
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.formparser import FormDataParser
 from werkzeug.utils import secure_filename
-from db import DB_PATH, get_conn, init_db
+
+try:
+    import brotli
+except ImportError:  # optional: only used for precompressed home page variants
+    brotli = None
+
+try:
+    import openpyxl
+except ImportError:  # optional: only used for XLSX exports
+    openpyxl = None
+
+from assets import DIST_DIRNAME, build_bundles, load_manifest, make_asset_tags
+from db import (
+    APPLICATION_STATS_DIMENSIONS,
+    DATA_DIR,
+    describe_database,
+    dialect,
+    get_conn,
+    get_pool,
+    init_db,
+    is_locked_error,
+    iter_rows,
+    duplicate_student_lrns,
+    merge_duplicate_students,
+    pool_stats,
+    rebuild_application_stats,
+    rebuild_search_index,
+    rebuild_typed_columns,
+    retry_on_locked,
+    set_query_observer,
+    set_slow_query_hook,
+    store_application_lists,
+)
+from enrollment import STUDENT_FIELD_INDEX, application_lists, normalize_enrollment, typed_application, typed_student
+from idempotency import (
+    ExpiredKeySweeper,
+    IdempotencyConflict,
+    claim as claim_idempotency_keys,
+    find as find_idempotency_key,
+    payload_fingerprint,
+    purge_expired as purge_expired_idempotency_keys,
+    remember as remember_idempotency_keys,
+    request_key as idempotency_request_key,
+)
+from images import ImagePipeline, load_variants, pipeline_available, record_variants
+from metrics import GaugeFunction, Registry, RequestMetrics
+from migrations import SchemaBehindError, current_version, latest_version, migrate
+from query_profiler import SlowQueryLog, summarize
+from rate_limit import RateLimiter, make_store
+from uploads import (
+    UPLOAD_URL_PREFIX,
+    UploadSpool,
+    dedupe_uploads,
+    sniff_image_extension,
+    sweep_orphan_uploads,
+)
+from write_queue import GroupCommitWriter
 
 
 def _load_env_file(path: Path) -> None:
@@ -32,6 +103,13 @@ app.config["SESSION_COOKIE_HTTPONLY"] = True
 app.config["SESSION_COOKIE_SAMESITE"] = "Lax"
 app.config["SESSION_COOKIE_SECURE"] = os.environ.get("SESSION_COOKIE_SECURE", "false").lower() == "true"
 app.config["PERMANENT_SESSION_LIFETIME"] = int(os.environ.get("ADMIN_SESSION_TIMEOUT_SECONDS", "3600"))
+app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("MAX_REQUEST_BYTES", str(64 * 1024 * 1024)))
+# Reverse proxies in front of the app. Only the X-Forwarded-For entries they
+# appended are trusted for the client address; with 0 the header is ignored,
+# since clients can send any value in it.
+TRUSTED_PROXY_COUNT = max(0, int(os.environ.get("TRUSTED_PROXY_COUNT", "0")))
+if TRUSTED_PROXY_COUNT:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT)
 
 _configured_admin_path = (os.environ.get("ADMIN_PATH") or "internal-portal").strip().strip("/")
 if _configured_admin_path.lower().endswith("/login"):
@@ -42,227 +120,119 @@ ADMIN_USERNAME = os.environ.get("ADMIN_USERNAME", "admin")
 ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "admin123")
 ADMIN_LOGIN_RATE_LIMIT_WINDOW_SECONDS = int(os.environ.get("ADMIN_LOGIN_RATE_LIMIT_WINDOW_SECONDS", "300"))
 ADMIN_LOGIN_RATE_LIMIT_MAX_ATTEMPTS = int(os.environ.get("ADMIN_LOGIN_RATE_LIMIT_MAX_ATTEMPTS", "5"))
-_admin_login_attempts = {}
-
-DEFAULT_SITE_CONTENT = {
-    "hero_slides": [
-        {
-            "category": "Arellano University Jose Rizal Campus",
-            "title": "Championing Academic Excellence Since 1938",
-            "description": "Join a community rooted in tradition, service, and student-centered learning for every Arellanista.",
-            "button_text": "",
-            "button_link": "",
-        },
-        {
-            "category": "University Updates",
-            "title": "Admissions Open for Senior High School",
-            "description": "We welcome incoming Grade 11 students and transferees with flexible learning options and student support.",
-            "button_text": "View Admission Requirements",
-            "button_link": "#requirements",
-        },
-        {
-            "category": "Tatak Arellano",
-            "title": "Affordable and Accessible Quality Education",
-            "description": "Experience AU's commitment to holistic development through values formation, leadership, and innovation.",
-            "button_text": "Learn More About AU",
-            "button_link": "#about-us",
-        },
-    ],
-    "highlights": [
-        {
-            "title": "Admissions & Enrollment",
-            "description": "Complete your application, submit requirements, and track your enrollment journey in one place.",
-            "link_text": "Requirements",
-            "link": "#requirements",
-        },
-        {
-            "title": "Academic Programs",
-            "description": "Explore tracks and strands designed to prepare learners for college, careers, and lifelong success.",
-            "link_text": "View Programs",
-            "link": "#programs",
-        },
-        {
-            "title": "Campus Community",
-            "description": "Stay connected with AU culture, student life, and opportunities that nurture leadership and service.",
-            "link_text": "Campus Updates",
-            "link": "https://www.facebook.com/aujoserizal",
-        },
-    ],
-    "enrollment_banner": {
-        "title": "ENROLLMENT ONGOING FOR SENIOR HIGH",
-        "subtitle": "2ND SEMESTER | S.Y. 2025-2026",
-        "bullets": [
-            "New students and transferees accepted.",
-            "No Tuition Fee / No Top-Up (For eligible voucher holders)",
-            "No Entrance Exam",
-            "No Minimum Grade Requirement",
-            "Flexible Learning Modality",
-        ],
-        "offer_title": "Easy Crediting of Subjects for",
-        "offer_emphasis": "Transferees",
-        "offer_subtitle": "No Tuition Fee Increase",
-    },
-    "requirements": {
-        "title": "Admission Requirements",
-        "intro": "Please prepare the following documents for Senior High School admission.",
-        "items": [
-            "PSA Birth Certificate",
-            "ESC Certificate (For Completers from Private Schools)",
-            "Certificate of Completion (For Completers from Public Schools)",
-            "2x2 picture",
-            "Form 138/Report Card",
-        ],
-    },
-    "programs": [
-        {"name": "STEM (Science, Technology, Engineering, and Mathematics)", "category": "Academic Track", "description": "The STEM strand is ideal for students who enjoy science and math. It builds a strong foundation for careers in engineering, medicine, and technology.", "image": "../static/assets/images/STEM.jpg"},
-        {"name": "HUMSS (Humanities and Social Sciences)", "category": "Academic Track", "description": "The HUMSS strand is for students interested in people, culture, and society. It prepares learners for careers in law, education, communication, and public service.", "image": "../static/assets/images/HUMSS.jpg"},
-        {"name": "GAS (General Academic Strand)", "category": "Academic Track", "description": "The GAS strand offers a balanced mix of subjects from different disciplines. It is best for students exploring their interests before choosing a specific college path.", "image": "../static/assets/images/GAS.jpg"},
-        {"name": "ABM (Accountancy, Business, and Management)", "category": "Academic Track", "description": "The ABM strand focuses on business, finance, and entrepreneurship. It prepares students for college programs and careers in management, marketing, and accounting.", "image": "../static/assets/images/ABM.jpg"},
-        {"name": "ICT (Information and Communications Technology)", "category": "Technical-Vocational-Livelihood (TVL)", "description": "The ICT strand develops skills in programming, web development, and networking. It prepares students for careers in IT, software development, and digital technology.", "image": "../static/assets/images/ICT.jpg"},
-        {"name": "HE (Home Economics)", "category": "Technical-Vocational-Livelihood (TVL)", "description": "The HE strand builds practical skills in hospitality, cookery, and home management. It supports career paths in culinary arts, tourism, fashion, and small business.", "image": "../static/assets/images/HE.jpg"},
-    ],
-    "announcements": [
-        {"title": "Enrollment for S.Y. 2025-2026", "description": "Application is now open for Senior High School with support for new students and transferees."},
-        {"title": "No Entrance Examination", "description": "Qualified learners may proceed directly with admission requirements and online application."},
-        {"title": "Flexible Learning Modality", "description": "AU supports learners through adaptable delivery and guidance to help students thrive."},
-    ],
-    "about": {
-        "title": "About Arellano University",
-        "paragraphs": [
-            "Arellano University was founded in 1938, and its Jose Rizal Campus in Malabon was established to provide accessible and quality education to students in the northern part of Metro Manila.",
-            "The campus is named after José Rizal, the national hero of the Philippines, in honor of his contributions to education and the nation.",
-            "Since its establishment, the campus has been committed to promoting academic excellence and offering opportunities for personal and intellectual growth.",
-        ],
-    },
-    "footer": {
-        "logo": "https://www.arellano.edu.ph/images/Arellano_University_New_Logo.png",
-        "address_lines": [
-            "ARELLANO UNIVERSITY",
-            "Gov. Pascual Avenue, Concepcion,",
-            "Malabon City, Metro Manila",
-            "8-579-3635 or 8-921-2744",
-        ],
-        "facebook": "https://www.facebook.com/aujoserizal",
-        "instagram": "https://www.instagram.com/tatakarellano",
-    },
-}
-
-
+ENROLL_RATE_LIMIT_WINDOW_SECONDS = int(os.environ.get("ENROLL_RATE_LIMIT_WINDOW_SECONDS", "60"))
+ENROLL_RATE_LIMIT_MAX_REQUESTS = int(os.environ.get("ENROLL_RATE_LIMIT_MAX_REQUESTS", "30"))
+# "sqlite" shares counters between all workers on this host; "memory" is per process.
+RATE_LIMIT_STORE = os.environ.get("RATE_LIMIT_STORE", "sqlite").strip().lower()
+RATE_LIMIT_MEMORY_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MEMORY_MAX_KEYS", "10000"))
+_rate_limit_store = make_store(
+    RATE_LIMIT_STORE,
+    DATA_DIR / "rate_limits.db",
+    max_keys=RATE_LIMIT_MEMORY_MAX_KEYS,
+    busy_timeout=float(os.environ.get("DB_BUSY_TIMEOUT_SECONDS", "5")),
+)
+_admin_login_limiter = RateLimiter(
+    _rate_limit_store, "login", ADMIN_LOGIN_RATE_LIMIT_MAX_ATTEMPTS, ADMIN_LOGIN_RATE_LIMIT_WINDOW_SECONDS
+)
+_enroll_limiter = RateLimiter(_rate_limit_store, "enroll", ENROLL_RATE_LIMIT_MAX_REQUESTS, ENROLL_RATE_LIMIT_WINDOW_SECONDS)
+# Bearer token for Prometheus scrapes of /metrics; logged-in admins need none.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "").strip()
+# Opt-in profiling: statements slower than this many ms are logged with their
+# parameters and query plan. Empty disables it; 0 logs every statement.
+DB_SLOW_QUERY_MS = os.environ.get("DB_SLOW_QUERY_MS", "").strip()
+DB_SLOW_QUERY_LOG = Path(os.environ.get("DB_SLOW_QUERY_LOG", "").strip() or DATA_DIR / "slow_queries.jsonl")
+# Apply pending schema migrations when a worker starts (development only).
+# Off by default: deploys run `flask migrate` once, and a worker that finds
+# the schema behind refuses to start.
+DB_AUTO_MIGRATE = os.environ.get("DB_AUTO_MIGRATE", "false").lower() == "true"
+SITE_CONTENT_CACHE_CHECK_SECONDS = float(os.environ.get("SITE_CONTENT_CACHE_CHECK_SECONDS", "1"))
+_site_content_cache = {"snapshot": None, "checked_at": 0.0}
+_site_content_cache_lock = threading.Lock()
 
 UPLOAD_DIR = Path(__file__).resolve().parent / "static" / "uploads" / "site-content"
 ALLOWED_UPLOAD_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".gif"}
-
-DEFAULT_SITE_CONTENT = {
-    "hero_slides": [
-        {
-            "category": "Arellano University Jose Rizal Campus",
-            "title": "Championing Academic Excellence Since 1938",
-            "description": "Join a community rooted in tradition, service, and student-centered learning for every Arellanista.",
-            "button_text": "",
-            "button_link": "",
-            "image": "../static/assets/images/banner-item-01.jpg",
-        },
-        {
-            "category": "University Updates",
-            "title": "Admissions Open for Senior High School",
-            "description": "We welcome incoming Grade 11 students and transferees with flexible learning options and student support.",
-            "button_text": "View Admission Requirements",
-            "button_link": "#requirements",
-            "image": "../static/assets/images/banner-item-02.jpg",
-        },
-        {
-            "category": "Tatak Arellano",
-            "title": "Affordable and Accessible Quality Education",
-            "description": "Experience AU's commitment to holistic development through values formation, leadership, and innovation.",
-            "button_text": "Learn More About AU",
-            "button_link": "#about-us",
-            "image": "../static/assets/images/banner-item-03.jpg",
-        },
-    ],
-    "highlights": [
-        {
-            "title": "Admissions & Enrollment",
-            "description": "Complete your application, submit requirements, and track your enrollment journey in one place.",
-            "link_text": "Requirements",
-            "link": "#requirements",
-        },
-        {
-            "title": "Academic Programs",
-            "description": "Explore tracks and strands designed to prepare learners for college, careers, and lifelong success.",
-            "link_text": "View Programs",
-            "link": "#programs",
-        },
-        {
-            "title": "Campus Community",
-            "description": "Stay connected with AU culture, student life, and opportunities that nurture leadership and service.",
-            "link_text": "Campus Updates",
-            "link": "https://www.facebook.com/aujoserizal",
-        },
-    ],
-    "enrollment_banner": {
-        "title": "ENROLLMENT ONGOING FOR SENIOR HIGH",
-        "subtitle": "2ND SEMESTER | S.Y. 2025-2026",
-        "bullets": [
-            "New students and transferees accepted.",
-            "No Tuition Fee / No Top-Up (For eligible voucher holders)",
-            "No Entrance Exam",
-            "No Minimum Grade Requirement",
-            "Flexible Learning Modality",
-        ],
-        "offer_title": "Easy Crediting of Subjects for",
-        "offer_emphasis": "Transferees",
-        "offer_subtitle": "No Tuition Fee Increase",
-    },
-    "requirements": {
-        "title": "Admission Requirements",
-        "intro": "Please prepare the following documents for Senior High School admission.",
-        "items": [
-            "PSA Birth Certificate",
-            "ESC Certificate (For Completers from Private Schools)",
-            "Certificate of Completion (For Completers from Public Schools)",
-            "2x2 picture",
-            "Form 138/Report Card",
-        ],
-    },
-    "programs": [
-        {"name": "STEM (Science, Technology, Engineering, and Mathematics)", "category": "Academic Track", "description": "The STEM strand is ideal for students who enjoy science and math. It builds a strong foundation for careers in engineering, medicine, and technology.", "image": "../static/assets/images/STEM.jpg"},
-        {"name": "HUMSS (Humanities and Social Sciences)", "category": "Academic Track", "description": "The HUMSS strand is for students interested in people, culture, and society. It prepares learners for careers in law, education, communication, and public service.", "image": "../static/assets/images/HUMSS.jpg"},
-        {"name": "GAS (General Academic Strand)", "category": "Academic Track", "description": "The GAS strand offers a balanced mix of subjects from different disciplines. It is best for students exploring their interests before choosing a specific college path.", "image": "../static/assets/images/GAS.jpg"},
-        {"name": "ABM (Accountancy, Business, and Management)", "category": "Academic Track", "description": "The ABM strand focuses on business, finance, and entrepreneurship. It prepares students for college programs and careers in management, marketing, and accounting.", "image": "../static/assets/images/ABM.jpg"},
-        {"name": "ICT (Information and Communications Technology)", "category": "Technical-Vocational-Livelihood (TVL)", "description": "The ICT strand develops skills in programming, web development, and networking. It prepares students for careers in IT, software development, and digital technology.", "image": "../static/assets/images/ICT.jpg"},
-        {"name": "HE (Home Economics)", "category": "Technical-Vocational-Livelihood (TVL)", "description": "The HE strand builds practical skills in hospitality, cookery, and home management. It supports career paths in culinary arts, tourism, fashion, and small business.", "image": "../static/assets/images/HE.jpg"},
-    ],
-    "announcements": [
-        {"title": "Enrollment for S.Y. 2025-2026", "description": "Application is now open for Senior High School with support for new students and transferees."},
-        {"title": "No Entrance Examination", "description": "Qualified learners may proceed directly with admission requirements and online application."},
-        {"title": "Flexible Learning Modality", "description": "AU supports learners through adaptable delivery and guidance to help students thrive."},
-    ],
-    "about": {
-        "title": "About Arellano University",
-        "paragraphs": [
-            "Arellano University was founded in 1938, and its Jose Rizal Campus in Malabon was established to provide accessible and quality education to students in the northern part of Metro Manila.",
-            "The campus is named after José Rizal, the national hero of the Philippines, in honor of his contributions to education and the nation.",
-            "Since its establishment, the campus has been committed to promoting academic excellence and offering opportunities for personal and intellectual growth.",
-        ],
-    },
-    "footer": {
-        "logo": "https://www.arellano.edu.ph/images/Arellano_University_New_Logo.png",
-        "address_lines": [
-            "ARELLANO UNIVERSITY",
-            "Gov. Pascual Avenue, Concepcion,",
-            "Malabon City, Metro Manila",
-            "8-579-3635 or 8-921-2744",
-        ],
-        "facebook": "https://www.facebook.com/aujoserizal",
-        "instagram": "https://www.instagram.com/tatakarellano",
-    },
+UPLOAD_ORPHAN_GRACE_SECONDS = int(os.environ.get("UPLOAD_ORPHAN_GRACE_SECONDS", "86400"))
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+# Room for multipart headers and text fields; also bounds Werkzeug's parse
+# buffer, which holds up to one 64 KB read plus any unconsumed tail.
+UPLOAD_FORM_OVERHEAD_BYTES = 512 * 1024
+
+STATIC_DIR = BASE_DIR / "static"
+BUNDLED_IMAGE_DIR = STATIC_DIR / "assets" / "images"
+IMAGE_VARIANT_DIR = STATIC_DIR / "variants"
+IMAGE_VARIANT_URL_PREFIX = "../static/variants/"
+IMAGE_VARIANT_WIDTHS = tuple(int(width) for width in os.environ.get("IMAGE_VARIANT_WIDTHS", "480,960,1600").split(",") if width.strip())
+IMAGE_VARIANT_QUALITY = int(os.environ.get("IMAGE_VARIANT_QUALITY", "78"))
+IMAGE_PIPELINE_WORKERS = int(os.environ.get("IMAGE_PIPELINE_WORKERS", "2"))
+STATIC_DIST_DIR = STATIC_DIR / DIST_DIRNAME
+STATIC_IMMUTABLE_MAX_AGE_SECONDS = 365 * 24 * 3600
+# Generated names that change with the content: "<name>.<sha256[:12]>.<ext>"
+# bundles and "<sha256[:16]>-<width>.<ext>" image variants. Anything else in
+# those directories (manifest.json) is revalidated on every use.
+HASHED_BUNDLE_NAME = re.compile(r"^[\w.-]+\.[0-9a-f]{12}\.\w+$")
+HASHED_VARIANT_NAME = re.compile(r"^[0-9a-f]{16}-\d+\.\w+$")
+
+APPLICATIONS_PAGE_SIZE = 50
+APPLICATIONS_MAX_PAGE_SIZE = 200
+
+BULK_IMPORT_CHUNK_SIZE = int(os.environ.get("BULK_IMPORT_CHUNK_SIZE", "500"))
+BULK_IMPORT_MAX_ROWS = int(os.environ.get("BULK_IMPORT_MAX_ROWS", "50000"))
+BULK_STATUS_MAX_ROWS = int(os.environ.get("BULK_STATUS_MAX_ROWS", "5000"))
+IMPORT_LIST_FIELDS = ("medicalConditions", "credentialsSubmitted")
+
+ENROLL_GROUP_COMMIT = os.environ.get("ENROLL_GROUP_COMMIT", "false").lower() == "true"
+ENROLL_GROUP_COMMIT_MAX_BATCH = int(os.environ.get("ENROLL_GROUP_COMMIT_MAX_BATCH", "64"))
+ENROLL_GROUP_COMMIT_MAX_DELAY_MS = float(os.environ.get("ENROLL_GROUP_COMMIT_MAX_DELAY_MS", "5"))
+ENROLL_WRITE_TIMEOUT_SECONDS = float(os.environ.get("ENROLL_WRITE_TIMEOUT_SECONDS", "10"))
+# Link applications to the existing student with the same LRN instead of
+# creating a new students row for every submission. Off by default: the form
+# is public, so a linked submission never rewrites the stored student; its
+# details are kept on the application until an admin applies them.
+ENROLL_RETURNING_STUDENTS = os.environ.get("ENROLL_RETURNING_STUDENTS", "false").lower() == "true"
+ENROLL_IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("ENROLL_IDEMPOTENCY_TTL_SECONDS", "86400"))
+ENROLL_IDEMPOTENCY_SWEEP_SECONDS = float(os.environ.get("ENROLL_IDEMPOTENCY_SWEEP_SECONDS", "300"))
+
+APPLICATION_DETAIL_COLUMNS_SQL = """
+        a.id, a.student_id, a.gradeLevel, a.strand, a.tvlSpec, a.generalAve, a.status, a.submitted_at,
+        a.jhsGraduated, a.dateGraduation,
+        a.medicalConditions, a.medicalOther, a.howSupported,
+        a.guardianName, a.guardianCivilStatus, a.guardianEmployment,
+        a.guardianOccupation, a.guardianRelationship, a.guardianTel, a.guardianContact,
+        a.credentialsSubmitted, a.firstTimeAU, a.enrolledYear, a.studentSignature,
+        s.lrn, s.fullName, s.email, s.contact, s.address, s.dob, s.pob, s.sex, s.nationality,
+        a.submitted_student
+"""
+APPLICATION_EXPORT_COLUMNS = tuple(
+    column.strip().split(".", 1)[1]
+    for column in APPLICATION_DETAIL_COLUMNS_SQL.split(",")
+    if column.strip() != "a.submitted_student"
+)
+APPLICATION_DETAILS_ETAG_PREFIX = hashlib.sha256(APPLICATION_DETAIL_COLUMNS_SQL.encode("utf-8")).hexdigest()[:8]
+EXPORT_FLUSH_ROWS = 500
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+APPLICATION_STATUSES = ("submitted", "under_review", "approved", "rejected")
+# _application_filters arguments besides status; any of them rules out the
+# application_stats shortcut in the count endpoint.
+APPLICATION_NON_STATUS_FILTERS = (
+    "strand", "q", "min_average", "max_average", "credential", "missing_credential", "medical_condition",
+)
+# Values per IN (...) list; well under SQLite's bound-parameter limit.
+SQL_IN_LIST_CHUNK_SIZE = 500
+
+APPLICANT_SEARCH_LIMIT = 20
+APPLICANT_SEARCH_MAX_TOKENS = 8
+APPLICATION_SORT_COLUMNS = {
+    "id": "a.id",
+    # Copies of the student's columns (migration 0003) so these sorts are
+    # index-backed too.
+    "fullName": "a.student_name",
+    "lrn": "a.student_lrn",
+    "strand": "a.strand",
+    "status": "a.status",
+    "submitted_at": "a.submitted_at",
 }
 
-
-
-UPLOAD_DIR = Path(__file__).resolve().parent / "static" / "uploads" / "site-content"
-ALLOWED_UPLOAD_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".gif"}
-
 DEFAULT_SITE_CONTENT = {
     "hero_slides": [
         {
@@ -382,23 +352,30 @@ def login_required(view):
     return wrapped_view
 
 
+_untrusted_forwarding_warned = False
+
+
 def _client_identifier() -> str:
-    forwarded_for = (request.headers.get("X-Forwarded-For") or "").split(",")[0].strip()
-    return forwarded_for or request.remote_addr or "unknown"
+    # ProxyFix has already resolved trusted forwarding headers into remote_addr.
+    global _untrusted_forwarding_warned
+    if not TRUSTED_PROXY_COUNT and not _untrusted_forwarding_warned and "X-Forwarded-For" in request.headers:
+        # Behind an unconfigured proxy every client shares the proxy's address,
+        # and so one rate-limit bucket.
+        _untrusted_forwarding_warned = True
+        app.logger.warning(
+            "X-Forwarded-For received but TRUSTED_PROXY_COUNT is 0; rate limits key on the peer address %s. "
+            "Set TRUSTED_PROXY_COUNT to the number of reverse proxies in front of the app.",
+            request.remote_addr,
+        )
+    return request.remote_addr or "unknown"
 
 
 def _is_rate_limited(login_identifier: str) -> bool:
-    now = time.time()
-    attempts = _admin_login_attempts.get(login_identifier, [])
-    attempts = [attempt_ts for attempt_ts in attempts if now - attempt_ts < ADMIN_LOGIN_RATE_LIMIT_WINDOW_SECONDS]
-    _admin_login_attempts[login_identifier] = attempts
-    return len(attempts) >= ADMIN_LOGIN_RATE_LIMIT_MAX_ATTEMPTS
+    return _admin_login_limiter.is_limited(login_identifier)
 
 
 def _record_failed_login(login_identifier: str) -> None:
-    now = time.time()
-    attempts = _admin_login_attempts.setdefault(login_identifier, [])
-    attempts.append(now)
+    _admin_login_limiter.hit(login_identifier)
 
 
 def _new_csrf_token() -> str:
@@ -414,11 +391,6 @@ def _validate_csrf_token(submitted_token: str) -> bool:
     return secrets.compare_digest(expected_token, submitted_token)
 
 
-init_db()
-
-
-
-
 def _merge_default_content(default_value, current_value):
     if isinstance(default_value, dict) and isinstance(current_value, dict):
         merged = dict(default_value)
@@ -441,38 +413,207 @@ def _merge_default_content(default_value, current_value):
     return current_value
 
 def _ensure_site_content_defaults():
+    # Runs after migrations, not on every boot: reads already fall back to
+    # DEFAULT_SITE_CONTENT for sections that have no row.
     with get_conn() as conn:
-        for key, value in DEFAULT_SITE_CONTENT.items():
-            conn.execute(
-                """
-                INSERT OR IGNORE INTO site_content (content_key, content_value)
-                VALUES (?, ?)
-                """,
-                (key, json.dumps(value)),
-            )
+        conn.executemany(
+            """
+            INSERT INTO site_content (content_key, content_value)
+            VALUES (?, ?)
+            ON CONFLICT(content_key) DO NOTHING
+            """,
+            [(key, json.dumps(value)) for key, value in DEFAULT_SITE_CONTENT.items()],
+        )
         conn.commit()
 
 
-def _get_site_content() -> dict:
+def _keep_stored_slide_backgrounds(conn, slides: list, stored: list) -> None:
+    # Saved slides without an image of their own are styled by their CSS
+    # class (.item-N). The default image merged into them only takes over
+    # once it has responsive variants, so the merge alone never changes how
+    # an existing site renders.
+    with_variants = None
+    for slide, stored_slide in zip(slides, stored):
+        if not isinstance(slide, dict) or not isinstance(stored_slide, dict) or "image" in stored_slide:
+            continue
+        if with_variants is None:
+            with_variants = set(load_variants(conn))
+        if slide.get("image") not in with_variants:
+            slide.pop("image", None)
+
+
+def _load_site_content(conn) -> dict:
     data = dict(DEFAULT_SITE_CONTENT)
-    with get_conn() as conn:
-        rows = conn.execute("SELECT content_key, content_value FROM site_content").fetchall()
+    rows = conn.execute("SELECT content_key, content_value FROM site_content").fetchall()
     for row in rows:
         try:
             parsed_value = json.loads(row["content_value"])
             data[row["content_key"]] = _merge_default_content(DEFAULT_SITE_CONTENT.get(row["content_key"]), parsed_value)
         except json.JSONDecodeError:
             data[row["content_key"]] = DEFAULT_SITE_CONTENT.get(row["content_key"])
+            continue
+        if row["content_key"] == "hero_slides" and isinstance(parsed_value, list):
+            _keep_stored_slide_backgrounds(conn, data["hero_slides"], parsed_value)
     return data
 
 
-_ensure_site_content_defaults()
-print(">>> USING DB:", DB_PATH)
+def _site_content_version(conn) -> int:
+    row = conn.execute("SELECT version FROM site_content_version WHERE id = 1").fetchone()
+    return row["version"] if row else 0
+
+
+def _utc_timestamp() -> str:
+    # Same text format as SQLite's CURRENT_TIMESTAMP, on every backend.
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _site_content_updated_at(conn) -> datetime:
+    row = conn.execute("SELECT MAX(updated_at) AS updated_at FROM site_content").fetchone()
+    try:
+        # Stored timestamps are UTC (CURRENT_TIMESTAMP / _utc_timestamp).
+        return datetime.strptime(row["updated_at"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return datetime.now(timezone.utc)
+
+
+def _site_content_snapshot() -> dict:
+    # Snapshots are shared between requests and must be treated as read-only;
+    # a content change always produces a new snapshot rather than mutating one.
+    cache = _site_content_cache
+    now = time.monotonic()
+    snapshot = cache["snapshot"]
+    if snapshot is not None and now - cache["checked_at"] < SITE_CONTENT_CACHE_CHECK_SECONDS:
+        return snapshot
+
+    with get_conn() as conn:
+        # Read the version before the rows: a concurrent write can then only
+        # make the cached copy look older than it is, never newer.
+        version = _site_content_version(conn)
+        if snapshot is not None and snapshot["version"] == version:
+            cache["checked_at"] = now
+            return snapshot
+        snapshot = {
+            "version": version,
+            "data": _load_site_content(conn),
+            "updated_at": _site_content_updated_at(conn),
+            "images": load_variants(conn),
+            "pages": {},
+        }
+
+    with _site_content_cache_lock:
+        cache["snapshot"] = snapshot
+        cache["checked_at"] = now
+    return snapshot
+
+
+def _get_site_content() -> dict:
+    return _site_content_snapshot()["data"]
+
+
+def _invalidate_site_content_cache() -> None:
+    with _site_content_cache_lock:
+        _site_content_cache["snapshot"] = None
+        _site_content_cache["checked_at"] = 0.0
+
+
+def _render_cached_page(snapshot: dict, template_name: str) -> dict:
+    page = snapshot["pages"].get(template_name)
+    if page is not None:
+        return page
+
+    body = render_template(template_name, content=snapshot["data"], images=snapshot["images"]).encode("utf-8")
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    variants = {"identity": (body, etag)}
+    variants["gzip"] = (gzip.compress(body, compresslevel=9, mtime=0), f"{etag}-gzip")
+    if brotli is not None:
+        variants["br"] = (brotli.compress(body), f"{etag}-br")
+    page = {"variants": variants, "last_modified": snapshot["updated_at"]}
+    # Two threads may render the same page concurrently; the output is identical.
+    snapshot["pages"][template_name] = page
+    return page
+
+
+def _serve_cached_page(template_name: str):
+    page = _render_cached_page(_site_content_snapshot(), template_name)
+    encoding = "identity"
+    for candidate in ("br", "gzip"):
+        if candidate in page["variants"] and request.accept_encodings[candidate]:
+            encoding = candidate
+            break
+    body, etag = page["variants"][encoding]
+
+    response = app.response_class(body, mimetype="text/html")
+    response.set_etag(etag)
+    response.last_modified = page["last_modified"]
+    response.cache_control.no_cache = True
+    response.vary.add("Accept-Encoding")
+    if encoding != "identity":
+        response.content_encoding = encoding
+    return response.make_conditional(request)
+
+
+def _serve_generated(directory: Path, filename: str, precompressed: bool, hashed_name: re.Pattern):
+    # Files whose names change with their content may be cached for a year
+    # without revalidating; the rest must be checked with the server each time.
+    immutable = hashed_name.match(filename) is not None
+    mimetype = mimetypes.guess_type(filename)[0]
+    encoding = "identity"
+    if precompressed:
+        for candidate, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if request.accept_encodings[candidate] and (directory / f"{filename}{suffix}").is_file():
+                encoding = candidate
+                filename = f"{filename}{suffix}"
+                break
+
+    response = send_from_directory(
+        directory, filename, mimetype=mimetype, max_age=STATIC_IMMUTABLE_MAX_AGE_SECONDS if immutable else 0
+    )
+    response.cache_control.public = True
+    if immutable:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    if precompressed:
+        response.vary.add("Accept-Encoding")
+    if encoding != "identity":
+        response.content_encoding = encoding
+    return response
+
+
+@app.get(f"/static/{DIST_DIRNAME}/<path:filename>")
+def static_bundle(filename: str):
+    return _serve_generated(STATIC_DIST_DIR, filename, precompressed=True, hashed_name=HASHED_BUNDLE_NAME)
+
+
+@app.get("/static/variants/<path:filename>")
+def static_image_variant(filename: str):
+    return _serve_generated(IMAGE_VARIANT_DIR, filename, precompressed=False, hashed_name=HASHED_VARIANT_NAME)
+
+
+# Read once at startup; rebuilding bundles requires a restart to pick them up.
+app.jinja_env.globals["asset_tags"] = make_asset_tags(load_manifest(STATIC_DIR))
+
+def _flask_command_running() -> bool:
+    # `flask migrate` and the other maintenance commands import this module
+    # too, so they must get past the schema check; `flask run` serves and
+    # must not.
+    return os.environ.get("FLASK_RUN_FROM_CLI") == "true" and "run" not in sys.argv[1:]
+
+
+try:
+    if init_db(auto_migrate=DB_AUTO_MIGRATE):
+        _ensure_site_content_defaults()
+except SchemaBehindError as e:
+    if not _flask_command_running():
+        raise SystemExit(f">>> ERROR: {e}")
+    print(f">>> WARNING: {e}")
+print(">>> USING DB:", describe_database())
 print(">>> ADMIN LOGIN URL PATH:", f"{ADMIN_PATH}/login")
+print(">>> CLIENT ADDRESS:", f"X-Forwarded-For, {TRUSTED_PROXY_COUNT} trusted proxies" if TRUSTED_PROXY_COUNT else "socket peer (TRUSTED_PROXY_COUNT=0)")
 
 @app.get("/")
 def home():
-    return render_template("index.html", content=_get_site_content())
+    return _serve_cached_page("index.html")
 
 @app.get("/enroll")
 def enroll_now():
@@ -509,6 +650,7 @@ def admin_login_submit():
     if username == ADMIN_USERNAME and password == ADMIN_PASSWORD:
         session.clear()
         session["admin_logged_in"] = True
+        session["admin_username"] = username
         session.permanent = True
         next_url = (request.form.get("next") or request.args.get("next") or url_for("admin_applications")).strip()
         if not next_url.startswith(ADMIN_PATH):
@@ -581,280 +723,1085 @@ def update_site_content(content_key: str):
         conn.execute(
             """
             INSERT INTO site_content (content_key, content_value, updated_at)
-            VALUES (?, ?, CURRENT_TIMESTAMP)
+            VALUES (?, ?, ?)
             ON CONFLICT(content_key) DO UPDATE SET
                 content_value = excluded.content_value,
-                updated_at = CURRENT_TIMESTAMP
+                updated_at = excluded.updated_at
             """,
-            (content_key, serialized),
+            (content_key, serialized, _utc_timestamp()),
         )
         conn.commit()
+    _invalidate_site_content_cache()
 
     return jsonify({"ok": True})
 
 
 
+def _upload_too_large():
+    limit_mb = UPLOAD_MAX_BYTES / (1024 * 1024)
+    return jsonify({"ok": False, "error": f"File is too large. The limit is {limit_mb:g} MB."}), 413
+
+
+def _record_image_variants(source: str, variants: list) -> None:
+    with get_conn() as conn:
+        record_variants(conn, source, variants, IMAGE_VARIANT_URL_PREFIX)
+    _invalidate_site_content_cache()
+
+
+_image_pipeline = ImagePipeline(
+    IMAGE_VARIANT_DIR,
+    widths=IMAGE_VARIANT_WIDTHS,
+    quality=IMAGE_VARIANT_QUALITY,
+    workers=IMAGE_PIPELINE_WORKERS,
+    on_done=_record_image_variants,
+)
+
+
 @app.post("/api/site-content/upload")
 @login_required
 def upload_site_content_asset():
-    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-
-    upload = request.files.get("file")
-    if not upload or not upload.filename:
-        return jsonify({"ok": False, "error": "No file uploaded."}), 400
+    max_request_bytes = UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD_BYTES
+    if request.content_length is not None and request.content_length > max_request_bytes:
+        return _upload_too_large()
+
+    # The form is parsed here rather than through request.files so that file
+    # parts stream into UploadSpool instead of Werkzeug's in-memory spool.
+    spools = []
+
+    def stream_factory(total_content_length, content_type, filename, content_length=None):
+        spool = UploadSpool(UPLOAD_DIR, UPLOAD_MAX_BYTES)
+        spools.append(spool)
+        return spool
+
+    parser = FormDataParser(
+        stream_factory,
+        max_form_memory_size=UPLOAD_FORM_OVERHEAD_BYTES,
+        max_content_length=max_request_bytes,
+        max_form_parts=8,
+    )
+    try:
+        _, _, files = parser.parse_from_environ(request.environ)
+        upload = files.get("file")
+        if not upload or not upload.filename:
+            return jsonify({"ok": False, "error": "No file uploaded."}), 400
+
+        original_name = secure_filename(upload.filename)
+        extension = sniff_image_extension(upload.stream.head)
+        if Path(original_name).suffix.lower() not in ALLOWED_UPLOAD_EXTENSIONS or extension is None:
+            return jsonify({"ok": False, "error": "Unsupported file type. Use png, jpg, jpeg, webp, or gif."}), 400
+
+        # Files are stored under the SHA-256 of their bytes, so re-uploading an
+        # image reuses the existing copy; the `scope` form field no longer matters.
+        file_name = upload.stream.commit(extension)
+    except RequestEntityTooLarge:
+        return _upload_too_large()
+    finally:
+        for spool in spools:
+            spool.discard()
+
+    file_url = f"{UPLOAD_URL_PREFIX}{file_name}"
+    # Variants are built in the background; the page switches to srcset once
+    # they are recorded, and serves the original until then.
+    _image_pipeline.submit(file_url, UPLOAD_DIR / file_name)
+    return jsonify({"ok": True, "url": file_url})
 
-    original_name = secure_filename(upload.filename)
-    extension = Path(original_name).suffix.lower()
-    if extension not in ALLOWED_UPLOAD_EXTENSIONS:
-        return jsonify({"ok": False, "error": "Unsupported file type. Use png, jpg, jpeg, webp, or gif."}), 400
 
-    asset_scope = (request.form.get("scope") or "asset").strip().lower()
-    prefix = "slide" if asset_scope == "slide" else "program" if asset_scope == "program" else "asset"
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(error):
+    if request.path.startswith("/api/"):
+        return jsonify({"ok": False, "error": "Request body is too large."}), 413
+    return error
 
-    file_name = f"{prefix}-{uuid4().hex}{extension}"
-    file_path = UPLOAD_DIR / file_name
-    upload.save(file_path)
 
-    file_url = f"../static/uploads/site-content/{file_name}"
-    return jsonify({"ok": True, "url": file_url})
 @app.get("/api/health")
 def health():
     return {"ok": True}
 
-@app.post("/api/enroll")
-def enroll():
-    data = request.get_json(force=True) or {}
 
-    def clean(v):
-        if v is None:
-            return ""
-        s = str(v).strip()
-        if s.lower() in {"", "none", "null", "undefined"}:
-            return ""
-        return s
-
-    def pick(*keys):
-        for key in keys:
-            v = clean(data.get(key))
-            if v:
-                return v
-        return ""
-
-    # Normalize payload aliases coming from different frontend versions
-    lrn = pick("lrn")
-    fullName = pick("fullName")
-    if not fullName:
-        fullName = " ".join(filter(None, [pick("surname"), pick("givenName"), pick("middleName")]))
-
-    gradeLevel = pick("gradeLevel", "yearLevel") or "N/A"
-    generalAve = pick("generalAve", "generalAverage")
-
-    track = pick("track")
-    strand = pick("strand")
-    if not strand and track == "Academic Track":
-        strand = pick("academicStrand")
-    elif not strand and track == "TVL Track":
-        strand = "TVL"
-
-    # Minimal required fields
-    required = {
-        "lrn": lrn,
-        "fullName": fullName,
-    }
-    missing = [k for k, v in required.items() if not v]
-    if missing:
-        return jsonify({"ok": False, "error": f"Missing: {', '.join(missing)}"}), 400
-
-    # --- Student core ---
-
-    email = pick("email", "gmail") or None
-    contact = pick("contact", "contactNo") or None
-    address = (data.get("address") or "").strip() or None
-
-    if contact and (not contact.isdigit() or len(contact) != 11):
-        return jsonify({"ok": False, "error": "Contact number must be exactly 11 digits."}), 400
-
-    # --- Extra student info (optional but in your form) ---
-    dob = (data.get("dob") or "").strip() or None
-    pob = (data.get("pob") or "").strip() or None
-    sex = (data.get("sex") or "").strip() or None
-    nationality = (data.get("nationality") or "").strip() or None
-
-    # --- School history ---
-    jhsGraduated = (data.get("jhsGraduated") or "").strip() or None
-    dateGraduation = (data.get("dateGraduation") or "").strip() or None
-
-    # --- Enrollment details ---
-    strand = strand or None
-
-    tvlSpec = (data.get("tvlSpec") or "").strip() or None
-    if strand == "TVL" and not tvlSpec:
-        return jsonify({"ok": False, "error": "TVL specialization is required"}), 400
-
-    generalAve = generalAve
-
-    # --- Medical ---
-    medicalConditions = data.get("medicalConditions") or []
-    if not isinstance(medicalConditions, list):
-        # if client accidentally sends a string
-        medicalConditions = [str(medicalConditions)]
-    medicalOther = (data.get("medicalOther") or "").strip() or None
-    howSupported = (data.get("howSupported") or "").strip() or None
-
-    # --- Guardian ---
-    guardianName = (data.get("guardianName") or "").strip() or None
-    guardianCivilStatus = pick("guardianCivilStatus", "civilStatus") or None
-    guardianEmployment = pick("guardianEmployment") or None
-    guardianOccupation = pick("guardianOccupation", "occupation") or None
-    guardianRelationship = pick("guardianRelationship", "relationship") or None
-    guardianTel = pick("guardianTel", "telNo") or None
-    guardianContact = pick("guardianContact", "cellphoneNo") or None
-
-    if guardianTel and (not guardianTel.isdigit()):
-        return jsonify({"ok": False, "error": "Telephone number must contain digits only."}), 400
-
-    if guardianContact and (not guardianContact.isdigit() or len(guardianContact) != 11):
-        return jsonify({"ok": False, "error": "Guardian cellphone number must be exactly 11 digits."}), 400
-
-    # --- Credentials + pledge ---
-    raw_credentials = data.get("credentialsSubmitted") or []
-    if isinstance(raw_credentials, list):
-        picked_credentials = [str(v).strip() for v in raw_credentials if str(v).strip()]
-    else:
-        picked_credentials = [str(raw_credentials).strip()] if str(raw_credentials).strip() else []
-    credentialsSubmitted = ", ".join(picked_credentials) if picked_credentials else None
-    firstTimeAU = (data.get("firstTimeAU") or "").strip() or None
-    enrolledYear = (data.get("enrolledYear") or "").strip() or None
-    studentSignature = (data.get("studentSignature") or "").strip() or None
+@app.get("/api/metrics/db-pool")
+@login_required
+def db_pool_metrics():
+    return jsonify({"ok": True, "item": pool_stats(), "group_commit": _enrollment_writer.stats()})
+
+
+_metrics_registry = Registry()
+_request_metrics = RequestMetrics(_metrics_registry)
+set_query_observer(_request_metrics.observe_db)
+_metrics_registry.register(
+    GaugeFunction(
+        "db_pool_connections",
+        "Database connections held by this worker's pool, by state.",
+        ("state",),
+        lambda: {(state,): value for state, value in pool_stats().items() if state in ("size", "open", "idle")},
+    )
+)
+_metrics_registry.register(
+    GaugeFunction(
+        "enroll_group_commit_queued",
+        "Enrollments waiting for the group-commit writer.",
+        (),
+        lambda: {(): _enrollment_writer.stats()["queued"]},
+    )
+)
+
+
+@app.before_request
+def _start_request_metrics():
+    g.request_started_at = time.perf_counter()
+    _request_metrics.start(request.endpoint)
+
+
+@app.after_request
+def _finish_request_metrics(response):
+    # Streamed bodies (exports) are still being sent at this point, so their
+    # latency is time to first byte.
+    started_at = g.get("request_started_at")
+    if started_at is not None:
+        _request_metrics.finish(request.method, response.status_code, time.perf_counter() - started_at)
+    return response
+
+
+def _slow_query_context() -> dict:
+    return {"endpoint": (request.endpoint or "unmatched") if has_request_context() else "background"}
+
+
+if DB_SLOW_QUERY_MS:
+    set_slow_query_hook(SlowQueryLog(DB_SLOW_QUERY_LOG, context=_slow_query_context), float(DB_SLOW_QUERY_MS) / 1000)
 
+
+def _metrics_authorized() -> bool:
+    if session.get("admin_logged_in"):
+        return True
+    scheme, _, token = (request.headers.get("Authorization") or "").partition(" ")
+    return bool(METRICS_TOKEN) and scheme.lower() == "bearer" and secrets.compare_digest(token.strip(), METRICS_TOKEN)
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    if not _metrics_authorized():
+        response = jsonify({"ok": False, "error": "Authentication required"})
+        response.headers["WWW-Authenticate"] = "Bearer"
+        return response, 401
+    return app.response_class(_metrics_registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/metrics/slow-queries")
+@login_required
+def slow_query_report():
+    top = request.args.get("top", 20, type=int)
+    top = max(1, min(top, 200))
+    return jsonify(
+        {
+            "ok": True,
+            "enabled": bool(DB_SLOW_QUERY_MS),
+            "threshold_ms": float(DB_SLOW_QUERY_MS) if DB_SLOW_QUERY_MS else None,
+            "items": summarize(DB_SLOW_QUERY_LOG, top=top),
+        }
+    )
+
+
+INSERT_STUDENT_SQL = """
+    INSERT INTO students (
+        lrn, fullName, email, contact, address,
+        dob, pob, sex, nationality, born_on
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_APPLICATION_SQL = """
+    INSERT INTO applications (
+        student_id, gradeLevel, strand, tvlSpec, generalAve, status,
+
+        jhsGraduated, dateGraduation,
+
+        medicalConditions, medicalOther, howSupported,
+
+        guardianName, guardianCivilStatus, guardianEmployment,
+        guardianOccupation, guardianRelationship, guardianTel, guardianContact,
+
+        credentialsSubmitted, firstTimeAU, enrolledYear, studentSignature,
+
+        general_average, graduated_on, student_name, student_lrn, submitted_student
+    )
+    VALUES (
+        ?, ?, ?, ?, ?, 'submitted',
+        ?, ?,
+        ?, ?, ?,
+        ?, ?, ?,
+        ?, ?, ?, ?,
+        ?, ?, ?, ?,
+        ?, ?, ?, ?, ?
+    )
+"""
+
+
+REFRESH_STUDENT_SQL = """
+    UPDATE students SET
+        fullName = ?, email = COALESCE(?, email), contact = COALESCE(?, contact),
+        address = COALESCE(?, address), dob = COALESCE(?, dob), pob = COALESCE(?, pob),
+        sex = COALESCE(?, sex), nationality = COALESCE(?, nationality),
+        born_on = CASE WHEN CAST(? AS TEXT) IS NULL THEN born_on ELSE ? END
+    WHERE id = ?
+"""
+
+
+def _chunks(items: list, size: int = SQL_IN_LIST_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _last_autoincrement_id(conn, table: str) -> int:
+    row = conn.execute(
+        f"SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = ?), 0), COALESCE((SELECT MAX(id) FROM {table}), 0))",
+        (table,),
+    ).fetchone()
+    return row[0]
+
+
+def _insert_rows(conn, table: str, sql: str, rows: list) -> list:
+    if not rows:
+        return []
+    if dialect() != "sqlite":
+        return [conn.execute(sql + " RETURNING id", row).fetchone()["id"] for row in rows]
+
+    # Callers hold the write lock (BEGIN IMMEDIATE), so AUTOINCREMENT hands out
+    # consecutive ids and executemany can be used.
+    first_id = _last_autoincrement_id(conn, table) + 1
+    conn.executemany(sql, rows)
+    if _last_autoincrement_id(conn, table) != first_id + len(rows) - 1:
+        raise sqlite3.DatabaseError(f"{table} ids were not allocated contiguously.")
+    return list(range(first_id, first_id + len(rows)))
+
+
+def _existing_students(conn, lrns: set) -> dict:
+    # {lrn: (id, fullName)} of the latest students row per LRN, found through
+    # idx_students_lrn.
+    if dialect() != "sqlite":
+        # Serializes concurrent first-time submissions of the same LRN, which
+        # the write lock already does on SQLite.
+        for lrn in sorted(lrns):
+            conn.execute("SELECT pg_advisory_xact_lock(hashtext(?))", (lrn,))
+    found = {}
+    for chunk in _chunks(sorted(lrns)):
+        rows = conn.execute(
+            f"""
+            SELECT id, lrn, fullName FROM students
+            WHERE id IN (SELECT MAX(id) FROM students WHERE lrn IN ({', '.join('?' * len(chunk))}) GROUP BY lrn)
+            """,
+            chunk,
+        ).fetchall()
+        found.update((row["lrn"], (row["id"], row["fullName"])) for row in rows)
+    return found
+
+
+def _submitted_student(student: tuple) -> str:
+    return json.dumps({name: student[index] for name, index in STUDENT_FIELD_INDEX.items()})
+
+
+def _insert_enrollments(conn, records: list) -> list:
+    students = [record["student"] for record in records]
+    known = _existing_students(conn, {student[0] for student in students}) if ENROLL_RETURNING_STUDENTS else {}
+
+    # Without returning students every record gets its own students row;
+    # with them only the first record for an LRN not seen before does.
+    creating = []
+    for index, student in enumerate(students):
+        if ENROLL_RETURNING_STUDENTS:
+            if student[0] in known:
+                continue
+            known[student[0]] = None
+        creating.append(index)
+
+    student_ids = [None] * len(records)
+    created = _insert_rows(conn, "students", INSERT_STUDENT_SQL, [(*students[i], *typed_student(students[i])) for i in creating])
+    for index, student_id in zip(creating, created):
+        student_ids[index] = student_id
+        if ENROLL_RETURNING_STUDENTS:
+            known[students[index][0]] = (student_id, students[index][STUDENT_FIELD_INDEX["fullName"]])
+
+    # Anyone can submit any LRN, so a returning student's stored details are
+    # never overwritten here: the application keeps what was submitted, and
+    # an admin applies it (apply_submitted_student) after checking it.
+    rows = []
+    for index, (student, application) in enumerate(zip(students, (record["application"] for record in records))):
+        if student_ids[index] is None:
+            student_ids[index], stored_name = known[student[0]]
+            sort_name, submitted = stored_name, _submitted_student(student)
+        else:
+            sort_name, submitted = student[STUDENT_FIELD_INDEX["fullName"]], None
+        rows.append((student_ids[index], *application, *typed_application(application), sort_name, student[0], submitted))
+
+    applications = [record["application"] for record in records]
+    application_ids = _insert_rows(conn, "applications", INSERT_APPLICATION_SQL, rows)
+    store_application_lists(
+        conn,
+        [(application_id, *application_lists(application)) for application_id, application in zip(application_ids, applications)],
+    )
+    return application_ids
+
+
+def _insert_idempotent_enrollments(conn, records: list) -> list:
+    # Records may carry "idempotency": (key, payload fingerprint). enroll()
+    # already answered live keys before queueing the write; this re-check under
+    # the write lock catches retries that raced each other here, including two
+    # copies of one submission landing in the same group-commit batch.
+    keyed = {record["idempotency"][0] for record in records if record.get("idempotency")}
+    if not keyed:
+        return _insert_enrollments(conn, records)
+
+    now = time.time()
+    claimed = claim_idempotency_keys(conn, keyed, now)
+    owners = {}
+    fresh = []
+    for index, record in enumerate(records):
+        if not record.get("idempotency"):
+            fresh.append(index)
+            continue
+        key, fingerprint = record["idempotency"]
+        if key in claimed:
+            original = claimed[key][0]
+        elif key in owners:
+            original = records[owners[key]]["idempotency"][1]
+        else:
+            owners[key] = index
+            fresh.append(index)
+            continue
+        if original != fingerprint:
+            raise IdempotencyConflict("Idempotency-Key was already used for a different submission.")
+
+    application_ids = [None] * len(records)
+    for index, application_id in zip(fresh, _insert_enrollments(conn, [records[i] for i in fresh])):
+        application_ids[index] = application_id
+    for index, record in enumerate(records):
+        if application_ids[index] is None:
+            key = record["idempotency"][0]
+            application_ids[index] = claimed[key][1] if key in claimed else application_ids[owners[key]]
+    remember_idempotency_keys(
+        conn,
+        [(key, records[index]["idempotency"][1], application_ids[index]) for key, index in owners.items()],
+        now,
+        ENROLL_IDEMPOTENCY_TTL_SECONDS,
+    )
+    return application_ids
+
+
+def _write_enrollments(records: list) -> list:
     with get_conn() as conn:
-        cur = conn.cursor()
         try:
-            # Insert student by LRN (do not update existing records)
-            cur.execute("""
-                INSERT INTO students (
-                    lrn, fullName, email, contact, address,
-                    dob, pob, sex, nationality
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                lrn, fullName, email, contact, address,
-                dob, pob, sex, nationality
-            ))
+            # Take the write lock up front; a deferred transaction that later
+            # upgrades can fail with "database is locked" without waiting.
+            if dialect() == "sqlite":
+                conn.execute("BEGIN IMMEDIATE")
+            application_ids = _insert_idempotent_enrollments(conn, records)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return application_ids
 
-            student_id = cur.lastrowid
 
-            # Insert application (store the rest here)
-            cur.execute("""
-                INSERT INTO applications (
-                    student_id, gradeLevel, strand, tvlSpec, generalAve, status,
+def _write_enrollments_with_retry(records: list) -> list:
+    return retry_on_locked(lambda: _write_enrollments(records))
 
-                    jhsGraduated, dateGraduation,
 
-                    medicalConditions, medicalOther, howSupported,
+def _purge_expired_idempotency_keys() -> None:
+    with get_conn() as conn:
+        removed = retry_on_locked(lambda: purge_expired_idempotency_keys(conn, time.time()))
+    if removed:
+        app.logger.info("Purged %d expired idempotency keys", removed)
 
-                    guardianName, guardianCivilStatus, guardianEmployment,
-                    guardianOccupation, guardianRelationship, guardianTel, guardianContact,
 
-                    credentialsSubmitted, firstTimeAU, enrolledYear, studentSignature
-                )
-                VALUES (
-                    ?, ?, ?, ?, ?, 'submitted',
-                    ?, ?,
-                    ?, ?, ?,
-                    ?, ?, ?,
-                    ?, ?, ?, ?,
-                    ?, ?, ?, ?
-                )
-            """, (
-                student_id, gradeLevel, strand, tvlSpec, generalAve,
+_idempotency_sweeper = ExpiredKeySweeper(_purge_expired_idempotency_keys, ENROLL_IDEMPOTENCY_SWEEP_SECONDS)
+
+_enrollment_writer = GroupCommitWriter(
+    _write_enrollments_with_retry,
+    max_batch=ENROLL_GROUP_COMMIT_MAX_BATCH,
+    max_delay=ENROLL_GROUP_COMMIT_MAX_DELAY_MS / 1000,
+    timeout=ENROLL_WRITE_TIMEOUT_SECONDS,
+)
 
-                jhsGraduated, dateGraduation,
 
-                json.dumps(medicalConditions), medicalOther, howSupported,
+def _read_import_rows(stream, import_format: str):
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if import_format == "csv":
+        for row in csv.DictReader(text):
+            for key in IMPORT_LIST_FIELDS:
+                if row.get(key):
+                    row[key] = [item.strip() for item in row[key].split(";") if item.strip()]
+            yield row
+        return
 
-                guardianName, guardianCivilStatus, guardianEmployment,
-                guardianOccupation, guardianRelationship, guardianTel, guardianContact,
+    for line in text:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            yield ValueError(f"Invalid JSON: {e.msg}")
 
-                credentialsSubmitted, firstTimeAU, enrolledYear, studentSignature
-            ))
 
-            application_id = cur.lastrowid
-            conn.commit()
+def _import_enrollments(rows) -> dict:
+    results = []
+    pending = []
 
+    def flush():
+        if not pending:
+            return
+        try:
+            application_ids = _write_enrollments_with_retry([record for _, record in pending])
         except Exception as e:
-            conn.rollback()
+            results.extend({"row": row_number, "ok": False, "error": str(e)} for row_number, _ in pending)
+        else:
+            results.extend(
+                {"row": row_number, "ok": True, "application_id": application_id}
+                for (row_number, _), application_id in zip(pending, application_ids)
+            )
+        pending.clear()
+
+    for row_number, data in enumerate(rows, start=1):
+        if row_number > BULK_IMPORT_MAX_ROWS:
+            results.append({"row": row_number, "ok": False, "error": f"Import is limited to {BULK_IMPORT_MAX_ROWS} rows."})
+            break
+        if isinstance(data, ValueError):
+            results.append({"row": row_number, "ok": False, "error": str(data)})
+            continue
+        record, error = normalize_enrollment(data)
+        if error:
+            results.append({"row": row_number, "ok": False, "error": error})
+            continue
+        pending.append((row_number, record))
+        if len(pending) >= BULK_IMPORT_CHUNK_SIZE:
+            flush()
+    flush()
+
+    results.sort(key=lambda result: result["row"])
+    imported = sum(1 for result in results if result["ok"])
+    return {"imported": imported, "failed": len(results) - imported, "results": results}
+
+
+def _detect_import_format(content_type: str, filename: str = "") -> str:
+    requested = (request.args.get("format") or "").strip().lower()
+    if requested in {"csv", "jsonl"}:
+        return requested
+    if filename.lower().endswith(".csv") or "csv" in (content_type or "").lower():
+        return "csv"
+    return "jsonl"
+
+
+@app.post("/api/enroll")
+def enroll():
+    if not _enroll_limiter.consume(_client_identifier()):
+        response = jsonify({"ok": False, "error": "Too many submissions. Please wait a moment and try again."})
+        response.headers["Retry-After"] = str(_enroll_limiter.retry_after())
+        return response, 429
+
+    data = request.get_json(force=True) or {}
+
+    # A double submit or client retry gets the original answer from one
+    # indexed read instead of queueing another write.
+    _idempotency_sweeper.ensure_running()
+    fingerprint = payload_fingerprint(data)
+    idempotency_key = idempotency_request_key(request.headers.get("Idempotency-Key"), fingerprint)
+    with get_conn() as conn:
+        replay = find_idempotency_key(conn, idempotency_key, time.time())
+    if replay is not None:
+        if replay[0] != fingerprint:
+            return jsonify({"ok": False, "error": "Idempotency-Key was already used for a different submission."}), 422
+        response = jsonify({"ok": True, "application_id": replay[1]})
+        response.headers["Idempotent-Replayed"] = "true"
+        return response
+
+    record, error = normalize_enrollment(data)
+    if error:
+        return jsonify({"ok": False, "error": error}), 400
+    record["idempotency"] = (idempotency_key, fingerprint)
+
+    try:
+        if ENROLL_GROUP_COMMIT:
+            application_id = _enrollment_writer.submit(record)
+        else:
+            application_id = _write_enrollments_with_retry([record])[0]
+    except (FutureTimeoutError, sqlite3.OperationalError) as e:
+        if isinstance(e, sqlite3.OperationalError) and not is_locked_error(e):
             return jsonify({"ok": False, "error": str(e)}), 500
+        response = jsonify({"ok": False, "error": "Enrollment is busy right now. Please try again in a moment."})
+        response.headers["Retry-After"] = "1"
+        return response, 503
+    except IdempotencyConflict as e:
+        return jsonify({"ok": False, "error": str(e)}), 422
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
 
     return jsonify({"ok": True, "application_id": application_id})
 
-@app.get("/api/applications")
+
+@app.post("/api/enroll/batch")
 @login_required
-def list_applications():
-    status = (request.args.get("status") or "").strip()  # optional filter
-    strand = (request.args.get("strand") or "").strip()  # optional filter
+def enroll_batch():
+    upload = request.files.get("file")
+    if upload:
+        import_format = _detect_import_format(upload.mimetype, upload.filename or "")
+        stream = upload.stream
+    else:
+        import_format = _detect_import_format(request.mimetype)
+        stream = request.stream
+
+    report = _import_enrollments(_read_import_rows(stream, import_format))
+    return jsonify({"ok": True, **report})
+
+
+def _float_arg(args, key: str):
+    try:
+        return float((args.get(key) or "").strip())
+    except ValueError:
+        return None
+
+
+def _application_filters(args) -> tuple:
+    status = (args.get("status") or "").strip()  # optional filter
+    strand = (args.get("strand") or "").strip()  # optional filter
+    search = (args.get("q") or "").strip()  # optional filter
+    min_average = _float_arg(args, "min_average")  # optional filter
+    max_average = _float_arg(args, "max_average")  # optional filter
+    credential = (args.get("credential") or "").strip()  # optional filter
+    missing_credential = (args.get("missing_credential") or "").strip()  # optional filter
+    medical_condition = (args.get("medical_condition") or "").strip()  # optional filter
 
-    q = """
-      SELECT a.id, a.gradeLevel, a.strand, a.tvlSpec, a.generalAve, a.status, a.submitted_at,
-             a.credentialsSubmitted, s.lrn, s.fullName
-      FROM applications a
-      JOIN students s ON s.id = a.student_id
-    """
-    params = []
     filters = []
+    params = []
     if status:
         filters.append("a.status = ?")
         params.append(status)
     if strand:
         filters.append("a.strand = ?")
         params.append(strand)
+    # Typed column and junction tables, so these use indexes instead of
+    # parsing generalAve / credentialsSubmitted row by row.
+    if min_average is not None or max_average is not None:
+        # Always a closed range (averages are stored within 0-100): SQLite
+        # estimates a two-sided range as far more selective than a one-sided
+        # one and only then prefers idx_applications_general_average.
+        filters.append("a.general_average BETWEEN ? AND ?")
+        params.extend([0.0 if min_average is None else min_average, 100.0 if max_average is None else max_average])
+    if credential:
+        filters.append("a.id IN (SELECT application_id FROM application_credentials WHERE credential = ?)")
+        params.append(credential)
+    if missing_credential:
+        filters.append(
+            "NOT EXISTS (SELECT 1 FROM application_credentials c WHERE c.application_id = a.id AND c.credential = ?)"
+        )
+        params.append(missing_credential)
+    if medical_condition:
+        filters.append(
+            "a.id IN (SELECT application_id FROM application_medical_conditions WHERE medical_condition = ?)"
+        )
+        params.append(medical_condition)
+    if dialect() != "sqlite":
+        # No FTS5 outside SQLite: fall back to case-insensitive substring
+        # matching on the same columns, one condition per search token.
+        for token in re.findall(r"\w+", search)[:APPLICANT_SEARCH_MAX_TOKENS]:
+            filters.append(
+                "(EXISTS (SELECT 1 FROM students s2 WHERE s2.id = a.student_id"
+                " AND (s2.fullName ILIKE ? OR s2.lrn ILIKE ? OR s2.email ILIKE ?))"
+                " OR a.guardianName ILIKE ? OR a.jhsGraduated ILIKE ? OR a.credentialsSubmitted ILIKE ?)"
+            )
+            params.extend([f"%{token}%"] * 6)
+        return filters, params
+
+    match = _fts_query(search)
+    if match:
+        filters.append("a.id IN (SELECT rowid FROM applicant_search WHERE applicant_search MATCH ?)")
+        params.append(match)
+    return filters, params
+
+
+def _fts_query(text: str) -> str:
+    # Quote every token so user input can never be parsed as FTS5 syntax, and
+    # prefix-match each one so "dela cr" finds "Dela Cruz".
+    tokens = re.findall(r"\w+", text)[:APPLICANT_SEARCH_MAX_TOKENS]
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def _keyset_condition(sort_expr: str, cursor_value, cursor_id: int, ascending: bool) -> tuple:
+    # SQLite sorts NULLs first, so they precede every value going up and
+    # follow every value going down.
+    if sort_expr == "a.id":
+        return ("a.id > ?" if ascending else "a.id < ?"), [cursor_id]
+    if cursor_value is None:
+        if ascending:
+            return f"({sort_expr} IS NOT NULL OR a.id > ?)", [cursor_id]
+        return f"({sort_expr} IS NULL AND a.id < ?)", [cursor_id]
+    if ascending:
+        return f"({sort_expr}, a.id) > (?, ?)", [cursor_value, cursor_id]
+    return f"(({sort_expr}, a.id) < (?, ?) OR {sort_expr} IS NULL)", [cursor_value, cursor_id]
+
+
+@app.get("/api/applications")
+@login_required
+def list_applications():
+    filters, params = _application_filters(request.args)
+
+    sort_key = (request.args.get("sort") or "id").strip()
+    if sort_key not in APPLICATION_SORT_COLUMNS:
+        return jsonify({"ok": False, "error": f"Invalid sort. Allowed: {sorted(APPLICATION_SORT_COLUMNS)}"}), 400
+    sort_expr = APPLICATION_SORT_COLUMNS[sort_key]
+
+    default_direction = "desc" if sort_key in {"id", "submitted_at"} else "asc"
+    direction = (request.args.get("direction") or default_direction).strip().lower()
+    if direction not in {"asc", "desc"}:
+        return jsonify({"ok": False, "error": "Invalid direction. Allowed: ['asc', 'desc']"}), 400
+
+    limit = request.args.get("limit", APPLICATIONS_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, APPLICATIONS_MAX_PAGE_SIZE))
+
+    after_id = request.args.get("after_id", type=int)
+    before_id = request.args.get("before_id", type=int)
+    if after_id is not None and before_id is not None:
+        return jsonify({"ok": False, "error": "Use either `after_id` or `before_id`, not both."}), 400
+
+    # Paging backwards walks the index in the opposite order and flips the page afterwards.
+    backwards = before_id is not None
+    cursor_id = before_id if backwards else after_id
+    ascending = (direction == "asc") != backwards
+    order = "ASC" if ascending else "DESC"
+    # The keyset conditions assume SQLite's NULL ordering; spell it out for
+    # backends whose default differs.
+    nulls = "" if dialect() == "sqlite" else (" NULLS FIRST" if ascending else " NULLS LAST")
+
+    with get_conn() as conn:
+        if cursor_id is not None:
+            cursor_row = conn.execute(
+                f"SELECT {sort_expr} AS value FROM applications a WHERE a.id = ?",
+                (cursor_id,),
+            ).fetchone()
+            if not cursor_row:
+                return jsonify({"ok": False, "error": "Unknown pagination cursor."}), 400
+            condition, condition_params = _keyset_condition(sort_expr, cursor_row["value"], cursor_id, ascending)
+            filters.append(condition)
+            params.extend(condition_params)
+
+        q = """
+          SELECT a.id, a.gradeLevel, a.strand, a.tvlSpec, a.generalAve, a.status, a.submitted_at,
+                 a.credentialsSubmitted, s.lrn, s.fullName
+          FROM applications a
+          JOIN students s ON s.id = a.student_id
+        """
+        if filters:
+            q += " WHERE " + " AND ".join(filters)
+        q += f" ORDER BY {sort_expr} {order}{nulls}, a.id {order} LIMIT ?"
+        params.append(limit + 1)
+
+        rows = conn.execute(q, tuple(params)).fetchall()
+
+    has_more = len(rows) > limit
+    items = [dict(r) for r in rows[:limit]]
+    if backwards:
+        items.reverse()
+
+    has_next = True if backwards else has_more
+    has_prev = has_more if backwards else cursor_id is not None
+    page = {
+        "limit": limit,
+        "sort": sort_key,
+        "direction": direction,
+        "has_next": bool(items) and has_next,
+        "has_prev": bool(items) and has_prev,
+        "next_after_id": items[-1]["id"] if items and has_next else None,
+        "prev_before_id": items[0]["id"] if items and has_prev else None,
+    }
+    return jsonify({"ok": True, "items": items, "page": page})
+
 
+def _application_stat_counts(conn, dimension: str = "") -> dict:
+    # {dimension: {value: count}} from the trigger-maintained application_stats
+    # table; missing values (NULL strand, tvlSpec, ...) are reported as "unspecified".
+    counts = {name: {} for name in ([dimension] if dimension else APPLICATION_STATS_DIMENSIONS)}
+    q = "SELECT dimension, value, total FROM application_stats WHERE total > 0"
+    params = ()
+    if dimension:
+        q += " AND dimension = ?"
+        params = (dimension,)
+    for row in conn.execute(q, params).fetchall():
+        if row["dimension"] in counts:
+            counts[row["dimension"]][row["value"] or "unspecified"] = row["total"]
+    return counts
+
+
+@app.get("/api/applications/count")
+@login_required
+def count_applications():
+    if not any((request.args.get(key) or "").strip() for key in APPLICATION_NON_STATUS_FILTERS):
+        # Status-only (or no) filtering is answered from the summary table.
+        status = (request.args.get("status") or "").strip()
+        with get_conn() as conn:
+            by_status = _application_stat_counts(conn, "status")["status"]
+        if status:
+            by_status = {status: by_status[status]} if status in by_status else {}
+        return jsonify({"ok": True, "total": sum(by_status.values()), "by_status": by_status})
+
+    filters, params = _application_filters(request.args)
+
+    q = "SELECT a.status, COUNT(*) AS total FROM applications a"
     if filters:
         q += " WHERE " + " AND ".join(filters)
-    q += " ORDER BY a.id DESC LIMIT 200"
+    q += " GROUP BY a.status"
 
     with get_conn() as conn:
         rows = conn.execute(q, tuple(params)).fetchall()
 
-    items = []
-    for r in rows:
-        d = dict(r)
-        items.append(d)
+    by_status = {row["status"]: row["total"] for row in rows}
+    return jsonify({"ok": True, "total": sum(by_status.values()), "by_status": by_status})
+
 
-    return jsonify({"ok": True, "items": items})
+@app.get("/api/applications/stats")
+@login_required
+def application_stats():
+    with get_conn() as conn:
+        counts = _application_stat_counts(conn)
+    return jsonify(
+        {
+            "ok": True,
+            "total": sum(counts["status"].values()),
+            **{f"by_{dimension}": values for dimension, values in counts.items()},
+        }
+    )
 
 
-@app.get("/api/applications/<int:app_id>")
+@app.get("/api/applications/search")
 @login_required
-def get_application_details(app_id: int):
-    query = """
-      SELECT
-        a.id, a.student_id, a.gradeLevel, a.strand, a.tvlSpec, a.generalAve, a.status, a.submitted_at,
-        a.jhsGraduated, a.dateGraduation,
-        a.medicalConditions, a.medicalOther, a.howSupported,
-        a.guardianName, a.guardianCivilStatus, a.guardianEmployment,
-        a.guardianOccupation, a.guardianRelationship, a.guardianTel, a.guardianContact,
-        a.credentialsSubmitted, a.firstTimeAU, a.enrolledYear, a.studentSignature,
-        s.lrn, s.fullName, s.email, s.contact, s.address, s.dob, s.pob, s.sex, s.nationality
-      FROM applications a
+def search_applications():
+    match = _fts_query(request.args.get("q") or "")
+    if not match:
+        return jsonify({"ok": False, "error": "Missing search query `q`."}), 400
+
+    limit = request.args.get("limit", APPLICANT_SEARCH_LIMIT, type=int)
+    limit = max(1, min(limit, APPLICATIONS_MAX_PAGE_SIZE))
+
+    if dialect() != "sqlite":
+        # Without FTS5 there is no relevance score: newest matches come first.
+        filters, params = _application_filters(request.args)
+        q = f"""
+          SELECT a.id, a.gradeLevel, a.strand, a.tvlSpec, a.generalAve, a.status, a.submitted_at,
+                 a.credentialsSubmitted, s.lrn, s.fullName, 0.0 AS rank
+          FROM applications a
+          JOIN students s ON s.id = a.student_id
+          WHERE {" AND ".join(filters)}
+          ORDER BY a.id DESC
+          LIMIT ?
+        """
+        with get_conn() as conn:
+            rows = conn.execute(q, tuple(params) + (limit,)).fetchall()
+        return jsonify({"ok": True, "items": [dict(r) for r in rows]})
+
+    filters, params = _application_filters({key: value for key, value in request.args.items() if key != "q"})
+    filters.insert(0, "applicant_search MATCH ?")
+    params.insert(0, match)
+    params.append(limit)
+
+    # bm25 weights follow the applicant_search column order: name and LRN hits
+    # outrank email, guardian, school and document matches.
+    q = f"""
+      SELECT a.id, a.gradeLevel, a.strand, a.tvlSpec, a.generalAve, a.status, a.submitted_at,
+             a.credentialsSubmitted, s.lrn, s.fullName,
+             bm25(applicant_search, 10.0, 10.0, 4.0, 2.0, 1.0, 0.5) AS rank
+      FROM applicant_search
+      JOIN applications a ON a.id = applicant_search.rowid
       JOIN students s ON s.id = a.student_id
-      WHERE a.id = ?
-      LIMIT 1
+      WHERE {" AND ".join(filters)}
+      ORDER BY rank
+      LIMIT ?
     """
 
     with get_conn() as conn:
-        row = conn.execute(query, (app_id,)).fetchone()
+        rows = conn.execute(q, tuple(params)).fetchall()
 
-    if not row:
-        return jsonify({"ok": False, "error": "Application not found."}), 404
+    return jsonify({"ok": True, "items": [dict(r) for r in rows]})
 
+
+def _application_details(row) -> dict:
     details = dict(row)
     try:
         details["medicalConditions"] = json.loads(details.get("medicalConditions") or "[]")
     except json.JSONDecodeError:
         details["medicalConditions"] = []
+    try:
+        details["submitted_student"] = json.loads(details.get("submitted_student") or "null")
+    except json.JSONDecodeError:
+        details["submitted_student"] = None
+    return details
+
+
+def _export_row(details: dict) -> list:
+    row = [details[column] for column in APPLICATION_EXPORT_COLUMNS]
+    medical_index = APPLICATION_EXPORT_COLUMNS.index("medicalConditions")
+    row[medical_index] = "; ".join(str(item) for item in details["medicalConditions"])
+    return row
+
+
+def _iter_export_details(args):
+    filters, params = _application_filters(args)
+    q = f"SELECT {APPLICATION_DETAIL_COLUMNS_SQL} FROM applications a JOIN students s ON s.id = a.student_id"
+    if filters:
+        q += " WHERE " + " AND ".join(filters)
+    q += " ORDER BY a.id"
+
+    with get_conn() as conn:
+        for row in iter_rows(conn, q, tuple(params)):
+            yield _application_details(row)
+
+
+def _stream_csv_export(details_rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(APPLICATION_EXPORT_COLUMNS)
+    for index, details in enumerate(details_rows, start=1):
+        writer.writerow(_export_row(details))
+        if index % EXPORT_FLUSH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _stream_xlsx_export(details_rows):
+    # openpyxl's write-only mode keeps one row in memory at a time but can only
+    # save whole workbooks, so it is spooled to a temp file and streamed back.
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Applications")
+    sheet.append(list(APPLICATION_EXPORT_COLUMNS))
+    for details in details_rows:
+        sheet.append(_export_row(details))
+
+    with tempfile.TemporaryFile() as spool:
+        workbook.save(spool)
+        spool.seek(0)
+        while True:
+            chunk = spool.read(EXPORT_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+
+
+@app.get("/api/applications/export")
+@login_required
+def export_applications():
+    export_format = (request.args.get("format") or "csv").strip().lower()
+    if export_format not in {"csv", "xlsx"}:
+        return jsonify({"ok": False, "error": "Invalid format. Allowed: ['csv', 'xlsx']"}), 400
+    if export_format == "xlsx" and openpyxl is None:
+        return jsonify({"ok": False, "error": "XLSX export requires the openpyxl package."}), 400
+
+    details_rows = _iter_export_details(request.args.to_dict())
+    file_name = f"applications-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+    if export_format == "xlsx":
+        body = _stream_xlsx_export(details_rows)
+        mimetype = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        body = _stream_csv_export(details_rows)
+        mimetype = "text/csv"
+
+    response = app.response_class(stream_with_context(body), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="{file_name}"'
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+def _application_etag(row) -> str:
+    # Changes whenever the application or its student row is updated, and
+    # with the detail column list, so a deploy that changes the payload
+    # never revalidates an old cached copy.
+    return f"{APPLICATION_DETAILS_ETAG_PREFIX}-{row['id']}-{row['row_version']}-{row['student_row_version']}"
+
+
+def _application_details_rows(conn, app_ids: list) -> list:
+    rows = []
+    for chunk in _chunks(app_ids):
+        rows.extend(
+            conn.execute(
+                f"""
+                SELECT {APPLICATION_DETAIL_COLUMNS_SQL},
+                       a.row_version, s.row_version AS student_row_version
+                FROM applications a
+                JOIN students s ON s.id = a.student_id
+                WHERE a.id IN ({", ".join("?" * len(chunk))})
+                """,
+                chunk,
+            ).fetchall()
+        )
+    return rows
+
+
+def _split_details_row(row) -> tuple:
+    # (API item, ETag); the version columns stay out of the item.
+    details = _application_details(row)
+    etag = _application_etag(details)
+    del details["row_version"], details["student_row_version"]
+    return details, etag
+
+
+@app.get("/api/applications/<int:app_id>")
+@login_required
+def get_application_details(app_id: int):
+    with get_conn() as conn:
+        if request.if_none_match:
+            # Revalidation only needs the two version numbers.
+            versions = conn.execute(
+                """
+                SELECT a.id, a.row_version, s.row_version AS student_row_version
+                FROM applications a
+                JOIN students s ON s.id = a.student_id
+                WHERE a.id = ?
+                """,
+                (app_id,),
+            ).fetchone()
+            if versions and request.if_none_match.contains(_application_etag(versions)):
+                response = app.response_class(status=304)
+                response.set_etag(_application_etag(versions))
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+                return response
+        rows = _application_details_rows(conn, [app_id])
+
+    if not rows:
+        return jsonify({"ok": False, "error": "Application not found."}), 404
+
+    item, etag = _split_details_row(rows[0])
+    response = jsonify({"ok": True, "item": item})
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+@app.post("/api/applications/<int:app_id>/apply-submitted-student")
+@login_required
+def apply_submitted_student(app_id: int):
+    # Copies the student details sent with a linked application onto the
+    # stored student; the public form never does this on its own.
+    def apply():
+        with get_conn() as conn:
+            row = conn.execute(
+                "SELECT student_id, submitted_student FROM applications WHERE id = ?", (app_id,)
+            ).fetchone()
+            if not row:
+                return None
+            if not row["submitted_student"]:
+                return False
+            submitted = json.loads(row["submitted_student"])
+            student = tuple(submitted.get(name) for name in STUDENT_FIELD_INDEX)
+            try:
+                conn.execute(
+                    REFRESH_STUDENT_SQL,
+                    (*student[1:], student[STUDENT_FIELD_INDEX["dob"]], *typed_student(student), row["student_id"]),
+                )
+                conn.execute("UPDATE applications SET submitted_student = NULL WHERE id = ?", (app_id,))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            return True
+
+    applied = retry_on_locked(apply)
+    if applied is None:
+        return jsonify({"ok": False, "error": "Application not found."}), 404
+    if not applied:
+        return jsonify({"ok": False, "error": "This application has no submitted details to apply."}), 409
+    return jsonify({"ok": True})
+
+
+@app.get("/api/applications/details")
+@login_required
+def get_application_details_batch():
+    # ?ids=1,2,3 -> items in the requested order plus their ETags, so the
+    # admin view can prefetch a page of applicants with one query and later
+    # revalidate single records against GET /api/applications/<id>.
+    raw_ids = [part.strip() for part in (request.args.get("ids") or "").split(",") if part.strip()]
+    if not raw_ids:
+        return jsonify({"ok": False, "error": "Missing `ids`."}), 400
+    if not all(part.isdigit() for part in raw_ids):
+        return jsonify({"ok": False, "error": "`ids` must be a comma-separated list of application ids."}), 400
+    app_ids = list(dict.fromkeys(int(part) for part in raw_ids))
+    if len(app_ids) > APPLICATIONS_MAX_PAGE_SIZE:
+        return jsonify({"ok": False, "error": f"At most {APPLICATIONS_MAX_PAGE_SIZE} ids per request."}), 400
+
+    with get_conn() as conn:
+        rows = _application_details_rows(conn, app_ids)
+
+    found = {}
+    etags = {}
+    for row in rows:
+        item, etag = _split_details_row(row)
+        found[item["id"]] = item
+        etags[str(item["id"])] = etag
+    return jsonify(
+        {
+            "ok": True,
+            "items": [found[app_id] for app_id in app_ids if app_id in found],
+            "etags": etags,
+            "missing": [app_id for app_id in app_ids if app_id not in found],
+        }
+    )
+
+def _invalid_status_response(new_status: str):
+    if new_status in APPLICATION_STATUSES:
+        return None
+    return jsonify({"ok": False, "error": f"Invalid status. Allowed: {sorted(APPLICATION_STATUSES)}"}), 400
+
+
+def _transition_statuses(new_status: str, changed_by, app_ids=None, filters=None) -> dict:
+    # Moves the given ids (or every application matching `filters`, a
+    # (conditions, params) pair from _application_filters) to new_status in one
+    # transaction and records each real change in application_status_history.
+    # Returns {id: status before the change} for the applications that exist.
+    sqlite = dialect() == "sqlite"
+    # Row locks in id order so concurrent bulk updates cannot deadlock.
+    lock = "" if sqlite else " FOR UPDATE"
+    with get_conn() as conn:
+        try:
+            if sqlite:
+                conn.execute("BEGIN IMMEDIATE")
+            previous = {}
+            if filters is not None:
+                conditions, params = filters
+                rows = conn.execute(
+                    f"SELECT a.id, a.status FROM applications a WHERE {' AND '.join(conditions)}"
+                    f" ORDER BY a.id LIMIT ?{lock}",
+                    (*params, BULK_STATUS_MAX_ROWS + 1),
+                ).fetchall()
+                if len(rows) > BULK_STATUS_MAX_ROWS:
+                    raise ValueError(f"More than {BULK_STATUS_MAX_ROWS} applications match; narrow the filter.")
+                previous.update((row["id"], row["status"]) for row in rows)
+            else:
+                for chunk in _chunks(sorted(set(app_ids))):
+                    rows = conn.execute(
+                        f"SELECT id, status FROM applications WHERE id IN ({', '.join('?' * len(chunk))})"
+                        f" ORDER BY id{lock}",
+                        chunk,
+                    ).fetchall()
+                    previous.update((row["id"], row["status"]) for row in rows)
+
+            changed = [app_id for app_id, status in previous.items() if status != new_status]
+            for chunk in _chunks(changed):
+                conn.execute(
+                    f"UPDATE applications SET status = ? WHERE id IN ({', '.join('?' * len(chunk))})",
+                    (new_status, *chunk),
+                )
+            conn.executemany(
+                "INSERT INTO application_status_history (application_id, from_status, to_status, changed_by)"
+                " VALUES (?, ?, ?, ?)",
+                [(app_id, previous[app_id], new_status, changed_by) for app_id in changed],
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return previous
+
+
+def _transition_statuses_with_retry(new_status: str, app_ids=None, filters=None) -> dict:
+    changed_by = session.get("admin_username") or None
+    return retry_on_locked(lambda: _transition_statuses(new_status, changed_by, app_ids=app_ids, filters=filters))
 
-    return jsonify({"ok": True, "item": details})
 
 @app.patch("/api/applications/<int:app_id>/status")
 @login_required
@@ -862,16 +1809,284 @@ def update_status(app_id: int):
     data = request.get_json(force=True) or {}
     new_status = (data.get("status") or "").strip()
 
-    allowed = {"submitted", "under_review", "approved", "rejected"}
-    if new_status not in allowed:
-        return jsonify({"ok": False, "error": f"Invalid status. Allowed: {sorted(list(allowed))}"}), 400
+    invalid = _invalid_status_response(new_status)
+    if invalid:
+        return invalid
+
+    if app_id not in _transition_statuses_with_retry(new_status, app_ids=[app_id]):
+        return jsonify({"ok": False, "error": "Application not found."}), 404
+
+    return jsonify({"ok": True})
 
+
+@app.patch("/api/applications/status")
+@login_required
+def bulk_update_status():
+    # Body: {"status": ..., "ids": [1, 2, ...]} or {"status": ..., "filter":
+    # {"status": ..., "strand": ..., "q": ...}} with the list endpoint's filters.
+    data = request.get_json(force=True, silent=True) or {}
+    new_status = (str(data.get("status") or "")).strip()
+    invalid = _invalid_status_response(new_status)
+    if invalid:
+        return invalid
+
+    ids = data.get("ids")
+    criteria = data.get("filter")
+    if (ids is None) == (criteria is None):
+        return jsonify({"ok": False, "error": "Send either `ids` or `filter`."}), 400
+
+    filters = None
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(app_id, int) and not isinstance(app_id, bool) for app_id in ids):
+            return jsonify({"ok": False, "error": "`ids` must be a list of application ids."}), 400
+        if len(ids) > BULK_STATUS_MAX_ROWS:
+            return jsonify({"ok": False, "error": f"At most {BULK_STATUS_MAX_ROWS} ids per request."}), 400
+    else:
+        if not isinstance(criteria, dict):
+            return jsonify({"ok": False, "error": "`filter` must be an object."}), 400
+        conditions, params = _application_filters({key: str(value) for key, value in criteria.items() if value is not None})
+        # An empty filter would match every application; require something explicit.
+        if not conditions:
+            return jsonify({"ok": False, "error": "`filter` needs at least one of the list filters (status, strand, q, ...)."}), 400
+        filters = (conditions, params)
+
+    try:
+        previous = _transition_statuses_with_retry(new_status, app_ids=ids, filters=filters)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    except sqlite3.OperationalError as e:
+        if not is_locked_error(e):
+            raise
+        response = jsonify({"ok": False, "error": "Applications are busy right now. Please try again in a moment."})
+        response.headers["Retry-After"] = "1"
+        return response, 503
+
+    results = []
+    for app_id in ids if ids is not None else sorted(previous):
+        if app_id in previous:
+            results.append({"id": app_id, "ok": True, "from": previous[app_id], "changed": previous[app_id] != new_status})
+        else:
+            results.append({"id": app_id, "ok": False, "error": "Application not found."})
+    updated = sum(1 for status in previous.values() if status != new_status)
+    return jsonify(
+        {
+            "ok": True,
+            "status": new_status,
+            "updated": updated,
+            "unchanged": len(previous) - updated,
+            "not_found": sum(1 for result in results if not result["ok"]),
+            "results": results,
+        }
+    )
+
+
+@app.get("/api/applications/<int:app_id>/history")
+@login_required
+def application_status_history(app_id: int):
+    with get_conn() as conn:
+        rows = conn.execute(
+            """
+            SELECT from_status, to_status, changed_by, changed_at
+            FROM application_status_history
+            WHERE application_id = ?
+            ORDER BY id
+            """,
+            (app_id,),
+        ).fetchall()
+    return jsonify({"ok": True, "items": [dict(row) for row in rows]})
+
+
+@app.get("/api/students/by-lrn/<string:lrn>")
+@login_required
+def get_student_by_lrn(lrn: str):
+    lrn = lrn.strip()
     with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("UPDATE applications SET status = ? WHERE id = ?", (new_status, app_id))
+        # Both lookups go through idx_students_lrn. Until duplicates are
+        # merged one LRN can still map to several students rows.
+        student_rows = conn.execute(
+            """
+            SELECT id, lrn, fullName, email, contact, address, dob, pob, sex, nationality, created_at
+            FROM students
+            WHERE lrn = ?
+            ORDER BY id DESC
+            """,
+            (lrn,),
+        ).fetchall()
+        if not student_rows:
+            return jsonify({"ok": False, "error": "No student with that LRN."}), 404
+        applications = conn.execute(
+            """
+            SELECT a.id, a.student_id, a.gradeLevel, a.strand, a.tvlSpec, a.generalAve, a.status, a.submitted_at
+            FROM applications a
+            WHERE a.student_id IN (SELECT id FROM students WHERE lrn = ?)
+            ORDER BY a.id
+            """,
+            (lrn,),
+        ).fetchall()
+
+    return jsonify(
+        {
+            "ok": True,
+            "student": dict(student_rows[0]),
+            "duplicate_student_ids": [row["id"] for row in student_rows[1:]],
+            "applications": [dict(row) for row in applications],
+        }
+    )
+
+
+@app.cli.command("import-enrollments")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "import_format", type=click.Choice(["csv", "jsonl"]), default=None)
+def import_enrollments_command(path: str, import_format):
+    import_format = import_format or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    started = time.perf_counter()
+    with open(path, "rb") as stream:
+        report = _import_enrollments(_read_import_rows(stream, import_format))
+    elapsed = time.perf_counter() - started
+    for result in report["results"]:
+        if not result["ok"]:
+            print(f">>> Row {result['row']}: {result['error']}")
+    print(f">>> Imported {report['imported']} rows, {report['failed']} failed in {elapsed:.2f}s.")
+
+
+@app.cli.command("merge-duplicate-students")
+@click.option("--batch-size", default=500, show_default=True, help="LRNs merged per transaction.")
+@click.option("--dry-run", is_flag=True, help="Only report how many students would be merged.")
+def merge_duplicate_students_command(batch_size: int, dry_run: bool):
+    with get_conn() as conn:
+        lrns = duplicate_student_lrns(conn)
+    if dry_run or not lrns:
+        print(f">>> {len(lrns)} LRNs have more than one student row.")
+        return
+    totals = {"applications_moved": 0, "students_removed": 0}
+    for done, batch in enumerate(_chunks(lrns, max(1, batch_size)), start=1):
+        # Short transactions so enrollment writes can interleave with the merge.
+        with get_conn() as conn:
+            merged = retry_on_locked(lambda: merge_duplicate_students(conn, batch))
+        for key, value in merged.items():
+            totals[key] += value
+        print(f">>> Batch {done}: merged {len(batch)} LRNs ({merged['students_removed']} duplicate rows).")
+    print(
+        f">>> Merged {len(lrns)} LRNs: moved {totals['applications_moved']} applications,"
+        f" removed {totals['students_removed']} duplicate students."
+    )
+
+
+@app.cli.command("dedupe-uploads")
+@click.option("--dry-run", is_flag=True, help="Only report what would be renamed.")
+def dedupe_uploads_command(dry_run: bool):
+    with get_conn() as conn:
+        renames = dedupe_uploads(conn, UPLOAD_DIR, dry_run=dry_run)
+    for old_name, new_name in renames.items():
+        print(f">>> {old_name} -> {new_name}")
+    print(f">>> {len(renames)} uploads mapped onto {len(set(renames.values()))} content-addressed files.")
+
+
+@app.cli.command("sweep-uploads")
+@click.option("--dry-run", is_flag=True, help="Only report what would be removed.")
+def sweep_uploads_command(dry_run: bool):
+    with get_conn() as conn:
+        removed = sweep_orphan_uploads(
+            conn, UPLOAD_DIR, UPLOAD_ORPHAN_GRACE_SECONDS, dry_run=dry_run, variant_dir=IMAGE_VARIANT_DIR
+        )
+    for file_name in removed:
+        print(f">>> {'Would remove' if dry_run else 'Removed'} {file_name}")
+    print(f">>> {len(removed)} unreferenced uploads {'found' if dry_run else 'removed'}.")
+
+
+@app.cli.command("build-images")
+def build_images_command():
+    if not pipeline_available():
+        print(">>> Pillow is not installed; pip install Pillow to build image variants.")
+        return
+    sources = {}
+    for directory in (BUNDLED_IMAGE_DIR, UPLOAD_DIR):
+        if directory.exists():
+            for path in sorted(directory.iterdir()):
+                if path.is_file() and not path.name.startswith("."):
+                    sources[f"../static/{path.relative_to(STATIC_DIR).as_posix()}"] = path
+    results = _image_pipeline.run(sources)
+    before = sum(path.stat().st_size for source, path in sources.items() if results.get(source))
+    after = sum(max(v["bytes"] for v in variants) for variants in results.values() if variants)
+    print(f">>> Built variants for {sum(1 for v in results.values() if v)} of {len(sources)} images.")
+    print(f">>> Largest variants total {after // 1024} KB (originals {before // 1024} KB).")
+
+
+@app.cli.command("build-assets")
+def build_assets_command():
+    manifest = build_bundles(STATIC_DIR)
+    for name, file_name in sorted(manifest.items()):
+        size = (STATIC_DIST_DIR / file_name).stat().st_size
+        print(f">>> {name} -> {DIST_DIRNAME}/{file_name} ({size // 1024} KB)")
+
+
+@app.cli.command("slow-queries")
+@click.option("--top", default=10, show_default=True, help="Number of statements to show.")
+@click.option("--json", "as_json", is_flag=True, help="Print the report as JSON.")
+def slow_queries_command(top: int, as_json: bool):
+    report = summarize(DB_SLOW_QUERY_LOG, top=top)
+    if as_json:
+        print(json.dumps(report, indent=2, default=str))
+        return
+    if not report:
+        print(f">>> No slow queries logged in {DB_SLOW_QUERY_LOG}. Set DB_SLOW_QUERY_MS to enable logging.")
+        return
+    for rank, item in enumerate(report, start=1):
+        scans = f"  FULL SCAN: {', '.join(item['full_scans'])}" if item["full_scans"] else ""
+        print(f"#{rank} total {item['total_ms']:.1f} ms | {item['count']}x | avg {item['avg_ms']:.2f} ms | p95 {item['p95_ms']:.2f} ms | max {item['max_ms']:.2f} ms{scans}")
+        print(f"    {item['sql'][:200]}")
+        if item["endpoints"]:
+            print(f"    endpoints: {', '.join(item['endpoints'])}")
+        for line in (item["slowest"].get("plan") or []):
+            print(f"    plan: {line}")
+
+
+@app.cli.command("migrate")
+@click.option("--status", "show_status", is_flag=True, help="Only print the current and latest schema versions.")
+def migrate_command(show_status: bool):
+    backend = get_pool()
+    with backend.connection() as conn:
+        version = current_version(conn, backend.dialect)
+        latest = latest_version(backend.dialect)
+        if show_status:
+            print(f">>> Schema version {version} of {latest}.")
+            return
+        applied = migrate(backend, conn, log=lambda message: print(f">>> {message}"))
+    _ensure_site_content_defaults()
+    if applied:
+        print(f">>> Migrated to schema version {applied[-1][0]}.")
+    else:
+        print(f">>> Schema is up to date (version {version}).")
+
+
+@app.cli.command("rebuild-application-stats")
+def rebuild_application_stats_command():
+    with get_conn() as conn:
+        total = rebuild_application_stats(conn)
+    print(f">>> Recounted statistics for {total} applications.")
+
+
+@app.cli.command("rebuild-typed-columns")
+def rebuild_typed_columns_command():
+    # Re-derives general_average, graduated_on, born_on and the credential /
+    # medical-condition tables, e.g. after the parsing rules change.
+    with get_conn() as conn:
+        if dialect() == "sqlite":
+            conn.execute("BEGIN IMMEDIATE")
+        total = rebuild_typed_columns(conn)
         conn.commit()
+    print(f">>> Rebuilt typed columns for {total} applications.")
+
+
+@app.cli.command("rebuild-search-index")
+def rebuild_search_index_command():
+    if dialect() != "sqlite":
+        print(">>> The full-text search index only exists on the SQLite backend.")
+        return
+    with get_conn() as conn:
+        total = rebuild_search_index(conn)
+    print(f">>> Indexed {total} applications for search.")
 
-    return jsonify({"ok": True})
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5001, debug=True)
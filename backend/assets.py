@@ -0,0 +1,152 @@
+import gzip
+import hashlib
+import json
+import posixpath
+import re
+from pathlib import Path
+
+from markupsafe import Markup, escape
+
+try:
+    import brotli
+except ImportError:  # optional: without it only .gz siblings are written
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:  # optional: without it JS bundles are concatenated as-is
+    rjsmin = None
+
+STATIC_URL_PREFIX = "../static/"
+DIST_DIRNAME = "dist"
+MANIFEST_NAME = "manifest.json"
+
+# Bundles in load order; paths are relative to backend/static. Order matters:
+# later stylesheets override earlier ones and scripts expect jQuery first.
+BUNDLES = {
+    "site.css": (
+        "vendor/bootstrap/css/bootstrap.min.css",
+        "assets/css/fontawesome.css",
+        "assets/css/templatemo-scholar.css",
+        "assets/css/owl.css",
+        "assets/css/animate.css",
+    ),
+    "site.js": (
+        "script.js",
+        "vendor/jquery/jquery.min.js",
+        "vendor/bootstrap/js/bootstrap.min.js",
+        "assets/js/isotope.min.js",
+        "assets/js/owl-carousel.js",
+        "assets/js/counter.js",
+        "assets/js/custom.js",
+    ),
+}
+
+_CSS_LITERALS = re.compile(r"(\"(?:[^\"\\]|\\.)*\"|'(?:[^'\\]|\\.)*'|/\*!.*?\*/)|(/\*.*?\*/)", re.S)
+_CSS_URL = re.compile(r"url\(\s*(['\"]?)([^'\")]+)\1\s*\)")
+_CSS_AT_RULES = re.compile(r"@(?:charset|import)\s+(?:url\([^)]*\)|\"[^\"]*\"|'[^']*')[^;]*;")
+_SOURCE_MAP = re.compile(r"^\s*(?://|/\*)# sourceMappingURL=.*$", re.M)
+
+
+def _rebase_css_urls(css: str, source: str) -> str:
+    # Relative url()s point next to the source file; the bundle lives in dist/.
+    source_dir = posixpath.dirname(source)
+
+    def rebase(match):
+        quote, url = match.group(1), match.group(2).strip()
+        if url.startswith(("data:", "http:", "https:", "//", "/", "#")):
+            return match.group(0)
+        target = posixpath.normpath(posixpath.join(source_dir, url))
+        return f"url({quote}{posixpath.relpath(target, DIST_DIRNAME)}{quote})"
+
+    return _CSS_URL.sub(rebase, css)
+
+
+def minify_css(css: str) -> str:
+    # Conservative: drops comments and collapses whitespace outside strings,
+    # keeps /*! license */ comments, and never rewrites selectors or values.
+    out = []
+    position = 0
+    for match in _CSS_LITERALS.finditer(css):
+        out.append(_squeeze_css(css[position:match.start()]))
+        if match.group(1):
+            out.append(match.group(1))
+        position = match.end()
+    out.append(_squeeze_css(css[position:]))
+    return "".join(out).strip()
+
+
+def _squeeze_css(text: str) -> str:
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,])\s*", r"\1", text)
+    return text.replace(";}", "}")
+
+
+def _build_css(static_dir: Path, sources: tuple) -> str:
+    at_rules = []
+    parts = []
+    for source in sources:
+        css = (static_dir / source).read_text(encoding="utf-8")
+        css = _SOURCE_MAP.sub("", _rebase_css_urls(css, source))
+        # @charset/@import are only valid at the top of a stylesheet, so they
+        # are hoisted out of each file and written once at the start.
+        for rule in _CSS_AT_RULES.findall(css):
+            if rule.startswith("@import") and rule not in at_rules:
+                at_rules.append(rule)
+        parts.append(minify_css(_CSS_AT_RULES.sub("", css)))
+    return "\n".join(['@charset "UTF-8";', *at_rules, *parts]) + "\n"
+
+
+def _build_js(static_dir: Path, sources: tuple) -> str:
+    parts = []
+    for source in sources:
+        js = _SOURCE_MAP.sub("", (static_dir / source).read_text(encoding="utf-8"))
+        if rjsmin is not None and not source.endswith(".min.js"):
+            js = rjsmin.jsmin(js)
+        parts.append(js.strip())
+    # The separator guards against files that end without a semicolon.
+    return "\n;\n".join(parts) + "\n"
+
+
+def build_bundles(static_dir: Path) -> dict:
+    dist_dir = static_dir / DIST_DIRNAME
+    dist_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {}
+    for name, sources in BUNDLES.items():
+        stem, kind = name.rsplit(".", 1)
+        content = (_build_css if kind == "css" else _build_js)(static_dir, sources).encode("utf-8")
+        file_name = f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}.{kind}"
+        (dist_dir / file_name).write_bytes(content)
+        (dist_dir / f"{file_name}.gz").write_bytes(gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            (dist_dir / f"{file_name}.br").write_bytes(brotli.compress(content))
+        manifest[name] = file_name
+
+    tmp = dist_dir / f".{MANIFEST_NAME}.tmp"
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    tmp.replace(dist_dir / MANIFEST_NAME)
+    return manifest
+
+
+def load_manifest(static_dir: Path) -> dict:
+    try:
+        return json.loads((static_dir / DIST_DIRNAME / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def make_asset_tags(manifest: dict):
+    # Without a built manifest (local development) the individual source
+    # files are linked instead, so pages work before `flask build-assets`.
+    def asset_tags(name: str) -> Markup:
+        if name in manifest:
+            urls = [f"{STATIC_URL_PREFIX}{DIST_DIRNAME}/{manifest[name]}"]
+        else:
+            urls = [f"{STATIC_URL_PREFIX}{source}" for source in BUNDLES[name]]
+        if name.endswith(".css"):
+            tags = [f'<link rel="stylesheet" href="{escape(url)}">' for url in urls]
+        else:
+            tags = [f'<script src="{escape(url)}"></script>' for url in urls]
+        return Markup("\n  ".join(tags))
+
+    return asset_tags
@@ -0,0 +1,472 @@
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from db import ConnectionPool, rebuild_typed_columns  # noqa: E402
+from migrations import migrate  # noqa: E402
+
+# Load test for the public enrollment and admin endpoints.
+# Usage: python benchmarks/bench_endpoints.py [--rows 10000,100000,1000000]
+#            [--concurrency 1,8,32] [--requests 500] [--drivers test-client,wsgi]
+#            [--endpoints enroll,list,detail,home] [--workdir DIR] [--out results.json]
+#
+# For every row count a SQLite database is seeded once with synthetic students
+# and applications (cached in --workdir as seed-<rows>.db; the 1M-row seed
+# takes a few minutes and about 1.2 GB) and copied fresh before each driver, so
+# enrollments from one run never skew the next. The app runs in a separate
+# process pointed at the copy through DATABASE_URL:
+#   test-client  requests go through Flask's test client inside that process,
+#                measuring the app and database without any HTTP overhead;
+#   wsgi         that process serves HTTP/1.1 with Werkzeug's threaded server
+#                and this process drives it over keep-alive connections.
+# Prints JSON with throughput, p50/p95/p99 latency and lock errors (503 "busy"
+# responses and "database is locked" failures) per driver, endpoint and
+# concurrency level; save it per commit and diff to spot regressions.
+
+SEED_CHUNK_ROWS = 10000
+SEED_DAYS = 180
+
+SURNAMES = (
+    "Dela Cruz", "Santos", "Reyes", "Garcia", "Mendoza", "Bautista", "Villanueva", "Ramos",
+    "Aquino", "Castillo", "Navarro", "Torres", "Flores", "Gonzales", "Lopez", "Rivera",
+)
+GIVEN_NAMES = (
+    "Juan", "Maria", "Jose", "Ana", "Mark", "Angel", "John Paul", "Kristine",
+    "Miguel", "Andrea", "Carlo", "Patricia", "Paolo", "Nicole", "Rafael", "Bea",
+)
+CITIES = ("Malabon", "Navotas", "Caloocan", "Valenzuela", "Quezon City", "Manila")
+SCHOOLS = ("Malabon National High School", "Tinajeros NHS", "Navotas NHS", "Arellano University JHS")
+# (strand, weight); TVL applications also get a specialization.
+STRANDS = (("STEM", 35), ("ABM", 20), ("HUMSS", 20), ("GAS", 10), ("TVL", 15))
+TVL_SPECS = ("ICT", "HE", "TG", "EIM")
+STATUSES = (("submitted", 50), ("under_review", 25), ("approved", 20), ("rejected", 5))
+CREDENTIALS = ("Form 138", "Form 137", "PSA Birth Certificate", "Good Moral Certificate", "2x2 Picture")
+MEDICAL = ("Asthma", "Allergies", "Vision problems")
+
+LIST_QUERIES = (
+    "limit=50",
+    "limit=50&status=submitted",
+    "limit=50&strand=STEM",
+    "limit=50&status=approved&strand=ABM",
+    "limit=50&sort=fullName",
+    "limit=50&sort=submitted_at&status=under_review",
+    "limit=50&q=dela+cruz",
+    "limit=50&min_average=90",
+    "limit=50&missing_credential=Form+138",
+)
+
+STUDENT_SEED_SQL = """
+    INSERT INTO students (id, lrn, fullName, email, contact, address, dob, pob, sex, nationality, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+APPLICATION_SEED_SQL = """
+    INSERT INTO applications (
+        id, student_id, gradeLevel, strand, tvlSpec, generalAve, jhsGraduated, dateGraduation,
+        medicalConditions, medicalOther, howSupported, guardianName, guardianCivilStatus,
+        guardianEmployment, guardianOccupation, guardianRelationship, guardianTel, guardianContact,
+        credentialsSubmitted, firstTimeAU, enrolledYear, studentSignature, status, submitted_at,
+        student_name, student_lrn
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _weighted(rng: random.Random, choices: tuple) -> str:
+    return rng.choices([value for value, _ in choices], weights=[weight for _, weight in choices])[0]
+
+
+def _synthetic_rows(rng: random.Random, row_id: int, now: datetime) -> tuple:
+    surname, given = rng.choice(SURNAMES), rng.choice(GIVEN_NAMES)
+    full_name = f"{surname} {given} {rng.choice(SURNAMES)}"
+    submitted_at = (now - timedelta(seconds=rng.randrange(SEED_DAYS * 86400))).strftime("%Y-%m-%d %H:%M:%S")
+    strand = _weighted(rng, STRANDS)
+    student = (
+        row_id, f"{100000000000 + row_id}", full_name,
+        f"{given.lower().replace(' ', '')}.{row_id}@example.com", f"09{rng.randrange(10 ** 9):09d}",
+        f"{rng.randrange(1, 999)} Gov. Pascual Ave, {rng.choice(CITIES)}",
+        f"{rng.randrange(2006, 2010)}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}",
+        rng.choice(CITIES), rng.choice(("Male", "Female")), "Filipino", submitted_at,
+    )
+    application = (
+        row_id, row_id, rng.choice(("Grade 11", "Grade 12")), strand,
+        rng.choice(TVL_SPECS) if strand == "TVL" else None, f"{rng.uniform(75, 99):.2f}",
+        rng.choice(SCHOOLS), f"{rng.randrange(2022, 2026)}-06-{rng.randrange(1, 29):02d}",
+        json.dumps(rng.sample(MEDICAL, rng.randrange(0, 2))), None, rng.choice(("Parents", "Guardian", "Scholarship")),
+        f"{rng.choice(SURNAMES)} {rng.choice(GIVEN_NAMES)}", rng.choice(("Married", "Single", "Widowed")),
+        rng.choice(("Employed", "Self-employed", "Unemployed")), rng.choice(("Teacher", "Driver", "Vendor", "Nurse")),
+        rng.choice(("Mother", "Father", "Guardian")), None, f"09{rng.randrange(10 ** 9):09d}",
+        ", ".join(rng.sample(CREDENTIALS, rng.randrange(1, len(CREDENTIALS)))), rng.choice(("Yes", "No")),
+        None, full_name, _weighted(rng, STATUSES), submitted_at,
+        full_name, student[1],
+    )
+    return student, application
+
+
+def seed_database(path: Path, rows: int) -> None:
+    # Written under a temporary name so an interrupted seed is never reused.
+    partial = path.with_name(path.name + ".partial")
+    for leftover in (partial, Path(f"{partial}-wal"), Path(f"{partial}-shm")):
+        leftover.unlink(missing_ok=True)
+    pool = ConnectionPool(partial, size=1, timeout=10, busy_timeout=30)
+    rng = random.Random(rows)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    started = time.perf_counter()
+    with pool.connection() as conn:
+        migrate(pool, conn)
+        conn.execute("PRAGMA synchronous = OFF;")
+        for first in range(1, rows + 1, SEED_CHUNK_ROWS):
+            batch = [_synthetic_rows(rng, row_id, now) for row_id in range(first, min(first + SEED_CHUNK_ROWS, rows + 1))]
+            conn.executemany(STUDENT_SEED_SQL, [student for student, _ in batch])
+            conn.executemany(APPLICATION_SEED_SQL, [application for _, application in batch])
+            conn.commit()
+            print(f"seeded {first + len(batch) - 1}/{rows} rows", file=sys.stderr)
+        rebuild_typed_columns(conn)
+        conn.commit()
+        conn.execute("ANALYZE")
+        conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+    pool.close_all()
+    partial.replace(path)
+    print(f"seeded {path} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+def _fresh_copy(seed: Path, target: Path) -> None:
+    for stale in (target, Path(f"{target}-wal"), Path(f"{target}-shm")):
+        stale.unlink(missing_ok=True)
+    shutil.copyfile(seed, target)
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _is_lock_error(status: int, body: bytes) -> bool:
+    return status == 503 or (status == 500 and b"locked" in body)
+
+
+def _enroll_payload(number: int) -> dict:
+    return {
+        "lrn": f"{900000000000 + number}",
+        "surname": "Benchmark",
+        "givenName": f"Student {number}",
+        "gmail": f"bench.{number}@example.com",
+        "contactNo": "09171234567",
+        "address": "Gov. Pascual Ave, Malabon",
+        "dob": "2009-05-14",
+        "sex": "Female",
+        "nationality": "Filipino",
+        "yearLevel": "Grade 11",
+        "track": "Academic Track",
+        "academicStrand": "STEM",
+        "generalAverage": "91.50",
+        "jhsGraduated": "Malabon National High School",
+        "medicalConditions": ["Asthma"],
+        "guardianName": "Benchmark Guardian",
+        "cellphoneNo": "09181234567",
+        "credentialsSubmitted": ["Form 138", "PSA Birth Certificate"],
+    }
+
+
+def make_request_factory(endpoint: str, max_id: int):
+    # Returns rng -> (method, path, json body or None).
+    counter = itertools.count(1)
+    if endpoint == "enroll":
+        # Unique LRNs across threads and runs of the same process.
+        offset = int(time.time() * 1000) % 10 ** 7 * 1000
+        return lambda rng: ("POST", "/api/enroll", _enroll_payload(offset + next(counter)))
+    if endpoint == "list":
+        return lambda rng: ("GET", f"/api/applications?{rng.choice(LIST_QUERIES)}", None)
+    if endpoint == "detail":
+        return lambda rng: ("GET", f"/api/applications/{rng.randint(1, max(1, max_id))}", None)
+    if endpoint == "home":
+        return lambda rng: ("GET", "/", None)
+    raise ValueError(f"Unknown endpoint {endpoint!r}")
+
+
+def run_load(send, make_request, concurrency: int, requests: int, warmup: int) -> dict:
+    # `send(state, method, path, body)` returns (status, body); state is a
+    # per-thread dict so drivers can keep a client or connection per thread.
+    latencies, statuses = [], {}
+    transport_errors = 0
+    lock = threading.Lock()
+    remaining = itertools.count()
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(seed: int) -> None:
+        nonlocal transport_errors
+        rng = random.Random(seed)
+        state: dict = {}
+        for _ in range(warmup // concurrency):
+            try:
+                send(state, *make_request(rng))
+            except OSError:
+                state.clear()
+        local_latencies, local_statuses, local_errors = [], {}, 0
+        barrier.wait()
+        while next(remaining) < requests:
+            method, path, body = make_request(rng)
+            started = time.perf_counter()
+            try:
+                status, payload = send(state, method, path, body)
+            except OSError:
+                state.clear()
+                local_errors += 1
+                continue
+            local_latencies.append(time.perf_counter() - started)
+            key = "lock_error" if _is_lock_error(status, payload) else str(status)
+            local_statuses[key] = local_statuses.get(key, 0) + 1
+        with lock:
+            latencies.extend(local_latencies)
+            for key, count in local_statuses.items():
+                statuses[key] = statuses.get(key, 0) + count
+            transport_errors += local_errors
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ok = sum(count for key, count in statuses.items() if key.startswith("2"))
+    result = {
+        "concurrency": concurrency,
+        "requests": len(latencies) + transport_errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(ok / elapsed, 1) if elapsed else 0.0,
+        "ok": ok,
+        "lock_errors": statuses.get("lock_error", 0),
+        "other_errors": len(latencies) - ok - statuses.get("lock_error", 0),
+        "transport_errors": transport_errors,
+        "statuses": dict(sorted(statuses.items())),
+    }
+    if latencies:
+        result["latency_ms"] = {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3),
+            "p50": round(_percentile(latencies, 0.50) * 1000, 3),
+            "p95": round(_percentile(latencies, 0.95) * 1000, 3),
+            "p99": round(_percentile(latencies, 0.99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3),
+        }
+    return result
+
+
+def _load_app():
+    import app as app_module
+
+    flask_app = app_module.app
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    cookie = (flask_app.config["SESSION_COOKIE_NAME"], serializer.dumps({"admin_logged_in": True}))
+    with app_module.get_conn() as conn:
+        max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM applications").fetchone()[0]
+    return flask_app, cookie, max_id
+
+
+def child_test_client(args) -> None:
+    flask_app, (cookie_name, cookie_value), max_id = _load_app()
+
+    def send(state, method, path, body):
+        client = state.get("client")
+        if client is None:
+            client = state["client"] = flask_app.test_client()
+            client.set_cookie(cookie_name, cookie_value)
+        response = client.open(path, method=method, json=body)
+        return response.status_code, response.get_data()
+
+    results = []
+    for endpoint in args.endpoints:
+        for concurrency in args.concurrency:
+            result = run_load(send, make_request_factory(endpoint, max_id), concurrency, args.requests, args.warmup)
+            results.append({"driver": "test-client", "endpoint": endpoint, **result})
+            print(f"test-client {endpoint} c={concurrency}: {result.get('latency_ms')}", file=sys.stderr)
+    Path(args.result_file).write_text(json.dumps(results), encoding="utf-8")
+
+
+def child_serve(args) -> None:
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class KeepAliveHandler(WSGIRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_request(self, *args, **kwargs) -> None:
+            pass
+
+    flask_app, cookie, max_id = _load_app()
+    server = make_server("127.0.0.1", 0, flask_app, threaded=True, request_handler=KeepAliveHandler)
+    ready = {"port": server.server_port, "cookie": list(cookie), "max_id": max_id}
+    tmp = Path(args.result_file + ".tmp")
+    tmp.write_text(json.dumps(ready), encoding="utf-8")
+    tmp.replace(args.result_file)
+    server.serve_forever()
+
+
+def _app_env(db_path: Path) -> dict:
+    env = dict(os.environ)
+    env.update(
+        DATABASE_URL=f"sqlite:///{db_path}",
+        # Every request comes from 127.0.0.1; the enroll limiter would
+        # otherwise turn most of the write benchmark into 429s.
+        RATE_LIMIT_STORE="memory",
+        ENROLL_RATE_LIMIT_MAX_REQUESTS=str(10 ** 9),
+        DB_SLOW_QUERY_MS="",
+        # The database is a throwaway copy, so bring it up to date in place.
+        DB_AUTO_MIGRATE="true",
+    )
+    return env
+
+
+def _spawn(mode: str, db_path: Path, result_file: Path, args) -> subprocess.Popen:
+    command = [
+        sys.executable, str(Path(__file__).resolve()), "--child", mode, "--result-file", str(result_file),
+        "--endpoints", ",".join(args.endpoints), "--concurrency", ",".join(map(str, args.concurrency)),
+        "--requests", str(args.requests), "--warmup", str(args.warmup),
+    ]
+    # The app prints startup banners; keep stdout for the JSON report.
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=_app_env(db_path), stdout=sys.stderr)
+
+
+def run_test_client(db_path: Path, workdir: Path, args) -> list:
+    result_file = workdir / "test-client.json"
+    result_file.unlink(missing_ok=True)
+    if _spawn("test-client", db_path, result_file, args).wait() != 0:
+        raise SystemExit("test-client run failed")
+    return json.loads(result_file.read_text(encoding="utf-8"))
+
+
+def run_wsgi(db_path: Path, workdir: Path, args) -> list:
+    ready_file = workdir / "wsgi-ready.json"
+    ready_file.unlink(missing_ok=True)
+    server = _spawn("serve", db_path, ready_file, args)
+    try:
+        deadline = time.monotonic() + 120
+        while not ready_file.exists():
+            if server.poll() is not None or time.monotonic() > deadline:
+                raise SystemExit("WSGI server did not start")
+            time.sleep(0.1)
+        ready = json.loads(ready_file.read_text(encoding="utf-8"))
+        cookie_header = f"{ready['cookie'][0]}={ready['cookie'][1]}"
+
+        def send(state, method, path, body):
+            connection = state.get("connection")
+            if connection is None:
+                connection = state["connection"] = http.client.HTTPConnection("127.0.0.1", ready["port"], timeout=60)
+            headers = {"Cookie": cookie_header}
+            data = None
+            if body is not None:
+                data = json.dumps(body).encode("utf-8")
+                headers["Content-Type"] = "application/json"
+            connection.request(method, path, body=data, headers=headers)
+            response = connection.getresponse()
+            payload = response.read()
+            if response.will_close:
+                connection.close()
+                state.clear()
+            return response.status, payload
+
+        results = []
+        for endpoint in args.endpoints:
+            for concurrency in args.concurrency:
+                result = run_load(send, make_request_factory(endpoint, ready["max_id"]), concurrency, args.requests, args.warmup)
+                results.append({"driver": "wsgi", "endpoint": endpoint, **result})
+                print(f"wsgi {endpoint} c={concurrency}: {result.get('latency_ms')}", file=sys.stderr)
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _int_list(text: str) -> list:
+    return [int(item) for item in text.split(",") if item.strip()]
+
+
+def _name_list(text: str) -> list:
+    return [item.strip() for item in text.split(",") if item.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the enrollment and admin endpoints.")
+    parser.add_argument("--rows", type=_int_list, default=[10000, 100000, 1000000])
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per endpoint and concurrency level")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--drivers", type=_name_list, default=["test-client", "wsgi"])
+    parser.add_argument("--endpoints", type=_name_list, default=["enroll", "list", "detail", "home"])
+    parser.add_argument("--workdir", type=Path, default=Path(tempfile.gettempdir()) / "enrollment-bench")
+    parser.add_argument("--reseed", action="store_true", help="rebuild cached seed databases")
+    parser.add_argument("--out", type=Path, help="also write the report to this file")
+    parser.add_argument("--child", choices=("test-client", "serve"), help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == "test-client":
+        return child_test_client(args)
+    if args.child == "serve":
+        return child_serve(args)
+
+    started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    args.workdir = args.workdir.resolve()
+    args.workdir.mkdir(parents=True, exist_ok=True)
+    drivers = {"test-client": run_test_client, "wsgi": run_wsgi}
+    runs = []
+    for rows in args.rows:
+        seed = args.workdir / f"seed-{rows}.db"
+        if args.reseed or not seed.exists():
+            seed_database(seed, rows)
+        db_path = args.workdir / f"run-{rows}.db"
+        for driver in args.drivers:
+            _fresh_copy(seed, db_path)
+            runs.extend({"rows": rows, **result} for result in drivers[driver](db_path, args.workdir, args))
+
+    report = {
+        "meta": {
+            "git_revision": _git_revision(),
+            "started_at": started_at,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "settings": {
+                key: os.environ.get(key, "")
+                for key in ("DB_POOL_SIZE", "DB_BUSY_TIMEOUT_SECONDS", "ENROLL_GROUP_COMMIT")
+            },
+        },
+        "results": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        args.out.write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
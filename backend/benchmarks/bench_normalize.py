@@ -0,0 +1,196 @@
+import json
+import statistics
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from enrollment import normalize_enrollment  # noqa: E402
+
+# Micro-benchmark for enrollment payload normalization.
+# Usage: python benchmarks/bench_normalize.py [iterations]
+# Prints per-payload cost in microseconds for the closure-based normalizer that
+# enroll() used to rebuild on every call ("before") and the precompiled
+# schema-driven one in enrollment.py ("after").
+
+SAMPLE_PAYLOADS = {
+    "full_form": {
+        "lrn": "123456789012",
+        "surname": "Dela Cruz",
+        "givenName": "Juan",
+        "middleName": "Santos",
+        "gmail": "juan@example.com",
+        "contactNo": "09171234567",
+        "address": "Gov. Pascual Ave, Malabon",
+        "dob": "2009-05-14",
+        "pob": "Malabon",
+        "sex": "Male",
+        "nationality": "Filipino",
+        "yearLevel": "Grade 11",
+        "generalAverage": "91.5",
+        "track": "TVL Track",
+        "tvlSpec": "ICT",
+        "jhsGraduated": "Malabon National High School",
+        "dateGraduation": "2025-06-01",
+        "medicalConditions": ["Asthma"],
+        "medicalOther": "",
+        "howSupported": "Parents",
+        "guardianName": "Maria Dela Cruz",
+        "civilStatus": "Married",
+        "guardianEmployment": "Employed",
+        "occupation": "Teacher",
+        "relationship": "Mother",
+        "telNo": "82921234",
+        "cellphoneNo": "09181234567",
+        "credentialsSubmitted": ["Form 138", "PSA Birth Certificate"],
+        "firstTimeAU": "Yes",
+        "enrolledYear": "",
+        "studentSignature": "Juan Dela Cruz",
+    },
+    "minimal": {"lrn": "123456789012", "fullName": "Juan Dela Cruz"},
+    "invalid_contact": {"lrn": "123456789012", "fullName": "Juan Dela Cruz", "contact": "0917-123"},
+    "missing_tvl_spec": {"lrn": "123456789012", "fullName": "Juan", "track": "TVL Track", "telNo": "x"},
+}
+
+
+def legacy_normalize(data) -> tuple:
+    if not isinstance(data, dict):
+        return None, "Invalid enrollment payload."
+
+    def clean(v):
+        if v is None:
+            return ""
+        s = str(v).strip()
+        if s.lower() in {"", "none", "null", "undefined"}:
+            return ""
+        return s
+
+    def pick(*keys):
+        for key in keys:
+            v = clean(data.get(key))
+            if v:
+                return v
+        return ""
+
+    # Normalize payload aliases coming from different frontend versions
+    lrn = pick("lrn")
+    fullName = pick("fullName")
+    if not fullName:
+        fullName = " ".join(filter(None, [pick("surname"), pick("givenName"), pick("middleName")]))
+
+    gradeLevel = pick("gradeLevel", "yearLevel") or "N/A"
+    generalAve = pick("generalAve", "generalAverage")
+
+    track = pick("track")
+    strand = pick("strand")
+    if not strand and track == "Academic Track":
+        strand = pick("academicStrand")
+    elif not strand and track == "TVL Track":
+        strand = "TVL"
+
+    # Minimal required fields
+    required = {
+        "lrn": lrn,
+        "fullName": fullName,
+    }
+    missing = [k for k, v in required.items() if not v]
+    if missing:
+        return None, f"Missing: {', '.join(missing)}"
+
+    # --- Student core ---
+
+    email = pick("email", "gmail") or None
+    contact = pick("contact", "contactNo") or None
+    address = (data.get("address") or "").strip() or None
+
+    if contact and (not contact.isdigit() or len(contact) != 11):
+        return None, "Contact number must be exactly 11 digits."
+
+    # --- Extra student info (optional but in your form) ---
+    dob = (data.get("dob") or "").strip() or None
+    pob = (data.get("pob") or "").strip() or None
+    sex = (data.get("sex") or "").strip() or None
+    nationality = (data.get("nationality") or "").strip() or None
+
+    # --- School history ---
+    jhsGraduated = (data.get("jhsGraduated") or "").strip() or None
+    dateGraduation = (data.get("dateGraduation") or "").strip() or None
+
+    # --- Enrollment details ---
+    strand = strand or None
+
+    tvlSpec = (data.get("tvlSpec") or "").strip() or None
+    if strand == "TVL" and not tvlSpec:
+        return None, "TVL specialization is required"
+
+    # --- Medical ---
+    medicalConditions = data.get("medicalConditions") or []
+    if not isinstance(medicalConditions, list):
+        # if client accidentally sends a string
+        medicalConditions = [str(medicalConditions)]
+    medicalOther = (data.get("medicalOther") or "").strip() or None
+    howSupported = (data.get("howSupported") or "").strip() or None
+
+    # --- Guardian ---
+    guardianName = (data.get("guardianName") or "").strip() or None
+    guardianCivilStatus = pick("guardianCivilStatus", "civilStatus") or None
+    guardianEmployment = pick("guardianEmployment") or None
+    guardianOccupation = pick("guardianOccupation", "occupation") or None
+    guardianRelationship = pick("guardianRelationship", "relationship") or None
+    guardianTel = pick("guardianTel", "telNo") or None
+    guardianContact = pick("guardianContact", "cellphoneNo") or None
+
+    if guardianTel and (not guardianTel.isdigit()):
+        return None, "Telephone number must contain digits only."
+
+    if guardianContact and (not guardianContact.isdigit() or len(guardianContact) != 11):
+        return None, "Guardian cellphone number must be exactly 11 digits."
+
+    # --- Credentials + pledge ---
+    raw_credentials = data.get("credentialsSubmitted") or []
+    if isinstance(raw_credentials, list):
+        picked_credentials = [str(v).strip() for v in raw_credentials if str(v).strip()]
+    else:
+        picked_credentials = [str(raw_credentials).strip()] if str(raw_credentials).strip() else []
+    credentialsSubmitted = ", ".join(picked_credentials) if picked_credentials else None
+    firstTimeAU = (data.get("firstTimeAU") or "").strip() or None
+    enrolledYear = (data.get("enrolledYear") or "").strip() or None
+    studentSignature = (data.get("studentSignature") or "").strip() or None
+
+    student = (
+        lrn, fullName, email, contact, address,
+        dob, pob, sex, nationality,
+    )
+    application = (
+        gradeLevel, strand, tvlSpec, generalAve,
+
+        jhsGraduated, dateGraduation,
+
+        json.dumps(medicalConditions), medicalOther, howSupported,
+
+        guardianName, guardianCivilStatus, guardianEmployment,
+        guardianOccupation, guardianRelationship, guardianTel, guardianContact,
+
+        credentialsSubmitted, firstTimeAU, enrolledYear, studentSignature,
+    )
+    return {"student": student, "application": application}, None
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    results = {}
+    for name, payload in SAMPLE_PAYLOADS.items():
+        if legacy_normalize(payload) != normalize_enrollment(payload):
+            raise SystemExit(f"Normalizers disagree on payload {name!r}")
+        timings = {}
+        for label, func in (("before", legacy_normalize), ("after", normalize_enrollment)):
+            runs = timeit.repeat(lambda: func(payload), number=iterations, repeat=5)
+            timings[f"{label}_us"] = round(statistics.median(runs) / iterations * 1e6, 3)
+        timings["speedup"] = round(timings["before_us"] / timings["after_us"], 2)
+        results[name] = timings
+    print(json.dumps({"iterations": iterations, "payloads": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
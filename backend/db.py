@@ -1,25 +1,498 @@
 import os
+import queue
+import random
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+from enrollment import csv_items, json_items, parse_average, parse_date
+from migrations import SchemaBehindError, current_version, latest_version, migrate
 
 BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "data"
 DB_PATH = DATA_DIR / "enrollment.db"
 
-def get_conn() -> sqlite3.Connection:
-    DATA_DIR.mkdir(exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON;")
-    conn.execute("PRAGMA journal_mode = WAL;")
-    return conn
-
-def init_db() -> None:
-    schema_path = BASE_DIR / "schema.sql"
-    with get_conn() as conn:
-        conn.executescript(schema_path.read_text(encoding="utf-8"))
+
+class PoolTimeoutError(RuntimeError):
+    pass
+
+
+# Optional callback(kind, seconds) for every timed database operation, where
+# kind is "query", "lock_wait" (BEGIN IMMEDIATE), "commit" or "pool_wait".
+_query_observer: Optional[Callable] = None
+
+
+def set_query_observer(observer: Optional[Callable]) -> None:
+    global _query_observer
+    _query_observer = observer
+
+
+def observe_query(kind: str, seconds: float) -> None:
+    observer = _query_observer
+    if observer is not None:
+        observer(kind, seconds)
+
+
+# Optional callback(conn, sql, params, seconds) for statements that took at
+# least _slow_query_seconds; params is None for executemany batches.
+_slow_query_hook: Optional[Callable] = None
+_slow_query_seconds = 0.0
+
+
+def set_slow_query_hook(hook: Optional[Callable], threshold_seconds: float = 0.0) -> None:
+    global _slow_query_hook, _slow_query_seconds
+    _slow_query_seconds = threshold_seconds
+    _slow_query_hook = hook
+
+
+def observe_statement(conn, sql: str, params, seconds: float) -> None:
+    # Taking the write lock is where SQLite writers wait on each other.
+    kind = "lock_wait" if sql.lstrip()[:15].upper() == "BEGIN IMMEDIATE" else "query"
+    observe_query(kind, seconds)
+    hook = _slow_query_hook
+    if hook is not None and seconds >= _slow_query_seconds:
+        hook(conn, sql, params, seconds)
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            observe_statement(self.connection, sql, parameters, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            observe_statement(self.connection, sql, None, time.perf_counter() - started)
+
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self) -> None:
+        started = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            observe_query("commit", time.perf_counter() - started)
+
+
+class ConnectionPool:
+    dialect = "sqlite"
+
+    def __init__(
+        self, db_path: Path, size: int, timeout: float, busy_timeout: float, health_check_idle: float = 30.0
+    ) -> None:
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.busy_timeout = busy_timeout
+        self.health_check_idle = health_check_idle
+        self._idle: queue.LifoQueue = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._stats = {"checkouts": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0, "replaced": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            self.db_path, timeout=self.busy_timeout, check_same_thread=False, factory=TimedConnection
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON;")
+        conn.execute("PRAGMA journal_mode = WAL;")
+        return conn
+
+    def _needs_check(self, conn: sqlite3.Connection) -> bool:
+        # A round trip on every checkout is wasted on connections that were
+        # just used; only those idle for a while or that saw an error are checked.
+        if getattr(conn, "suspect", False):
+            return True
+        return time.monotonic() - getattr(conn, "released_at", 0.0) >= self.health_check_idle
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        # A plain cursor, so the check stays out of /metrics and the slow-query log.
+        try:
+            sqlite3.Cursor(conn).execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _acquire(self) -> sqlite3.Connection:
+        started = time.perf_counter()
+        opening = False
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._opened < self.size:
+                    self._opened += 1
+                    opening = True
+            if opening:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise PoolTimeoutError(f"Timed out after {self.timeout}s waiting for a database connection.")
+
+        if not opening and self._needs_check(conn):
+            if self._is_healthy(conn):
+                conn.suspect = False
+            else:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+                with self._lock:
+                    self._stats["replaced"] += 1
+
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["wait_seconds_total"] += waited
+            self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+        observe_query("pool_wait", waited)
+        return conn
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.released_at = time.monotonic()
+        self._idle.put_nowait(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            # Nested get_conn() on the same thread shares the outer checkout.
+            self._local.depth += 1
+            try:
+                yield held
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        self._local.depth = 1
+        try:
+            with conn:
+                yield conn
+        except sqlite3.Error:
+            conn.suspect = True
+            raise
+        finally:
+            self._local.conn = None
+            self._local.depth = 0
+            self._release(conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = self.size
+            stats["open"] = self._opened
+        stats["idle"] = self._idle.qsize()
+        checkouts = stats["checkouts"]
+        stats["wait_seconds_avg"] = stats["wait_seconds_total"] / checkouts if checkouts else 0.0
+        return stats
+
+    def init_schema(self, conn: sqlite3.Connection) -> None:
+        if _needs_typed_columns(conn):
+            _add_typed_columns(conn)
+        conn.executescript((BASE_DIR / "schema.sql").read_text(encoding="utf-8"))
         if _has_unique_lrn(conn):
             _drop_unique_lrn(conn)
+        if _search_index_needs_backfill(conn):
+            rebuild_search_index(conn)
+        if application_stats_need_backfill(conn):
+            rebuild_application_stats(conn)
+
+    def describe(self) -> str:
+        return str(self.db_path)
+
+    def close_all(self) -> None:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _is_postgres_url(url: str) -> bool:
+    return url.startswith(("postgres://", "postgresql://"))
+
+
+def _sqlite_path(url: str) -> Path:
+    # "sqlite:///relative.db" or "sqlite:////abs/path.db"; empty means the bundled file.
+    if url.startswith("sqlite:///"):
+        return Path(url[len("sqlite:///"):])
+    return DB_PATH
+
+
+def get_pool():
+    global _pool
+    pid = os.getpid()
+    if _pool is None or _pool._pid != pid:
+        with _pool_lock:
+            # One pool per worker process; connections must never cross a fork.
+            # Settings are read here, not at import, so backend/.env applies.
+            if _pool is None or _pool._pid != pid:
+                database_url = os.environ.get("DATABASE_URL", "").strip()
+                size = max(1, int(os.environ.get("DB_POOL_SIZE", "8")))
+                timeout = float(os.environ.get("DB_POOL_TIMEOUT_SECONDS", "10"))
+                if _is_postgres_url(database_url):
+                    from db_postgres import PostgresBackend
+
+                    _pool = PostgresBackend(database_url, size=size, timeout=timeout)
+                else:
+                    _pool = ConnectionPool(
+                        _sqlite_path(database_url),
+                        size=size,
+                        timeout=timeout,
+                        busy_timeout=float(os.environ.get("DB_BUSY_TIMEOUT_SECONDS", "5")),
+                        health_check_idle=float(os.environ.get("DB_POOL_HEALTH_CHECK_IDLE_SECONDS", "30")),
+                    )
+    return _pool
+
+
+def get_conn():
+    return get_pool().connection()
+
+
+def dialect() -> str:
+    return get_pool().dialect
+
+
+def describe_database() -> str:
+    return get_pool().describe()
+
+
+def pool_stats() -> dict:
+    return get_pool().stats()
+
+
+def iter_rows(conn, sql: str, params=()):
+    # Streams a result set without buffering it: sqlite3 cursors already step
+    # lazily, PostgreSQL needs a server-side cursor.
+    if hasattr(conn, "iterate"):
+        return conn.iterate(sql, params)
+    return conn.execute(sql, params)
+
+
+def is_locked_error(error: Exception) -> bool:
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+def retry_on_locked(fn: Callable, attempts: Optional[int] = None):
+    attempts = attempts or max(1, int(os.environ.get("DB_LOCK_RETRY_ATTEMPTS", "4")))
+    base_delay = float(os.environ.get("DB_LOCK_RETRY_BASE_DELAY_MS", "25")) / 1000
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except sqlite3.OperationalError as e:
+            if not is_locked_error(e) or attempt == attempts - 1:
+                raise
+            # Jittered exponential backoff so retrying writers do not collide again.
+            time.sleep(base_delay * (2 ** attempt) * (0.5 + random.random()))
+
+
+def init_db(auto_migrate: bool = False) -> list:
+    # Worker startup: a version check and nothing else once `flask migrate`
+    # has run for this release. Pending migrations are applied here only when
+    # auto_migrate is on (development, single-process setups); the migration
+    # lock keeps concurrent workers from running them twice. Otherwise a
+    # schema that is behind raises instead of serving against old tables.
+    backend = get_pool()
+    with backend.connection() as conn:
+        version = current_version(conn, backend.dialect)
+        latest = latest_version(backend.dialect)
+        if version >= latest:
+            return []
+        if not auto_migrate:
+            raise SchemaBehindError(
+                f"database schema is at version {version}, this release needs {latest}. Run `flask migrate`."
+            )
+        return migrate(backend, conn)
+
+
+def _search_index_needs_backfill(conn: sqlite3.Connection) -> bool:
+    has_applications = conn.execute("SELECT 1 FROM applications LIMIT 1").fetchone()
+    has_index_rows = conn.execute("SELECT 1 FROM applicant_search LIMIT 1").fetchone()
+    return bool(has_applications) and not has_index_rows
+
+
+def rebuild_search_index(conn: sqlite3.Connection) -> int:
+    conn.execute("DELETE FROM applicant_search")
+    cur = conn.execute(
+        """
+        INSERT INTO applicant_search (rowid, fullName, lrn, email, guardianName, jhsGraduated, credentialsSubmitted)
+        SELECT a.id, s.fullName, s.lrn, s.email, a.guardianName, a.jhsGraduated, a.credentialsSubmitted
+        FROM applications a
+        JOIN students s ON s.id = a.student_id
+        """
+    )
+    conn.execute("INSERT INTO applicant_search (applicant_search) VALUES ('optimize')")
+    conn.commit()
+    return cur.rowcount
+
+
+APPLICATION_STATS_DIMENSIONS = {
+    "status": "status",
+    "strand": "strand",
+    "tvlSpec": "tvlSpec",
+    "gradeLevel": "gradeLevel",
+    "day": "substr(submitted_at, 1, 10)",
+}
+
+
+def application_stats_need_backfill(conn) -> bool:
+    has_applications = conn.execute("SELECT 1 FROM applications LIMIT 1").fetchone()
+    has_stats = conn.execute("SELECT 1 FROM application_stats LIMIT 1").fetchone()
+    return bool(has_applications) and not has_stats
+
+
+def rebuild_application_stats(conn) -> int:
+    # Recounts from scratch; the triggers keep the table current afterwards.
+    # The DELETE comes first so SQLite holds the write lock while counting.
+    conn.execute("DELETE FROM application_stats")
+    for dimension, expression in APPLICATION_STATS_DIMENSIONS.items():
+        conn.execute(
+            f"""
+            INSERT INTO application_stats (dimension, value, total)
+            SELECT CAST(? AS TEXT), COALESCE({expression}, ''), COUNT(*)
+            FROM applications
+            GROUP BY COALESCE({expression}, '')
+            """,
+            (dimension,),
+        )
+    total = conn.execute("SELECT COUNT(*) FROM applications").fetchone()[0]
+    conn.commit()
+    return total
+
+
+def store_application_lists(conn, rows: list) -> None:
+    # rows: [(application id, medical conditions, credentials)] as returned by
+    # enrollment.application_lists().
+    medical = [(application_id, item) for application_id, conditions, _ in rows for item in conditions]
+    credentials = [(application_id, item) for application_id, _, submitted in rows for item in submitted]
+    if medical:
+        conn.executemany(
+            "INSERT INTO application_medical_conditions (application_id, medical_condition) VALUES (?, ?)"
+            " ON CONFLICT DO NOTHING",
+            medical,
+        )
+    if credentials:
+        conn.executemany(
+            "INSERT INTO application_credentials (application_id, credential) VALUES (?, ?) ON CONFLICT DO NOTHING",
+            credentials,
+        )
+
+
+def rebuild_typed_columns(conn, batch_size: int = 1000) -> int:
+    # Recomputes general_average, graduated_on, born_on and the junction
+    # tables from the submitted text. Walks the tables in id order so memory
+    # stays flat; the caller owns the transaction.
+    conn.execute("DELETE FROM application_medical_conditions")
+    conn.execute("DELETE FROM application_credentials")
+    total = last_id = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, generalAve, dateGraduation, medicalConditions, credentialsSubmitted"
+            " FROM applications WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_size),
+        ).fetchall()
+        if not rows:
+            break
+        conn.executemany(
+            "UPDATE applications SET general_average = ?, graduated_on = ? WHERE id = ?",
+            [(parse_average(row["generalAve"]), parse_date(row["dateGraduation"]), row["id"]) for row in rows],
+        )
+        store_application_lists(
+            conn,
+            [(row["id"], json_items(row["medicalConditions"]), csv_items(row["credentialsSubmitted"])) for row in rows],
+        )
+        total += len(rows)
+        last_id = rows[-1]["id"]
+
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, dob FROM students WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+        ).fetchall()
+        if not rows:
+            break
+        conn.executemany("UPDATE students SET born_on = ? WHERE id = ?", [(parse_date(row["dob"]), row["id"]) for row in rows])
+        last_id = rows[-1]["id"]
+    return total
+
+
+def duplicate_student_lrns(conn) -> list:
+    rows = conn.execute("SELECT lrn FROM students GROUP BY lrn HAVING COUNT(*) > 1 ORDER BY lrn").fetchall()
+    return [row["lrn"] for row in rows]
+
+
+def merge_duplicate_students(conn, lrns: list) -> dict:
+    # Folds every students row sharing an LRN into the newest one (it holds
+    # the latest submitted details) in one transaction. The search index
+    # follows through its student_id trigger.
+    if getattr(conn, "dialect", "sqlite") == "sqlite":
+        conn.execute("BEGIN IMMEDIATE")
+    moved = removed = 0
+    try:
+        for lrn in lrns:
+            keep_id = conn.execute("SELECT MAX(id) FROM students WHERE lrn = ?", (lrn,)).fetchone()[0]
+            if keep_id is None:
+                continue
+            moved += conn.execute(
+                "UPDATE applications SET student_id = ?"
+                " WHERE student_id IN (SELECT id FROM students WHERE lrn = ? AND id <> ?)",
+                (keep_id, lrn, keep_id),
+            ).rowcount
+            removed += conn.execute("DELETE FROM students WHERE lrn = ? AND id <> ?", (lrn, keep_id)).rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {"applications_moved": moved, "students_removed": removed}
 
 
 def _has_unique_lrn(conn: sqlite3.Connection) -> bool:
@@ -51,16 +524,17 @@ def _drop_unique_lrn(conn: sqlite3.Connection) -> None:
           pob TEXT,
           sex TEXT,
           nationality TEXT,
-          created_at TEXT DEFAULT CURRENT_TIMESTAMP
+          created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+          born_on TEXT
         );
 
         INSERT INTO students (
           id, lrn, fullName, email, contact, address,
-          dob, pob, sex, nationality, created_at
+          dob, pob, sex, nationality, created_at, born_on
         )
         SELECT
           id, lrn, fullName, email, contact, address,
-          dob, pob, sex, nationality, created_at
+          dob, pob, sex, nationality, created_at, born_on
         FROM students_old;
 
         DROP TABLE students_old;
@@ -71,3 +545,46 @@ def _drop_unique_lrn(conn: sqlite3.Connection) -> None:
     )
     conn.execute("PRAGMA foreign_keys = ON;")
 
+
+# Statements that bring a database created before the typed columns up to
+# date; schema.sql creates the same objects for new databases.
+TYPED_COLUMNS_MIGRATION = (
+    "ALTER TABLE students ADD COLUMN born_on TEXT",
+    "ALTER TABLE applications ADD COLUMN general_average REAL",
+    "ALTER TABLE applications ADD COLUMN graduated_on TEXT",
+    """
+    CREATE TABLE IF NOT EXISTS application_medical_conditions (
+      application_id INTEGER NOT NULL REFERENCES applications(id) ON DELETE CASCADE,
+      medical_condition TEXT NOT NULL,
+      PRIMARY KEY (application_id, medical_condition)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS application_credentials (
+      application_id INTEGER NOT NULL REFERENCES applications(id) ON DELETE CASCADE,
+      credential TEXT NOT NULL,
+      PRIMARY KEY (application_id, credential)
+    ) WITHOUT ROWID
+    """,
+)
+
+
+def _needs_typed_columns(conn: sqlite3.Connection) -> bool:
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info('applications')").fetchall()}
+    return bool(columns) and "general_average" not in columns
+
+
+def _add_typed_columns(conn: sqlite3.Connection) -> None:
+    # Columns, junction tables and backfill go in one transaction: an upgrade
+    # interrupted half way is rolled back and simply runs again on the next
+    # start. Re-checked under the write lock in case another worker won.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if _needs_typed_columns(conn):
+            for statement in TYPED_COLUMNS_MIGRATION:
+                conn.execute(statement)
+            rebuild_typed_columns(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
@@ -0,0 +1,222 @@
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator
+from urllib.parse import urlsplit, urlunsplit
+
+from db import (
+    application_stats_need_backfill,
+    observe_query,
+    observe_statement,
+    rebuild_application_stats,
+    rebuild_typed_columns,
+)
+
+try:
+    import psycopg
+    from psycopg_pool import ConnectionPool as PsycopgPool
+except ImportError:  # optional: only needed when DATABASE_URL points at PostgreSQL
+    psycopg = None
+    PsycopgPool = None
+
+BASE_DIR = Path(__file__).resolve().parent
+SCHEMA_PATH = BASE_DIR / "schema_postgres.sql"
+
+# PostgreSQL folds unquoted identifiers to lower case, so "fullName" comes back
+# as "fullname". Rows are renamed back to the camelCase names the API returns.
+_CANONICAL_NAMES = {
+    name.lower(): name
+    for name in re.findall(r"^\s+([a-z]+[A-Z]\w*)\s", (BASE_DIR / "schema.sql").read_text(encoding="utf-8"), re.M)
+}
+
+
+@lru_cache(maxsize=512)
+def _translate(sql: str) -> str:
+    # sqlite3 "?" placeholders -> psycopg "%s"; literal "%" must be doubled.
+    out = []
+    in_string = False
+    for char in sql:
+        if char == "'":
+            in_string = not in_string
+        if char == "%":
+            out.append("%%")
+        elif char == "?" and not in_string:
+            out.append("%s")
+        else:
+            out.append(char)
+    return "".join(out)
+
+
+class Row(dict):
+    # Mirrors the parts of sqlite3.Row the app relies on: access by column
+    # name, access by position, and dict(row).
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return list(self.values())[key]
+        return super().__getitem__(key)
+
+
+def _row_factory(cursor):
+    names = [_CANONICAL_NAMES.get(column.name, column.name) for column in (cursor.description or [])]
+
+    def make_row(values):
+        return Row(zip(names, values))
+
+    return make_row
+
+
+class PostgresCursor:
+    def __init__(self, raw, connection) -> None:
+        self.raw = raw
+        self.connection = connection
+
+    def execute(self, sql: str, params=()):
+        started = time.perf_counter()
+        try:
+            self.raw.execute(_translate(sql), tuple(params))
+        finally:
+            observe_statement(self.connection, sql, params, time.perf_counter() - started)
+        return self
+
+    def executemany(self, sql: str, seq_of_params):
+        started = time.perf_counter()
+        try:
+            self.raw.executemany(_translate(sql), [tuple(params) for params in seq_of_params])
+        finally:
+            observe_statement(self.connection, sql, None, time.perf_counter() - started)
+        return self
+
+    def fetchone(self):
+        return self.raw.fetchone()
+
+    def fetchall(self):
+        return self.raw.fetchall()
+
+    def __iter__(self):
+        return iter(self.raw)
+
+    @property
+    def rowcount(self) -> int:
+        return self.raw.rowcount
+
+
+class PostgresConnection:
+    dialect = "postgresql"
+
+    def __init__(self, raw) -> None:
+        self.raw = raw
+
+    def execute(self, sql: str, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql: str, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def executescript(self, script: str) -> None:
+        self.raw.execute(script)
+
+    def iterate(self, sql: str, params=(), batch_size: int = 500):
+        # Named cursors live on the server, so large result sets are fetched
+        # in batches instead of being buffered on the client.
+        with self.raw.cursor(name=f"stream_{threading.get_ident()}_{time.monotonic_ns()}") as cur:
+            cur.itersize = batch_size
+            cur.execute(_translate(sql), tuple(params))
+            yield from cur
+
+    def cursor(self) -> PostgresCursor:
+        return PostgresCursor(self.raw.cursor(), self)
+
+    def commit(self) -> None:
+        started = time.perf_counter()
+        try:
+            self.raw.commit()
+        finally:
+            observe_query("commit", time.perf_counter() - started)
+
+    def rollback(self) -> None:
+        self.raw.rollback()
+
+    @property
+    def in_transaction(self) -> bool:
+        return self.raw.info.transaction_status != psycopg.pq.TransactionStatus.IDLE
+
+
+class PostgresBackend:
+    dialect = "postgresql"
+
+    def __init__(self, url: str, size: int, timeout: float) -> None:
+        if PsycopgPool is None:
+            raise RuntimeError("DATABASE_URL points at PostgreSQL but psycopg / psycopg_pool are not installed.")
+        self.url = url
+        self.size = size
+        self.timeout = timeout
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._pool = PsycopgPool(
+            url,
+            min_size=1,
+            max_size=size,
+            timeout=timeout,
+            kwargs={"row_factory": _row_factory},
+            open=True,
+        )
+
+    @contextmanager
+    def connection(self) -> Iterator[PostgresConnection]:
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            # Nested get_conn() on the same thread shares the outer checkout.
+            yield held
+            return
+
+        started = time.perf_counter()
+        with self._pool.connection() as raw:
+            observe_query("pool_wait", time.perf_counter() - started)
+            conn = PostgresConnection(raw)
+            self._local.conn = conn
+            try:
+                yield conn
+            finally:
+                self._local.conn = None
+
+    def init_schema(self, conn: PostgresConnection) -> None:
+        # The script adds the typed columns to older databases; filling them
+        # in the same transaction means an interrupted upgrade is retried.
+        columns = {
+            row["column_name"]
+            for row in conn.execute(
+                "SELECT column_name FROM information_schema.columns"
+                " WHERE table_schema = current_schema() AND table_name = 'applications'"
+            ).fetchall()
+        }
+        conn.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
+        if columns and "general_average" not in columns:
+            rebuild_typed_columns(conn)
+        conn.commit()
+        if application_stats_need_backfill(conn):
+            rebuild_application_stats(conn)
+
+    def stats(self) -> dict:
+        stats = self._pool.get_stats()
+        return {
+            "size": self.size,
+            "open": stats.get("pool_size", 0),
+            "idle": stats.get("pool_available", 0),
+            "checkouts": stats.get("requests_num", 0),
+            "wait_seconds_total": stats.get("requests_wait_ms", 0) / 1000,
+            "timeouts": stats.get("requests_errors", 0),
+        }
+
+    def describe(self) -> str:
+        parts = urlsplit(self.url)
+        netloc = parts.hostname or ""
+        if parts.port:
+            netloc = f"{netloc}:{parts.port}"
+        return urlunsplit((parts.scheme, netloc, parts.path, "", ""))
+
+    def close_all(self) -> None:
+        self._pool.close()
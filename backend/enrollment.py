@@ -0,0 +1,317 @@
+import json
+from datetime import datetime
+from json.encoder import encode_basestring_ascii
+from typing import Callable, Optional
+
+# Values the different frontend versions send for "not answered".
+_EMPTY_MARKERS = frozenset({"none", "null", "undefined"})
+
+
+# One enrollment column: where to read it from and how to validate it.
+#   kind "pick" - first non-empty alias; "none"/"null"/"undefined" count as empty
+#   kind "text" - single key, stripped, empty -> None
+#   kind "json" - list (a lone value is wrapped) stored as a JSON string
+#   kind "csv"  - list (or lone value) of non-empty strings, comma-joined
+# required_if=(other, value) makes the field mandatory when `other` normalized
+# to `value`; `error` is the message for any failed check on the field.
+class Field:
+    __slots__ = ("name", "aliases", "kind", "default", "required", "required_if", "digits", "length", "error", "reader")
+
+    def __init__(
+        self,
+        name: str,
+        aliases: tuple = (),
+        kind: str = "text",
+        default=None,
+        required: bool = False,
+        required_if: Optional[tuple] = None,
+        digits: bool = False,
+        length: Optional[int] = None,
+        error: Optional[str] = None,
+        reader: Optional[Callable] = None,
+    ) -> None:
+        self.name = name
+        self.aliases = aliases
+        self.kind = kind
+        self.default = default
+        self.required = required
+        self.required_if = required_if
+        self.digits = digits
+        self.length = length
+        self.error = error
+        self.reader = reader
+
+
+def _clean(value) -> str:
+    if value is None:
+        return ""
+    text = (value if value.__class__ is str else str(value)).strip()
+    if len(text) < 10 and text.lower() in _EMPTY_MARKERS:
+        return ""
+    return text
+
+
+def _csv_list(value):
+    if not value:
+        return None
+    if not isinstance(value, list):
+        value = [value]
+    picked = [text for item in value if (text := str(item).strip())]
+    return ", ".join(picked) if picked else None
+
+
+def _text(value):
+    if not value:
+        return None
+    return (value if value.__class__ is str else str(value)).strip() or None
+
+
+def _json_list(value) -> str:
+    if not value:
+        return "[]"
+    if not isinstance(value, list):
+        # if client accidentally sends a string
+        value = [str(value)]
+    try:
+        # Same text as json.dumps for the usual list of strings, without
+        # building an encoder per call.
+        return "[" + ", ".join(map(encode_basestring_ascii, value)) + "]"
+    except TypeError:
+        return json.dumps(value)
+
+
+def _read_full_name(data: dict):
+    full_name = _clean(data.get("fullName"))
+    if full_name:
+        return full_name
+    return " ".join([part for key in ("surname", "givenName", "middleName") if (part := _clean(data.get(key)))])
+
+
+def _read_strand(data: dict):
+    strand = _clean(data.get("strand"))
+    if not strand:
+        track = _clean(data.get("track"))
+        if track == "Academic Track":
+            strand = _clean(data.get("academicStrand"))
+        elif track == "TVL Track":
+            strand = "TVL"
+    return strand or None
+
+
+STUDENT_FIELDS = (
+    Field("lrn", kind="pick", default="", required=True),
+    Field("fullName", default="", required=True, reader=_read_full_name),
+    Field("email", aliases=("gmail",), kind="pick"),
+    Field("contact", aliases=("contactNo",), kind="pick", digits=True, length=11,
+          error="Contact number must be exactly 11 digits."),
+    Field("address"),
+    Field("dob"),
+    Field("pob"),
+    Field("sex"),
+    Field("nationality"),
+)
+
+APPLICATION_FIELDS = (
+    Field("gradeLevel", aliases=("yearLevel",), kind="pick", default="N/A"),
+    Field("strand", reader=_read_strand),
+    Field("tvlSpec", required_if=("strand", "TVL"), error="TVL specialization is required"),
+    Field("generalAve", aliases=("generalAverage",), kind="pick", default=""),
+    Field("jhsGraduated"),
+    Field("dateGraduation"),
+    Field("medicalConditions", kind="json"),
+    Field("medicalOther"),
+    Field("howSupported"),
+    Field("guardianName"),
+    Field("guardianCivilStatus", aliases=("civilStatus",), kind="pick"),
+    Field("guardianEmployment", kind="pick"),
+    Field("guardianOccupation", aliases=("occupation",), kind="pick"),
+    Field("guardianRelationship", aliases=("relationship",), kind="pick"),
+    Field("guardianTel", aliases=("telNo",), kind="pick", digits=True,
+          error="Telephone number must contain digits only."),
+    Field("guardianContact", aliases=("cellphoneNo",), kind="pick", digits=True, length=11,
+          error="Guardian cellphone number must be exactly 11 digits."),
+    Field("credentialsSubmitted", kind="csv"),
+    Field("firstTimeAU"),
+    Field("enrolledYear"),
+    Field("studentSignature"),
+)
+
+
+def _converter(field: Field) -> Callable:
+    # data -> the field's normalized value.
+    if field.reader is not None:
+        return field.reader
+    name = field.name
+    if field.kind == "pick":
+        default = field.default
+        if not field.aliases:
+            return lambda data: _clean(data.get(name)) or default
+        if len(field.aliases) == 1:
+            alias = field.aliases[0]
+            return lambda data: _clean(data.get(name)) or _clean(data.get(alias)) or default
+        keys = (name, *field.aliases)
+
+        def pick(data):
+            for key in keys:
+                value = _clean(data.get(key))
+                if value:
+                    return value
+            return default
+
+        return pick
+    convert = {"json": _json_list, "csv": _csv_list}.get(field.kind, _text)
+    return lambda data: convert(data.get(name))
+
+
+def _checker(field: Field, positions: dict, required: tuple, last: bool) -> Optional[Callable]:
+    # (value, values so far) -> error message or None; None when the field
+    # has nothing to check.
+    checks = []
+    if last:
+        def check_missing(value, values):
+            missing = [name for position, name in required if not values[position]]
+            return "Missing: " + ", ".join(missing) if missing else None
+
+        checks.append(check_missing)
+    error = field.error
+    if field.required_if is not None:
+        other, expected = positions[field.required_if[0]], field.required_if[1]
+        checks.append(lambda value, values: error if not value and values[other] == expected else None)
+    elif field.digits and field.length is not None:
+        length = field.length
+        checks.append(lambda value, values: error if value and (not value.isdigit() or len(value) != length) else None)
+    elif field.digits:
+        checks.append(lambda value, values: error if value and not value.isdigit() else None)
+    elif field.length is not None:
+        length = field.length
+        checks.append(lambda value, values: error if value and len(value) != length else None)
+    if len(checks) < 2:
+        return checks[0] if checks else None
+
+    def check_all(value, values):
+        for check in checks:
+            message = check(value, values)
+            if message:
+                return message
+        return None
+
+    return check_all
+
+
+def compile_normalizer(student_fields: tuple, application_fields: tuple) -> Callable:
+    # The schema is resolved once into a tuple of (key, convert, check) rules:
+    # convert is None for plain text, which is read inline, and check is the
+    # field's validation bound to its settings, or None for the many fields
+    # with nothing to check. Fields are read and checked in form order: the
+    # first error reported is the first one a user would hit, and a rejected
+    # payload stops early. The last required field also reports every required
+    # field left empty, as one "Missing: ..." error.
+    fields = student_fields + application_fields
+    positions = {field.name: index for index, field in enumerate(fields)}
+    required = tuple((index, field.name) for index, field in enumerate(fields) if field.required)
+    last_required = max((index for index, _ in required), default=-1)
+    rules = tuple(
+        (
+            field.name,
+            None if field.kind == "text" and field.reader is None else _converter(field),
+            _checker(field, positions, required, index == last_required),
+        )
+        for index, field in enumerate(fields)
+    )
+    split = len(student_fields)
+
+    def normalize(data):
+        if not isinstance(data, dict):
+            return None, "Invalid enrollment payload."
+        get = data.get
+        values = []
+        append = values.append
+        for key, convert, check in rules:
+            if convert is None:
+                value = get(key)
+                value = (value.strip() or None) if value.__class__ is str else _text(value)
+            else:
+                value = convert(data)
+            append(value)
+            if check is not None:
+                error = check(value, values)
+                if error:
+                    return None, error
+        return {"student": tuple(values[:split]), "application": tuple(values[split:])}, None
+
+    return normalize
+
+
+normalize_enrollment = compile_normalizer(STUDENT_FIELDS, APPLICATION_FIELDS)
+
+
+# Typed copies of free-text answers. The submitted text is stored (and
+# returned) unchanged; these feed the indexed general_average, graduated_on
+# and born_on columns and the credential / medical-condition junction tables.
+# Values that do not parse are stored as NULL rather than rejected.
+_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m-%d-%Y", "%Y/%m/%d", "%B %d, %Y", "%b %d, %Y", "%d %B %Y")
+STUDENT_FIELD_INDEX = {field.name: index for index, field in enumerate(STUDENT_FIELDS)}
+APPLICATION_FIELD_INDEX = {field.name: index for index, field in enumerate(APPLICATION_FIELDS)}
+
+
+def parse_average(text) -> Optional[float]:
+    if not text:
+        return None
+    try:
+        value = float(str(text).strip().rstrip("%"))
+    except ValueError:
+        return None
+    return value if 0 <= value <= 100 else None
+
+
+def parse_date(text) -> Optional[str]:
+    # ISO "YYYY-MM-DD" for the formats date inputs and spreadsheets produce.
+    if not text:
+        return None
+    text = str(text).strip()
+    if len(text) > 10 and text[4:5] == "-" and text[10] in " T":
+        text = text[:10]
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def json_items(text) -> list:
+    # Distinct non-empty entries of a stored JSON list, in submitted order.
+    try:
+        items = json.loads(text) if text else []
+    except ValueError:
+        return []
+    if not isinstance(items, list):
+        return []
+    return list(dict.fromkeys(cleaned for cleaned in (str(item).strip() for item in items) if cleaned))
+
+
+def csv_items(text) -> list:
+    if not text:
+        return []
+    return list(dict.fromkeys(cleaned for cleaned in (item.strip() for item in text.split(",")) if cleaned))
+
+
+def typed_student(student: tuple) -> tuple:
+    # (born_on,) for a normalized student tuple.
+    return (parse_date(student[STUDENT_FIELD_INDEX["dob"]]),)
+
+
+def typed_application(application: tuple) -> tuple:
+    # (general_average, graduated_on) for a normalized application tuple.
+    return (
+        parse_average(application[APPLICATION_FIELD_INDEX["generalAve"]]),
+        parse_date(application[APPLICATION_FIELD_INDEX["dateGraduation"]]),
+    )
+
+
+def application_lists(application: tuple) -> tuple:
+    # (medical conditions, credentials) for a normalized application tuple.
+    return (
+        json_items(application[APPLICATION_FIELD_INDEX["medicalConditions"]]),
+        csv_items(application[APPLICATION_FIELD_INDEX["credentialsSubmitted"]]),
+    )
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 200
+
+
+class IdempotencyConflict(ValueError):
+    pass
+
+
+def payload_fingerprint(data) -> str:
+    # Key order and whitespace do not change the fingerprint.
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def request_key(header_value: Optional[str], fingerprint: str) -> str:
+    # Client keys and payload hashes live in separate namespaces so a client
+    # key can never collide with the fingerprint of someone else's form.
+    header_value = (header_value or "").strip()
+    if header_value:
+        return f"key:{header_value[:MAX_KEY_LENGTH]}"
+    return f"body:{fingerprint}"
+
+
+def find(conn, key: str, now: float) -> Optional[tuple]:
+    # (request fingerprint, application id) for a live key, else None.
+    row = conn.execute(
+        "SELECT request_hash, application_id FROM idempotency_keys WHERE key = ? AND expires_at > ?",
+        (key, int(now)),
+    ).fetchone()
+    return (row["request_hash"], row["application_id"]) if row else None
+
+
+def claim(conn, keys: set, now: float) -> dict:
+    # Live keys among `keys`: {key: (fingerprint, application id)}. Called
+    # inside the write transaction, so on SQLite the write lock already keeps
+    # concurrent retries apart; PostgreSQL takes a per-key advisory lock.
+    if getattr(conn, "dialect", "sqlite") == "postgresql":
+        for key in sorted(keys):
+            conn.execute("SELECT pg_advisory_xact_lock(hashtext(?))", (key,))
+    claimed = {}
+    for key in keys:
+        found = find(conn, key, now)
+        if found:
+            claimed[key] = found
+    return claimed
+
+
+def remember(conn, entries: list, now: float, ttl_seconds: int) -> None:
+    # entries: [(key, fingerprint, application id)]. Overwrites expired rows
+    # the sweeper has not reached yet.
+    conn.executemany(
+        """
+        INSERT INTO idempotency_keys (key, request_hash, application_id, expires_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (key) DO UPDATE SET
+          request_hash = excluded.request_hash,
+          application_id = excluded.application_id,
+          expires_at = excluded.expires_at
+        """,
+        [(key, fingerprint, application_id, int(now) + ttl_seconds) for key, fingerprint, application_id in entries],
+    )
+
+
+def purge_expired(conn, now: float, batch_size: int = 500) -> int:
+    # Small batches keep each delete transaction short next to enrollment writes.
+    removed = 0
+    while True:
+        deleted = conn.execute(
+            "DELETE FROM idempotency_keys WHERE key IN"
+            " (SELECT key FROM idempotency_keys WHERE expires_at <= ? LIMIT ?)",
+            (int(now), batch_size),
+        ).rowcount
+        conn.commit()
+        removed += max(0, deleted)
+        if deleted < batch_size:
+            return removed
+
+
+class ExpiredKeySweeper:
+    # Calls `sweep()` every `interval` seconds on a daemon thread. Started
+    # lazily and restarted after a fork, like the group-commit writer.
+    def __init__(self, sweep: Callable, interval: float) -> None:
+        self.sweep = sweep
+        self.interval = max(1.0, interval)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def ensure_running(self) -> None:
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name="idempotency-sweeper", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Could not purge expired idempotency keys")
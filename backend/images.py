@@ -0,0 +1,161 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Callable, Iterable
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # optional: without Pillow images are served as uploaded
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SOURCE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".gif"}
+
+_SAVE_OPTIONS = {
+    "avif": {"format": "AVIF", "speed": 6},
+    "webp": {"format": "WEBP", "method": 6},
+    "jpeg": {"format": "JPEG", "optimize": True, "progressive": True},
+    "png": {"format": "PNG", "optimize": True},
+}
+_EXTENSIONS = {"avif": ".avif", "webp": ".webp", "jpeg": ".jpg", "png": ".png"}
+
+
+def pipeline_available() -> bool:
+    return Image is not None
+
+
+def modern_formats() -> tuple:
+    if Image is None:
+        return ()
+    return tuple(fmt for fmt in ("avif", "webp") if features.check(fmt))
+
+
+def _variant_widths(original_width: int, widths: Iterable[int]) -> list:
+    # Never upscale; the largest variant is the original width or the top step.
+    widths = sorted(set(widths))
+    picked = [width for width in widths if width < original_width]
+    picked.append(min(original_width, widths[-1]))
+    return sorted(set(picked))
+
+
+def generate_variants(source_path: str, output_dir: str, widths: tuple, quality: int, formats: tuple) -> list:
+    # Runs in a worker process. Variant names start with the source digest, so
+    # the same bytes always map to the same files and reruns are cheap.
+    with open(source_path, "rb") as handle:
+        digest = hashlib.sha256(handle.read()).hexdigest()[:16]
+
+    with Image.open(source_path) as image:
+        if getattr(image, "is_animated", False):
+            # A still variant would silently drop the animation.
+            return []
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        # Dropping info leaves EXIF, ICC profiles and comments out of every variant.
+        image.info = {}
+
+        fallback = "png" if has_alpha else "jpeg"
+        output = Path(output_dir)
+        output.mkdir(parents=True, exist_ok=True)
+        variants = []
+        for width in _variant_widths(image.width, widths):
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            for fmt in (*formats, fallback):
+                file_name = f"{digest}-{width}{_EXTENSIONS[fmt]}"
+                target = output / file_name
+                if not target.exists():
+                    tmp = output / f".{file_name}.{os.getpid()}"
+                    options = dict(_SAVE_OPTIONS[fmt])
+                    if fmt != "png":
+                        options["quality"] = quality
+                    resized.save(tmp, **options)
+                    os.replace(tmp, target)
+                variants.append({"format": fmt, "width": width, "file_name": file_name, "bytes": target.stat().st_size})
+        return variants
+
+
+class ImagePipeline:
+    # Resizes and recompresses images in a process pool so request threads
+    # never spend CPU on it. `on_done(source, variants)` is called from the
+    # executor's result thread once a source has been processed.
+    def __init__(self, output_dir: Path, widths: tuple, quality: int, workers: int, on_done: Callable) -> None:
+        self.output_dir = output_dir
+        self.widths = widths
+        self.quality = quality
+        self.workers = max(1, workers)
+        self.on_done = on_done
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        pid = os.getpid()
+        with self._lock:
+            if self._executor is None or self._pid != pid:
+                # spawn, not fork: the web process has threads and open
+                # database connections that must not leak into workers.
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+                self._pid = pid
+            return self._executor
+
+    def submit(self, source: str, path: Path):
+        if Image is None or path.suffix.lower() not in IMAGE_SOURCE_EXTENSIONS:
+            return None
+        future: Future = self._ensure_executor().submit(
+            generate_variants, str(path), str(self.output_dir), self.widths, self.quality, modern_formats()
+        )
+        future.add_done_callback(lambda done: self._finished(source, done))
+        return future
+
+    def _finished(self, source: str, future: Future) -> None:
+        try:
+            self.on_done(source, future.result())
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM on a huge image); start a fresh pool next time.
+            logger.exception("Image worker pool broke while processing %s", source)
+            with self._lock:
+                self._executor = None
+        except Exception:
+            logger.exception("Could not build image variants for %s", source)
+
+    def run(self, sources: dict) -> dict:
+        # Synchronous batch mode for build time: {source: path} -> {source: variants}.
+        futures = {source: self.submit(source, path) for source, path in sources.items()}
+        results = {}
+        for source, future in futures.items():
+            if future is not None:
+                results[source] = future.result()
+        return results
+
+
+def record_variants(conn, source: str, variants: list, url_prefix: str) -> None:
+    conn.execute("DELETE FROM image_variants WHERE source = ?", (source,))
+    conn.executemany(
+        "INSERT INTO image_variants (source, format, width, url, bytes) VALUES (?, ?, ?, ?, ?)",
+        [(source, v["format"], v["width"], f"{url_prefix}{v['file_name']}", v["bytes"]) for v in variants],
+    )
+    conn.commit()
+
+
+def load_variants(conn) -> dict:
+    # {source: {"fallback": fmt, "formats": {fmt: {"srcset": ..., "largest": url}}}}
+    images: dict = {}
+    rows = conn.execute("SELECT source, format, width, url FROM image_variants ORDER BY source, format, width").fetchall()
+    for row in rows:
+        entry = images.setdefault(row["source"], {"fallback": None, "formats": {}})
+        fmt = entry["formats"].setdefault(row["format"], {"candidates": [], "largest": None})
+        fmt["candidates"].append(f"{row['url']} {row['width']}w")
+        fmt["largest"] = row["url"]
+        if row["format"] in ("jpeg", "png"):
+            entry["fallback"] = row["format"]
+    for entry in images.values():
+        for fmt in entry["formats"].values():
+            fmt["srcset"] = ", ".join(fmt.pop("candidates"))
+    return {source: entry for source, entry in images.items() if entry["fallback"]}
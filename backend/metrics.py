@@ -0,0 +1,192 @@
+import bisect
+import math
+import os
+import threading
+from typing import Callable, Iterable
+
+# Seconds; tuned for a small Flask app where most requests finish in <100 ms.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[tuple]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield self.name, labels, "", value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, labels: tuple = (), value: float = 0) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class GaugeFunction:
+    # Sampled at scrape time: `collect()` returns {label values: value}.
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple, collect: Callable) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.collect = collect
+
+    def samples(self) -> Iterable[tuple]:
+        for labels, value in self.collect().items():
+            yield self.name, labels, "", value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (not cumulative) + overflow, sum]
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self) -> Iterable[tuple]:
+        with self._lock:
+            values = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", labels, f'le="{_format_value(bound)}"', cumulative
+            yield f"{self.name}_sum", labels, "", total
+            yield f"{self.name}_count", labels, "", cumulative
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        # Every gunicorn worker keeps its own registry, so samples carry the
+        # worker pid; sum over `worker` in queries to get service totals.
+        worker = f'worker="{os.getpid()}"'
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, extra, value in metric.samples():
+                label_text = _format_labels(metric.labelnames, labels, ",".join(filter(None, (extra, worker))))
+                lines.append(f"{name}{label_text} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class RequestMetrics:
+    # Per-route HTTP metrics plus a breakdown of the database time spent by
+    # each request, fed by db.set_query_observer(). Work done outside a
+    # request (e.g. the group-commit writer thread) is labelled "background".
+    DB_KINDS = ("query", "lock_wait", "commit", "pool_wait")
+
+    def __init__(self, registry: Registry) -> None:
+        self._local = threading.local()
+        self.in_flight = registry.register(Gauge("http_requests_in_flight", "Requests currently being handled."))
+        self.requests = registry.register(
+            Counter("http_requests_total", "Finished HTTP requests.", ("method", "endpoint", "status"))
+        )
+        self.latency = registry.register(
+            Histogram("http_request_duration_seconds", "Time to produce a response.", ("method", "endpoint"))
+        )
+        self.db_queries = registry.register(
+            Counter("db_queries_total", "Statements executed.", ("endpoint",))
+        )
+        self.db_seconds = registry.register(
+            Counter("db_seconds_total", "Database time by kind: query, lock_wait, commit, pool_wait.", ("endpoint", "kind"))
+        )
+        self.db_request_seconds = registry.register(
+            Histogram("db_request_seconds", "Database time per request, by kind.", ("endpoint", "kind"))
+        )
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+
+    def start(self, endpoint: str) -> None:
+        self._local.endpoint = endpoint or "unmatched"
+        self._local.db = dict.fromkeys(self.DB_KINDS, 0.0)
+        self._local.queries = 0
+        with self._in_flight_lock:
+            self._in_flight += 1
+            self.in_flight.set((), self._in_flight)
+
+    def finish(self, method: str, status: int, seconds: float) -> None:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            return
+        endpoint = self._local.endpoint
+        self._local.endpoint = None
+        self._local.db = None
+        with self._in_flight_lock:
+            self._in_flight -= 1
+            self.in_flight.set((), self._in_flight)
+        self.requests.inc((method, endpoint, str(status)))
+        self.latency.observe((method, endpoint), seconds)
+        if self._local.queries:
+            self.db_queries.inc((endpoint,), self._local.queries)
+        for kind, spent in db.items():
+            if spent:
+                self.db_seconds.inc((endpoint, kind), spent)
+                self.db_request_seconds.observe((endpoint, kind), spent)
+
+    def observe_db(self, kind: str, seconds: float) -> None:
+        # Inside a request this only touches thread-local state; the shared
+        # counters are updated once when the request finishes.
+        db = getattr(self._local, "db", None)
+        counted = kind == "query" or kind == "lock_wait"
+        if db is not None:
+            db[kind] += seconds
+            self._local.queries += counted
+            return
+        if counted:
+            self.db_queries.inc(("background",))
+        self.db_seconds.inc(("background", kind), seconds)
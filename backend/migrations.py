@@ -0,0 +1,148 @@
+import re
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # POSIX only; elsewhere concurrent migrations on SQLite are not serialized
+    fcntl = None
+
+BASE_DIR = Path(__file__).resolve().parent
+MIGRATIONS_DIR = BASE_DIR / "migrations"
+
+# Version 1 is the baseline: schema.sql / schema_postgres.sql plus the one-off
+# fixes for databases created before versioning (backend.init_schema). Later
+# versions are scripts in migrations/<dialect>/NNNN_<name>.sql, applied in
+# order, each in one transaction together with its schema_version row.
+BASELINE_VERSION = 1
+_SCRIPT_NAME = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+SCHEMA_VERSION_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+      version INTEGER PRIMARY KEY,
+      name TEXT NOT NULL,
+      applied_at TEXT NOT NULL
+    )
+"""
+
+
+class MigrationError(RuntimeError):
+    pass
+
+
+class SchemaBehindError(MigrationError):
+    pass
+
+
+def migration_scripts(dialect: str) -> list:
+    # [(version, name, path)] after the baseline, in order.
+    scripts = []
+    for path in sorted((MIGRATIONS_DIR / dialect).glob("*.sql")):
+        match = _SCRIPT_NAME.match(path.name)
+        if not match:
+            raise MigrationError(f"Unexpected migration file name: {path.name}")
+        scripts.append((int(match.group(1)), match.group(2), path))
+    expected = list(range(BASELINE_VERSION + 1, BASELINE_VERSION + 1 + len(scripts)))
+    if [version for version, _, _ in scripts] != expected:
+        raise MigrationError(f"{dialect} migrations must be numbered {expected} without gaps.")
+    return scripts
+
+
+def latest_version(dialect: str) -> int:
+    scripts = migration_scripts(dialect)
+    return scripts[-1][0] if scripts else BASELINE_VERSION
+
+
+def current_version(conn, dialect: str) -> int:
+    # 0 for an empty database or one created before versioning.
+    if dialect == "postgresql":
+        exists = conn.execute("SELECT to_regclass('schema_version') IS NOT NULL").fetchone()[0]
+    else:
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'").fetchone()
+    if not exists:
+        return 0
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def _record(version: int, name: str) -> str:
+    # Names come from file names matching \w+, so inlining them is safe; it
+    # lets SQLite run the record inside the migration script.
+    applied_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    return f"INSERT INTO schema_version (version, name, applied_at) VALUES ({int(version)}, '{name}', '{applied_at}');"
+
+
+@contextmanager
+def _migration_lock(backend, conn):
+    # Only one process migrates; the others wait here and then find nothing
+    # left to do.
+    if backend.dialect == "postgresql":
+        conn.execute("SELECT pg_advisory_lock(hashtext('schema_version'))")
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.rollback()
+            conn.execute("SELECT pg_advisory_unlock(hashtext('schema_version'))")
+            conn.commit()
+        return
+
+    if fcntl is None:
+        yield
+        return
+    lock_path = Path(backend.db_path).with_name(Path(backend.db_path).name + ".migrate.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "w") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _apply_script(conn, dialect: str, version: int, name: str, path: Path) -> None:
+    script = path.read_text(encoding="utf-8")
+    if dialect == "postgresql":
+        try:
+            conn.executescript(script)
+            conn.execute(_record(version, name))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return
+    # executescript commits whatever is open first, so the transaction is
+    # part of the script itself.
+    try:
+        conn.executescript(f"BEGIN IMMEDIATE;\n{script}\n{_record(version, name)}\nCOMMIT;")
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+
+
+def migrate(backend, conn, log=None) -> list:
+    # Brings the database to the latest version; returns [(version, name)]
+    # of the migrations applied.
+    dialect = backend.dialect
+    scripts = migration_scripts(dialect)
+    applied = []
+    with _migration_lock(backend, conn):
+        conn.execute(SCHEMA_VERSION_SQL)
+        conn.commit()
+        version = current_version(conn, dialect)
+        if version < BASELINE_VERSION:
+            if log:
+                log(f"Applying {BASELINE_VERSION:04d}_baseline")
+            backend.init_schema(conn)
+            conn.execute(_record(BASELINE_VERSION, "baseline"))
+            conn.commit()
+            applied.append((BASELINE_VERSION, "baseline"))
+        for script_version, name, path in scripts:
+            if script_version <= version:
+                continue
+            if log:
+                log(f"Applying {script_version:04d}_{name}")
+            _apply_script(conn, dialect, script_version, name, path)
+            applied.append((script_version, name))
+    return applied
@@ -0,0 +1,21 @@
+-- Row versions for conditional GETs of application details; see the SQLite
+-- migration. Constant defaults keep ADD COLUMN a catalog-only change.
+ALTER TABLE applications ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 1;
+ALTER TABLE students ADD COLUMN IF NOT EXISTS row_version BIGINT NOT NULL DEFAULT 1;
+
+CREATE OR REPLACE FUNCTION bump_row_version() RETURNS trigger AS $$
+BEGIN
+  NEW.row_version := OLD.row_version + 1;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_applications_row_version ON applications;
+CREATE TRIGGER trg_applications_row_version
+BEFORE UPDATE ON applications
+FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+DROP TRIGGER IF EXISTS trg_students_row_version ON students;
+CREATE TRIGGER trg_students_row_version
+BEFORE UPDATE ON students
+FOR EACH ROW EXECUTE FUNCTION bump_row_version();
@@ -0,0 +1,44 @@
+-- Copies of the student's name and LRN on applications for index-backed
+-- sorting; see the SQLite migration.
+ALTER TABLE applications ADD COLUMN IF NOT EXISTS student_name TEXT;
+ALTER TABLE applications ADD COLUMN IF NOT EXISTS student_lrn TEXT;
+
+UPDATE applications a SET student_name = s.fullName, student_lrn = s.lrn
+FROM students s
+WHERE s.id = a.student_id;
+
+CREATE INDEX IF NOT EXISTS idx_applications_student_name ON applications(student_name, id);
+CREATE INDEX IF NOT EXISTS idx_applications_student_lrn ON applications(student_lrn, id);
+CREATE INDEX IF NOT EXISTS idx_applications_status_student_name ON applications(status, student_name, id);
+CREATE INDEX IF NOT EXISTS idx_applications_status_student_lrn ON applications(status, student_lrn, id);
+
+CREATE OR REPLACE FUNCTION copy_student_sort_keys() RETURNS trigger AS $$
+BEGIN
+  UPDATE applications SET student_name = NEW.fullName, student_lrn = NEW.lrn
+  WHERE student_id = NEW.id;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_students_sort_keys ON students;
+CREATE TRIGGER trg_students_sort_keys
+AFTER UPDATE OF fullName, lrn ON students
+FOR EACH ROW
+WHEN (NEW.fullName IS DISTINCT FROM OLD.fullName OR NEW.lrn IS DISTINCT FROM OLD.lrn)
+EXECUTE FUNCTION copy_student_sort_keys();
+
+CREATE OR REPLACE FUNCTION refresh_application_sort_keys() RETURNS trigger AS $$
+BEGIN
+  SELECT s.fullName, s.lrn INTO NEW.student_name, NEW.student_lrn
+  FROM students s
+  WHERE s.id = NEW.student_id;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_applications_sort_keys ON applications;
+CREATE TRIGGER trg_applications_sort_keys
+BEFORE UPDATE OF student_id ON applications
+FOR EACH ROW
+WHEN (NEW.student_id IS DISTINCT FROM OLD.student_id)
+EXECUTE FUNCTION refresh_application_sort_keys();
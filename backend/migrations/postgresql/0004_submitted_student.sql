@@ -0,0 +1,3 @@
+-- Student details sent with an application linked to an existing student;
+-- see the SQLite migration.
+ALTER TABLE applications ADD COLUMN IF NOT EXISTS submitted_student TEXT;
@@ -0,0 +1,21 @@
+-- Row versions for conditional GETs of application details: bumped on every
+-- update of an application or of its student, so (application row_version,
+-- student row_version) changes whenever the details payload can change.
+ALTER TABLE applications ADD COLUMN row_version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE students ADD COLUMN row_version INTEGER NOT NULL DEFAULT 1;
+
+-- The WHEN clause skips the trigger's own update (and any caller that sets
+-- row_version itself).
+CREATE TRIGGER IF NOT EXISTS trg_applications_row_version
+AFTER UPDATE ON applications
+WHEN new.row_version = old.row_version
+BEGIN
+  UPDATE applications SET row_version = old.row_version + 1 WHERE id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_students_row_version
+AFTER UPDATE ON students
+WHEN new.row_version = old.row_version
+BEGIN
+  UPDATE students SET row_version = old.row_version + 1 WHERE id = new.id;
+END;
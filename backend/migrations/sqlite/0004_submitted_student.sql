@@ -0,0 +1,4 @@
+-- The student details sent with an application that was linked to an
+-- existing student (ENROLL_RETURNING_STUDENTS), as JSON. The students row is
+-- left as it was; an admin applies these details to it explicitly.
+ALTER TABLE applications ADD COLUMN submitted_student TEXT;
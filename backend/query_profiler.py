@@ -0,0 +1,138 @@
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+_WHITESPACE = re.compile(r"\s+")
+# SQLite: "SCAN applications" is a full table scan; "SCAN a USING INDEX ..." /
+# "USING COVERING INDEX" walk an index, and virtual tables (FTS) are excluded.
+_SQLITE_FULL_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)(\w+)\b(?! USING)(?! VIRTUAL)")
+_POSTGRES_FULL_SCAN = re.compile(r"Seq Scan on (\w+)")
+_MAX_PARAM_CHARS = 64
+
+
+def fingerprint(sql: str) -> str:
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def _loggable_params(params) -> Optional[list]:
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        params = params.values()
+    loggable = []
+    for value in params:
+        if isinstance(value, (int, float)) or value is None:
+            loggable.append(value)
+        else:
+            text = str(value)
+            loggable.append(text if len(text) <= _MAX_PARAM_CHARS else text[:_MAX_PARAM_CHARS] + "...")
+    return loggable
+
+
+def explain(conn, sql: str, params) -> tuple:
+    # Returns (plan lines, tables read with a full scan).
+    if getattr(conn, "dialect", "sqlite") == "postgresql":
+        # A failing EXPLAIN would abort the caller's transaction without the savepoint.
+        conn.execute("SAVEPOINT explain_plan")
+        try:
+            rows = conn.execute(f"EXPLAIN {sql}", params).fetchall()
+        except Exception:
+            conn.execute("ROLLBACK TO SAVEPOINT explain_plan")
+            raise
+        finally:
+            conn.execute("RELEASE SAVEPOINT explain_plan")
+        plan = [row[0] for row in rows]
+        scans = sorted({match for line in plan for match in _POSTGRES_FULL_SCAN.findall(line)})
+        return plan, scans
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    plan = [row[3] for row in rows]
+    scans = sorted({match.group(1) for line in plan if (match := _SQLITE_FULL_SCAN.match(line))})
+    return plan, scans
+
+
+class SlowQueryLog:
+    # Installed with db.set_slow_query_hook(). Appends one JSON line per slow
+    # statement; os.write on an O_APPEND descriptor keeps lines from several
+    # workers intact. `context()` adds request details such as the endpoint.
+    def __init__(self, path: Path, context: Optional[Callable] = None) -> None:
+        self.path = path
+        self.context = context
+        self._local = threading.local()
+
+    def __call__(self, conn, sql: str, params, seconds: float) -> None:
+        if getattr(self._local, "explaining", False):
+            return
+        record = {
+            "ts": time.time(),
+            "ms": round(seconds * 1000, 3),
+            "sql": fingerprint(sql),
+            "params": _loggable_params(params),
+        }
+        if self.context is not None:
+            record.update(self.context())
+        if sql.lstrip()[:6].upper().startswith(_EXPLAINABLE) and params is not None:
+            self._local.explaining = True
+            try:
+                record["plan"], record["full_scans"] = explain(conn, sql, params)
+            except Exception as e:
+                record["plan_error"] = str(e)
+            finally:
+                self._local.explaining = False
+        self._append(record)
+
+    def _append(self, record: dict) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        line = (json.dumps(record, default=str) + "\n").encode("utf-8")
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+
+def _percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(path: Path, top: int = 20) -> list:
+    # Groups the log by statement and ranks by total time spent.
+    groups: dict = {}
+    try:
+        handle = path.open(encoding="utf-8")
+    except FileNotFoundError:
+        return []
+    with handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            group = groups.setdefault(record["sql"], {"sql": record["sql"], "timings": [], "full_scans": set(), "endpoints": set()})
+            group["timings"].append(record["ms"])
+            group["full_scans"].update(record.get("full_scans") or ())
+            if record.get("endpoint"):
+                group["endpoints"].add(record["endpoint"])
+            if record["ms"] >= group.get("max_ms", -1):
+                group["max_ms"] = record["ms"]
+                group["slowest"] = {key: record.get(key) for key in ("params", "plan", "plan_error", "ts")}
+
+    report = []
+    for group in groups.values():
+        timings = group.pop("timings")
+        group.update(
+            count=len(timings),
+            total_ms=round(sum(timings), 3),
+            avg_ms=round(sum(timings) / len(timings), 3),
+            p95_ms=_percentile(timings, 0.95),
+            full_scans=sorted(group["full_scans"]),
+            endpoints=sorted(group["endpoints"]),
+        )
+        report.append(group)
+    report.sort(key=lambda group: group["total_ms"], reverse=True)
+    return report[:top]
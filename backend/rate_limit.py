@@ -0,0 +1,176 @@
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+
+# Sliding-window counter: each key keeps only the count for the current fixed
+# window and the one before it. The previous count is weighted by how much of
+# it still overlaps the sliding window, which gives a close estimate of a true
+# sliding log in O(1) memory per key.
+def _shift(state: Optional[tuple], window_start: int, window: int) -> tuple:
+    if state is None:
+        return 0, 0
+    started, current, previous = state
+    if started == window_start:
+        return current, previous
+    if started == window_start - window:
+        return 0, current
+    return 0, 0
+
+
+def _estimate(current: int, previous: int, now: float, window_start: int, window: int) -> float:
+    return current + previous * (1 - (now - window_start) / window)
+
+
+class MemoryStore:
+    # Per-process store for development and single-worker deployments. Bounded
+    # by max_keys (least recently used keys go first) and by expiry.
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max(1, max_keys)
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, window_start: int, window: int, cost: int) -> tuple:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            current, previous = _shift(entry[:3] if entry else None, window_start, window)
+            current += cost
+            self._entries[key] = (window_start, current, previous, window_start + 2 * window)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        return current, previous
+
+    def get(self, key: str, window_start: int, window: int) -> tuple:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[3] <= window_start:
+                del self._entries[key]
+                entry = None
+        return _shift(entry[:3] if entry else None, window_start, window)
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteStore:
+    # Shared by every worker process on the host. Kept in its own database
+    # file so limiter writes never queue behind enrollment writes.
+    PRUNE_PROBABILITY = 1 / 256
+
+    def __init__(self, path: Path, busy_timeout: float) -> None:
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL;")
+            conn.execute("PRAGMA synchronous = NORMAL;")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                  key TEXT PRIMARY KEY,
+                  window_start INTEGER NOT NULL,
+                  current INTEGER NOT NULL,
+                  previous INTEGER NOT NULL,
+                  expires_at INTEGER NOT NULL
+                ) WITHOUT ROWID
+                """
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def hit(self, key: str, window_start: int, window: int, cost: int) -> tuple:
+        conn = self._conn()
+        # One statement, so concurrent workers cannot lose each other's hits.
+        row = conn.execute(
+            """
+            INSERT INTO rate_limits (key, window_start, current, previous, expires_at)
+            VALUES (:key, :start, :cost, 0, :expires)
+            ON CONFLICT(key) DO UPDATE SET
+              previous = CASE
+                WHEN window_start = :start THEN previous
+                WHEN window_start = :start - :window THEN current
+                ELSE 0
+              END,
+              current = CASE WHEN window_start = :start THEN current + :cost ELSE :cost END,
+              window_start = :start,
+              expires_at = :expires
+            RETURNING current, previous
+            """,
+            {"key": key, "start": window_start, "window": window, "cost": cost, "expires": window_start + 2 * window},
+        ).fetchone()
+        if random.random() < self.PRUNE_PROBABILITY:
+            conn.execute("DELETE FROM rate_limits WHERE expires_at <= ?", (window_start,))
+        return row[0], row[1]
+
+    def get(self, key: str, window_start: int, window: int) -> tuple:
+        row = self._conn().execute(
+            "SELECT window_start, current, previous FROM rate_limits WHERE key = ?", (key,)
+        ).fetchone()
+        return _shift(tuple(row) if row else None, window_start, window)
+
+    def reset(self, key: str) -> None:
+        self._conn().execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+
+class RateLimiter:
+    def __init__(self, store, name: str, limit: int, window: int) -> None:
+        self.store = store
+        self.name = name
+        self.limit = max(1, limit)
+        self.window = max(1, int(window))
+
+    def _window_start(self, now: float) -> int:
+        return int(now // self.window) * self.window
+
+    def hit(self, key: str, cost: int = 1) -> float:
+        now = time.time()
+        start = self._window_start(now)
+        current, previous = self.store.hit(f"{self.name}:{key}", start, self.window, cost)
+        return _estimate(current, previous, now, start, self.window)
+
+    def count(self, key: str) -> float:
+        now = time.time()
+        start = self._window_start(now)
+        current, previous = self.store.get(f"{self.name}:{key}", start, self.window)
+        return _estimate(current, previous, now, start, self.window)
+
+    def is_limited(self, key: str) -> bool:
+        return self.count(key) >= self.limit
+
+    def consume(self, key: str) -> bool:
+        # Counts the request and says whether it is still within the limit.
+        return self.hit(key) <= self.limit
+
+    def reset(self, key: str) -> None:
+        self.store.reset(f"{self.name}:{key}")
+
+    def retry_after(self) -> int:
+        now = time.time()
+        return max(1, math.ceil(self._window_start(now) + self.window - now))
+
+
+def make_store(kind: str, path: Path, max_keys: int, busy_timeout: float):
+    if kind == "memory":
+        return MemoryStore(max_keys)
+    if kind == "sqlite":
+        return SQLiteStore(path, busy_timeout)
+    raise ValueError(f"Unknown RATE_LIMIT_STORE {kind!r}; use 'sqlite' or 'memory'.")
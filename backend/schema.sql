@@ -9,7 +9,10 @@ CREATE TABLE IF NOT EXISTS students (
   pob TEXT,
   sex TEXT,
   nationality TEXT,
-  created_at TEXT DEFAULT CURRENT_TIMESTAMP
+  created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+
+  -- dob as an ISO date; NULL when the submitted text does not parse
+  born_on TEXT
 );
 
 CREATE TABLE IF NOT EXISTS applications (
@@ -49,12 +52,48 @@ CREATE TABLE IF NOT EXISTS applications (
   status TEXT NOT NULL DEFAULT 'submitted',
   submitted_at TEXT DEFAULT CURRENT_TIMESTAMP,
 
+  -- typed copies of generalAve / dateGraduation (ISO date) for range filters;
+  -- NULL when the submitted text does not parse
+  general_average REAL,
+  graduated_on TEXT,
+
   FOREIGN KEY (student_id) REFERENCES students(id)
 );
 
 CREATE INDEX IF NOT EXISTS idx_applications_student_id ON applications(student_id);
 CREATE INDEX IF NOT EXISTS idx_applications_status ON applications(status);
 
+-- Keyset pagination orders by (column, id); every SQLite index already ends
+-- with the rowid, so these serve "ORDER BY col, a.id" and the filtered variants.
+CREATE INDEX IF NOT EXISTS idx_applications_strand ON applications(strand);
+CREATE INDEX IF NOT EXISTS idx_applications_submitted_at ON applications(submitted_at);
+CREATE INDEX IF NOT EXISTS idx_applications_status_strand ON applications(status, strand);
+CREATE INDEX IF NOT EXISTS idx_applications_status_submitted_at ON applications(status, submitted_at);
+CREATE INDEX IF NOT EXISTS idx_applications_strand_submitted_at ON applications(strand, submitted_at);
+-- status rides along so per-status counts over an average range stay in the index.
+CREATE INDEX IF NOT EXISTS idx_applications_general_average ON applications(general_average, status);
+
+-- One row per distinct entry of medicalConditions (JSON list) and
+-- credentialsSubmitted (comma-joined), written alongside the application, so
+-- "has / is missing Form 138" is an index lookup instead of a text scan.
+CREATE TABLE IF NOT EXISTS application_medical_conditions (
+  application_id INTEGER NOT NULL REFERENCES applications(id) ON DELETE CASCADE,
+  medical_condition TEXT NOT NULL,
+  PRIMARY KEY (application_id, medical_condition)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_application_medical_conditions_condition
+  ON application_medical_conditions(medical_condition, application_id);
+
+CREATE TABLE IF NOT EXISTS application_credentials (
+  application_id INTEGER NOT NULL REFERENCES applications(id) ON DELETE CASCADE,
+  credential TEXT NOT NULL,
+  PRIMARY KEY (application_id, credential)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_application_credentials_credential
+  ON application_credentials(credential, application_id);
+
 CREATE INDEX IF NOT EXISTS idx_students_lrn ON students(lrn);
 CREATE INDEX IF NOT EXISTS idx_students_fullName ON students(fullName);
 
@@ -63,3 +102,190 @@ CREATE TABLE IF NOT EXISTS site_content (
   content_value TEXT NOT NULL,
   updated_at TEXT DEFAULT CURRENT_TIMESTAMP
 );
+
+-- Single-row counter bumped by triggers on every site_content write, so each
+-- worker can cheaply tell whether its cached copy of the content is stale.
+CREATE TABLE IF NOT EXISTS site_content_version (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  version INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO site_content_version (id, version) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_site_content_insert_version
+AFTER INSERT ON site_content
+BEGIN
+  UPDATE site_content_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_site_content_update_version
+AFTER UPDATE ON site_content
+BEGIN
+  UPDATE site_content_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_site_content_delete_version
+AFTER DELETE ON site_content
+BEGIN
+  UPDATE site_content_version SET version = version + 1 WHERE id = 1;
+END;
+
+-- Resized/recompressed copies of site images; source is the URL as it appears
+-- in site_content. Changes bump the version so pre-rendered pages pick up srcset.
+CREATE TABLE IF NOT EXISTS image_variants (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  source TEXT NOT NULL,
+  format TEXT NOT NULL,
+  width INTEGER NOT NULL,
+  url TEXT NOT NULL,
+  bytes INTEGER NOT NULL,
+  created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE (source, format, width)
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_image_variants_insert_version
+AFTER INSERT ON image_variants
+BEGIN
+  UPDATE site_content_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_image_variants_delete_version
+AFTER DELETE ON image_variants
+BEGIN
+  UPDATE site_content_version SET version = version + 1 WHERE id = 1;
+END;
+
+-- Full-text index over applicant fields shown or searched in the admin view.
+-- rowid is the application id; triggers below keep it in sync.
+CREATE VIRTUAL TABLE IF NOT EXISTS applicant_search USING fts5(
+  fullName,
+  lrn,
+  email,
+  guardianName,
+  jhsGraduated,
+  credentialsSubmitted,
+  tokenize = 'unicode61 remove_diacritics 2',
+  prefix = '2 3 4'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_applications_search_insert
+AFTER INSERT ON applications
+BEGIN
+  INSERT INTO applicant_search (rowid, fullName, lrn, email, guardianName, jhsGraduated, credentialsSubmitted)
+  SELECT new.id, s.fullName, s.lrn, s.email, new.guardianName, new.jhsGraduated, new.credentialsSubmitted
+  FROM students s
+  WHERE s.id = new.student_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_applications_search_update
+AFTER UPDATE OF student_id, guardianName, jhsGraduated, credentialsSubmitted ON applications
+BEGIN
+  DELETE FROM applicant_search WHERE rowid = old.id;
+  INSERT INTO applicant_search (rowid, fullName, lrn, email, guardianName, jhsGraduated, credentialsSubmitted)
+  SELECT new.id, s.fullName, s.lrn, s.email, new.guardianName, new.jhsGraduated, new.credentialsSubmitted
+  FROM students s
+  WHERE s.id = new.student_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_applications_search_delete
+AFTER DELETE ON applications
+BEGIN
+  DELETE FROM applicant_search WHERE rowid = old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_students_search_update
+AFTER UPDATE OF fullName, lrn, email ON students
+BEGIN
+  DELETE FROM applicant_search
+  WHERE rowid IN (SELECT id FROM applications WHERE student_id = new.id);
+  INSERT INTO applicant_search (rowid, fullName, lrn, email, guardianName, jhsGraduated, credentialsSubmitted)
+  SELECT a.id, new.fullName, new.lrn, new.email, a.guardianName, a.jhsGraduated, a.credentialsSubmitted
+  FROM applications a
+  WHERE a.student_id = new.id;
+END;
+
+-- Status transitions, newest last. Kept narrow (ids and status codes only) so
+-- bulk approvals stay cheap; rows outlive deleted applications on purpose.
+CREATE TABLE IF NOT EXISTS application_status_history (
+  id INTEGER PRIMARY KEY,
+  application_id INTEGER NOT NULL,
+  from_status TEXT,
+  to_status TEXT NOT NULL,
+  changed_by TEXT,
+  changed_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_status_history_application ON application_status_history(application_id, id);
+
+-- Idempotency keys for POST /api/enroll: a retry with the same key (or the
+-- same payload when no Idempotency-Key header is sent) gets the original
+-- application id back. expires_at is a Unix timestamp; expired rows are purged
+-- in the background.
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+  key TEXT PRIMARY KEY,
+  request_hash TEXT NOT NULL,
+  application_id INTEGER NOT NULL,
+  expires_at INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys(expires_at);
+
+-- Running application counts per dimension ("status", "strand", "tvlSpec",
+-- "gradeLevel", "day" = date part of submitted_at) so dashboard totals never
+-- scan applications. NULLs are counted under ''. Rows whose total drops to 0
+-- are kept; readers skip them.
+CREATE TABLE IF NOT EXISTS application_stats (
+  dimension TEXT NOT NULL,
+  value TEXT NOT NULL,
+  total INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (dimension, value)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_applications_stats_insert
+AFTER INSERT ON applications
+BEGIN
+  INSERT INTO application_stats (dimension, value, total)
+  VALUES
+    ('status', COALESCE(new.status, ''), 1),
+    ('strand', COALESCE(new.strand, ''), 1),
+    ('tvlSpec', COALESCE(new.tvlSpec, ''), 1),
+    ('gradeLevel', COALESCE(new.gradeLevel, ''), 1),
+    ('day', COALESCE(substr(new.submitted_at, 1, 10), ''), 1)
+  ON CONFLICT (dimension, value) DO UPDATE SET total = total + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_applications_stats_update
+AFTER UPDATE OF status, strand, tvlSpec, gradeLevel, submitted_at ON applications
+BEGIN
+  UPDATE application_stats SET total = total - 1
+  WHERE (dimension, value) IN (
+    VALUES
+      ('status', COALESCE(old.status, '')),
+      ('strand', COALESCE(old.strand, '')),
+      ('tvlSpec', COALESCE(old.tvlSpec, '')),
+      ('gradeLevel', COALESCE(old.gradeLevel, '')),
+      ('day', COALESCE(substr(old.submitted_at, 1, 10), ''))
+  );
+  INSERT INTO application_stats (dimension, value, total)
+  VALUES
+    ('status', COALESCE(new.status, ''), 1),
+    ('strand', COALESCE(new.strand, ''), 1),
+    ('tvlSpec', COALESCE(new.tvlSpec, ''), 1),
+    ('gradeLevel', COALESCE(new.gradeLevel, ''), 1),
+    ('day', COALESCE(substr(new.submitted_at, 1, 10), ''), 1)
+  ON CONFLICT (dimension, value) DO UPDATE SET total = total + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_applications_stats_delete
+AFTER DELETE ON applications
+BEGIN
+  UPDATE application_stats SET total = total - 1
+  WHERE (dimension, value) IN (
+    VALUES
+      ('status', COALESCE(old.status, '')),
+      ('strand', COALESCE(old.strand, '')),
+      ('tvlSpec', COALESCE(old.tvlSpec, '')),
+      ('gradeLevel', COALESCE(old.gradeLevel, '')),
+      ('day', COALESCE(substr(old.submitted_at, 1, 10), ''))
+  );
+END;
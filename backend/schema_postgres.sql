@@ -0,0 +1,235 @@
+-- PostgreSQL counterpart of schema.sql. Column names and TEXT types match the
+-- SQLite schema so the API returns identical shapes on either backend (the
+-- internal typed copies use native DATE / DOUBLE PRECISION);
+-- timestamps keep SQLite's CURRENT_TIMESTAMP text format (UTC).
+
+CREATE TABLE IF NOT EXISTS students (
+  id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  lrn TEXT NOT NULL,
+  fullName TEXT NOT NULL,
+  email TEXT,
+  contact TEXT,
+  address TEXT,
+  dob TEXT,
+  pob TEXT,
+  sex TEXT,
+  nationality TEXT,
+  created_at TEXT DEFAULT to_char(timezone('UTC', now()), 'YYYY-MM-DD HH24:MI:SS'),
+  born_on DATE
+);
+
+CREATE TABLE IF NOT EXISTS applications (
+  id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  student_id BIGINT NOT NULL REFERENCES students(id),
+
+  -- enrollment details
+  gradeLevel TEXT NOT NULL,
+  strand TEXT,
+  tvlSpec TEXT,
+  generalAve TEXT,
+
+  -- school history
+  jhsGraduated TEXT,
+  dateGraduation TEXT,
+
+  -- medical info (store checkbox list as JSON string)
+  medicalConditions TEXT,
+  medicalOther TEXT,
+  howSupported TEXT,
+
+  -- parent / guardian info
+  guardianName TEXT,
+  guardianCivilStatus TEXT,
+  guardianEmployment TEXT,
+  guardianOccupation TEXT,
+  guardianRelationship TEXT,
+  guardianTel TEXT,
+  guardianContact TEXT,
+
+  -- credentials + pledge
+  credentialsSubmitted TEXT,
+  firstTimeAU TEXT,
+  enrolledYear TEXT,
+  studentSignature TEXT,
+
+  status TEXT NOT NULL DEFAULT 'submitted',
+  submitted_at TEXT DEFAULT to_char(timezone('UTC', now()), 'YYYY-MM-DD HH24:MI:SS'),
+
+  -- typed copies of generalAve / dateGraduation; see schema.sql
+  general_average DOUBLE PRECISION,
+  graduated_on DATE
+);
+
+-- Databases created before the typed columns; init_schema backfills them.
+ALTER TABLE students ADD COLUMN IF NOT EXISTS born_on DATE;
+ALTER TABLE applications ADD COLUMN IF NOT EXISTS general_average DOUBLE PRECISION;
+ALTER TABLE applications ADD COLUMN IF NOT EXISTS graduated_on DATE;
+
+CREATE INDEX IF NOT EXISTS idx_applications_student_id ON applications(student_id);
+CREATE INDEX IF NOT EXISTS idx_applications_status ON applications(status, id);
+CREATE INDEX IF NOT EXISTS idx_applications_strand ON applications(strand, id);
+CREATE INDEX IF NOT EXISTS idx_applications_submitted_at ON applications(submitted_at, id);
+CREATE INDEX IF NOT EXISTS idx_applications_status_strand ON applications(status, strand, id);
+CREATE INDEX IF NOT EXISTS idx_applications_status_submitted_at ON applications(status, submitted_at, id);
+CREATE INDEX IF NOT EXISTS idx_applications_strand_submitted_at ON applications(strand, submitted_at, id);
+CREATE INDEX IF NOT EXISTS idx_applications_general_average ON applications(general_average, id);
+
+CREATE TABLE IF NOT EXISTS application_medical_conditions (
+  application_id BIGINT NOT NULL REFERENCES applications(id) ON DELETE CASCADE,
+  medical_condition TEXT NOT NULL,
+  PRIMARY KEY (application_id, medical_condition)
+);
+
+CREATE INDEX IF NOT EXISTS idx_application_medical_conditions_condition
+  ON application_medical_conditions(medical_condition, application_id);
+
+CREATE TABLE IF NOT EXISTS application_credentials (
+  application_id BIGINT NOT NULL REFERENCES applications(id) ON DELETE CASCADE,
+  credential TEXT NOT NULL,
+  PRIMARY KEY (application_id, credential)
+);
+
+CREATE INDEX IF NOT EXISTS idx_application_credentials_credential
+  ON application_credentials(credential, application_id);
+
+CREATE INDEX IF NOT EXISTS idx_students_lrn ON students(lrn);
+CREATE INDEX IF NOT EXISTS idx_students_fullName ON students(fullName, id);
+
+CREATE TABLE IF NOT EXISTS site_content (
+  content_key TEXT PRIMARY KEY,
+  content_value TEXT NOT NULL,
+  updated_at TEXT DEFAULT to_char(timezone('UTC', now()), 'YYYY-MM-DD HH24:MI:SS')
+);
+
+CREATE TABLE IF NOT EXISTS site_content_version (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO site_content_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_site_content_version() RETURNS trigger AS $$
+BEGIN
+  UPDATE site_content_version SET version = version + 1 WHERE id = 1;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_site_content_version ON site_content;
+CREATE TRIGGER trg_site_content_version
+AFTER INSERT OR UPDATE OR DELETE ON site_content
+FOR EACH STATEMENT EXECUTE FUNCTION bump_site_content_version();
+
+CREATE TABLE IF NOT EXISTS image_variants (
+  id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  source TEXT NOT NULL,
+  format TEXT NOT NULL,
+  width INTEGER NOT NULL,
+  url TEXT NOT NULL,
+  bytes BIGINT NOT NULL,
+  created_at TEXT DEFAULT to_char(timezone('UTC', now()), 'YYYY-MM-DD HH24:MI:SS'),
+  UNIQUE (source, format, width)
+);
+
+DROP TRIGGER IF EXISTS trg_image_variants_version ON image_variants;
+CREATE TRIGGER trg_image_variants_version
+AFTER INSERT OR DELETE ON image_variants
+FOR EACH STATEMENT EXECUTE FUNCTION bump_site_content_version();
+
+CREATE TABLE IF NOT EXISTS application_status_history (
+  id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  application_id BIGINT NOT NULL,
+  from_status TEXT,
+  to_status TEXT NOT NULL,
+  changed_by TEXT,
+  changed_at TEXT DEFAULT to_char(timezone('UTC', now()), 'YYYY-MM-DD HH24:MI:SS')
+);
+
+CREATE INDEX IF NOT EXISTS idx_status_history_application ON application_status_history(application_id, id);
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+  key TEXT PRIMARY KEY,
+  request_hash TEXT NOT NULL,
+  application_id BIGINT NOT NULL,
+  expires_at BIGINT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys(expires_at);
+
+-- Running application counts per dimension; see schema.sql. Statement-level
+-- triggers aggregate the transition tables, so a bulk import touches each
+-- counter row once instead of once per application.
+CREATE TABLE IF NOT EXISTS application_stats (
+  dimension TEXT NOT NULL,
+  value TEXT NOT NULL,
+  total BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (dimension, value)
+);
+
+CREATE OR REPLACE FUNCTION apply_application_stats() RETURNS trigger AS $$
+BEGIN
+  -- Nested so INSERT triggers never plan a query over the missing old_rows.
+  IF TG_OP = 'UPDATE' THEN
+    IF NOT EXISTS (
+      SELECT 1 FROM old_rows o JOIN new_rows n ON n.id = o.id
+      WHERE (o.status, o.strand, o.tvlSpec, o.gradeLevel, substr(o.submitted_at, 1, 10))
+        IS DISTINCT FROM (n.status, n.strand, n.tvlSpec, n.gradeLevel, substr(n.submitted_at, 1, 10))
+    ) THEN
+      RETURN NULL;
+    END IF;
+  END IF;
+
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    UPDATE application_stats s SET total = s.total - d.total
+    FROM (
+      SELECT dimension, value, COUNT(*) AS total
+      FROM old_rows,
+        LATERAL (VALUES
+          ('status', COALESCE(status, '')),
+          ('strand', COALESCE(strand, '')),
+          ('tvlSpec', COALESCE(tvlSpec, '')),
+          ('gradeLevel', COALESCE(gradeLevel, '')),
+          ('day', COALESCE(substr(submitted_at, 1, 10), ''))
+        ) AS dims (dimension, value)
+      GROUP BY dimension, value
+    ) d
+    WHERE s.dimension = d.dimension AND s.value = d.value;
+  END IF;
+
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    -- Sorted so concurrent writers lock counter rows in the same order.
+    INSERT INTO application_stats (dimension, value, total)
+    SELECT dimension, value, COUNT(*)
+    FROM new_rows,
+      LATERAL (VALUES
+        ('status', COALESCE(status, '')),
+        ('strand', COALESCE(strand, '')),
+        ('tvlSpec', COALESCE(tvlSpec, '')),
+        ('gradeLevel', COALESCE(gradeLevel, '')),
+        ('day', COALESCE(substr(submitted_at, 1, 10), ''))
+      ) AS dims (dimension, value)
+    GROUP BY dimension, value
+    ORDER BY dimension, value
+    ON CONFLICT (dimension, value) DO UPDATE SET total = application_stats.total + EXCLUDED.total;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_applications_stats_insert ON applications;
+CREATE TRIGGER trg_applications_stats_insert
+AFTER INSERT ON applications
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION apply_application_stats();
+
+DROP TRIGGER IF EXISTS trg_applications_stats_update ON applications;
+CREATE TRIGGER trg_applications_stats_update
+AFTER UPDATE ON applications
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION apply_application_stats();
+
+DROP TRIGGER IF EXISTS trg_applications_stats_delete ON applications;
+CREATE TRIGGER trg_applications_stats_delete
+AFTER DELETE ON applications
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION apply_application_stats();
@@ -52,6 +52,15 @@ function initContent() {
 const ReservationForm = document.getElementById('Reservation-form');
 const ReservationMsg = document.getElementById('Reservation-message');
 
+// One key per filled-in form: a second press of submit or a retry after a
+// dropped response reuses it, and the server answers with the first
+// application instead of creating another one.
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+let ReservationIdempotencyKey = newIdempotencyKey();
+
 if (ReservationForm) {
     ReservationForm.addEventListener('submit', async function (e) {
         e.preventDefault();
@@ -110,18 +119,22 @@ if (ReservationForm) {
         try {
             const res = await fetch(`${API_BASE}/api/enroll`, {
                 method: "POST",
-                headers: { "Content-Type": "application/json" },
+                headers: { "Content-Type": "application/json", "Idempotency-Key": ReservationIdempotencyKey },
                 body: JSON.stringify(reservation),
             });
 
             const payload = await res.json();
 
             if (!res.ok || !payload.ok) {
+                // 422: the form changed after an earlier submit went through; the
+                // next press is a new application.
+                if (res.status === 422) ReservationIdempotencyKey = newIdempotencyKey();
                 throw new Error(payload.error || "Submit failed");
             }
 
             alert(`Submitted! Application ID: ${payload.application_id}`);
             e.target.reset();
+            ReservationIdempotencyKey = newIdempotencyKey();
             if (ReservationMsg) ReservationMsg.textContent = "Reservation submitted successfully.";
         } catch (err) {
             alert("Error: " + err.message);
@@ -0,0 +1,35 @@
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Importing app opens (and migrates) the configured database, so point it at a
+# throwaway one before any test module does; the developer's data/ is never
+# touched. Set here rather than setdefault so backend/.env cannot override it.
+_TEST_DATA_DIR = Path(tempfile.mkdtemp(prefix="enrollment-tests-"))
+os.environ["DATABASE_URL"] = f"sqlite:///{_TEST_DATA_DIR / 'app.db'}"
+os.environ["DB_AUTO_MIGRATE"] = "true"
+os.environ["RATE_LIMIT_STORE"] = "memory"
+
+from db import ConnectionPool  # noqa: E402
+from migrations import migrate  # noqa: E402
+
+
+@pytest.fixture
+def db_conn(tmp_path):
+    # A migrated SQLite database of its own for each test.
+    pool = ConnectionPool(tmp_path / "test.db", size=1, timeout=5, busy_timeout=5)
+    with pool.connection() as conn:
+        migrate(pool, conn)
+        yield conn
+    pool.close_all()
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_TEST_DATA_DIR, ignore_errors=True)
@@ -0,0 +1,45 @@
+import sqlite3
+
+import pytest
+
+from db import ConnectionPool, set_slow_query_hook
+
+
+@pytest.fixture
+def statements():
+    seen = []
+    set_slow_query_hook(lambda conn, sql, params, seconds: seen.append(sql), 0.0)
+    yield seen
+    set_slow_query_hook(None)
+
+
+def test_health_check_skips_recent_connections_and_stays_untimed(tmp_path, statements):
+    pool = ConnectionPool(tmp_path / "pool.db", size=1, timeout=5, busy_timeout=5, health_check_idle=60)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+    assert second is first
+
+    pool.health_check_idle = 0
+    with pool.connection() as third:
+        pass
+    assert third is first
+    assert "SELECT 1" not in statements
+    pool.close_all()
+
+
+def test_failed_reconnect_releases_the_slot(tmp_path, monkeypatch):
+    pool = ConnectionPool(tmp_path / "pool.db", size=1, timeout=5, busy_timeout=5, health_check_idle=0)
+    with pool.connection() as conn:
+        pass
+    conn.close()
+
+    def refuse():
+        raise sqlite3.OperationalError("unable to open database file")
+
+    monkeypatch.setattr(pool, "_connect", refuse)
+    with pytest.raises(sqlite3.OperationalError):
+        with pool.connection():
+            pass
+    assert pool.stats()["open"] == 0
@@ -0,0 +1,27 @@
+import pytest
+
+import db
+from db import ConnectionPool, init_db
+from migrations import SchemaBehindError, current_version, latest_version
+
+
+@pytest.fixture
+def empty_pool(tmp_path, monkeypatch):
+    pool = ConnectionPool(tmp_path / "empty.db", size=1, timeout=5, busy_timeout=5)
+    monkeypatch.setattr(db, "_pool", pool)
+    yield pool
+    pool.close_all()
+
+
+def test_startup_refuses_a_schema_that_is_behind(empty_pool):
+    with pytest.raises(SchemaBehindError, match="flask migrate"):
+        init_db()
+    with empty_pool.connection() as conn:
+        assert current_version(conn, "sqlite") == 0
+
+
+def test_startup_migrates_only_when_asked(empty_pool):
+    assert init_db(auto_migrate=True)
+    assert init_db() == []
+    with empty_pool.connection() as conn:
+        assert current_version(conn, "sqlite") == latest_version("sqlite")
@@ -0,0 +1,30 @@
+from app import _client_identifier, app
+from rate_limit import MemoryStore, RateLimiter
+
+
+def test_spoofed_forwarded_for_does_not_reset_the_count():
+    limiter = RateLimiter(MemoryStore(max_keys=100), "enroll", limit=3, window=60)
+    allowed = []
+    for attempt in range(6):
+        with app.test_request_context(
+            "/api/enroll",
+            method="POST",
+            environ_base={"REMOTE_ADDR": "203.0.113.7"},
+            headers={"X-Forwarded-For": f"198.51.100.{attempt}"},
+        ):
+            assert _client_identifier() == "203.0.113.7"
+            allowed.append(limiter.consume(_client_identifier()))
+
+    assert allowed == [True, True, True, False, False, False]
+
+
+def test_forwarded_for_without_trusted_proxies_logs_a_warning(monkeypatch, caplog):
+    import app as app_module
+
+    monkeypatch.setattr(app_module, "_untrusted_forwarding_warned", False)
+    with app.test_request_context("/api/enroll", headers={"X-Forwarded-For": "198.51.100.1"}):
+        _client_identifier()
+        _client_identifier()
+
+    warnings = [record for record in caplog.records if "TRUSTED_PROXY_COUNT" in record.getMessage()]
+    assert len(warnings) == 1
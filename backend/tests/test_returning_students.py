@@ -0,0 +1,54 @@
+import pytest
+
+import app as app_module
+from db import get_conn
+
+
+def _payload(given_name: str, contact: str) -> dict:
+    return {
+        "lrn": "600000000001",
+        "surname": "Reyes",
+        "givenName": given_name,
+        "contactNo": contact,
+        "yearLevel": "Grade 11",
+        "track": "Academic Track",
+        "academicStrand": "STEM",
+        "generalAverage": "90",
+    }
+
+
+def _student(lrn: str):
+    with get_conn() as conn:
+        return conn.execute("SELECT id, fullName, contact FROM students WHERE lrn = ?", (lrn,)).fetchone()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app_module, "ENROLL_RETURNING_STUDENTS", True)
+    client = app_module.app.test_client()
+    with client.session_transaction() as session:
+        session["admin_logged_in"] = True
+    return client
+
+
+def test_returning_student_keeps_stored_details_until_applied(client):
+    assert client.post("/api/enroll", json=_payload("Ana", "09171234567")).status_code == 200
+    stored = _student("600000000001")
+
+    response = client.post("/api/enroll", json=_payload("Anna", "09991234567"))
+    assert response.status_code == 200, response.get_json()
+    assert tuple(_student("600000000001")) == tuple(stored)
+
+    with get_conn() as conn:
+        app_id = conn.execute(
+            "SELECT MAX(id) AS id FROM applications WHERE student_id = ?", (stored["id"],)
+        ).fetchone()["id"]
+    item = client.get(f"/api/applications/{app_id}").get_json()["item"]
+    assert item["fullName"] == stored["fullName"]
+    assert item["submitted_student"]["fullName"] == "Reyes Anna"
+
+    assert client.post(f"/api/applications/{app_id}/apply-submitted-student").status_code == 200
+    updated = _student("600000000001")
+    assert updated["id"] == stored["id"]
+    assert (updated["fullName"], updated["contact"]) == ("Reyes Anna", "09991234567")
+    assert client.post(f"/api/applications/{app_id}/apply-submitted-student").status_code == 409
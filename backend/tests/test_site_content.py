@@ -0,0 +1,37 @@
+import json
+
+from app import DEFAULT_SITE_CONTENT, _load_site_content
+
+DEFAULT_IMAGE = DEFAULT_SITE_CONTENT["hero_slides"][0]["image"]
+
+
+def _store_slides(conn, slides: list) -> None:
+    conn.execute(
+        "INSERT INTO site_content (content_key, content_value) VALUES ('hero_slides', ?)"
+        " ON CONFLICT(content_key) DO UPDATE SET content_value = excluded.content_value",
+        (json.dumps(slides),),
+    )
+
+
+def test_saved_slide_without_image_keeps_its_css_background(db_conn):
+    _store_slides(db_conn, [{"title": "Saved before slides had images"}])
+
+    slide = _load_site_content(db_conn)["hero_slides"][0]
+    assert slide["title"] == "Saved before slides had images"
+    assert "image" not in slide
+
+
+def test_default_image_applies_once_it_has_variants(db_conn):
+    _store_slides(db_conn, [{"title": "Saved"}])
+    db_conn.execute(
+        "INSERT INTO image_variants (source, format, width, url, bytes) VALUES (?, 'jpeg', 480, ?, 1000)",
+        (DEFAULT_IMAGE, "../static/variants/banner-480.jpg"),
+    )
+
+    assert _load_site_content(db_conn)["hero_slides"][0]["image"] == DEFAULT_IMAGE
+
+
+def test_saved_slide_image_is_kept(db_conn):
+    _store_slides(db_conn, [{"title": "Saved", "image": "../static/uploads/site-content/mine.jpg"}])
+
+    assert _load_site_content(db_conn)["hero_slides"][0]["image"] == "../static/uploads/site-content/mine.jpg"
@@ -0,0 +1,42 @@
+import pytest
+
+from app import APPLICATION_SORT_COLUMNS
+
+
+def _student(conn, lrn: str, name: str) -> int:
+    return conn.execute(
+        "INSERT INTO students (lrn, fullName, created_at) VALUES (?, ?, '2026-01-01 00:00:00')", (lrn, name)
+    ).lastrowid
+
+
+def _sort_keys(conn, application_id: int) -> tuple:
+    return tuple(conn.execute(
+        "SELECT student_name, student_lrn FROM applications WHERE id = ?", (application_id,)
+    ).fetchone())
+
+
+def test_sort_keys_follow_student_changes(db_conn):
+    first = _student(db_conn, "100000000001", "Dela Cruz Juan")
+    second = _student(db_conn, "100000000002", "Santos Maria")
+    application_id = db_conn.execute(
+        "INSERT INTO applications (student_id, gradeLevel, student_name, student_lrn) "
+        "VALUES (?, 'Grade 11', 'Dela Cruz Juan', '100000000001')",
+        (first,),
+    ).lastrowid
+
+    db_conn.execute("UPDATE students SET fullName = 'Dela Cruz Juan Jr.' WHERE id = ?", (first,))
+    assert _sort_keys(db_conn, application_id) == ("Dela Cruz Juan Jr.", "100000000001")
+
+    db_conn.execute("UPDATE applications SET student_id = ? WHERE id = ?", (second, application_id))
+    assert _sort_keys(db_conn, application_id) == ("Santos Maria", "100000000002")
+
+
+@pytest.mark.parametrize("sort_key", ["fullName", "lrn"])
+def test_student_sorts_walk_an_index(db_conn, sort_key):
+    column = APPLICATION_SORT_COLUMNS[sort_key]
+    plan = " ".join(row[3] for row in db_conn.execute(
+        f"EXPLAIN QUERY PLAN SELECT a.id, s.fullName FROM applications a JOIN students s ON s.id = a.student_id "
+        f"WHERE a.status = ? AND ({column}, a.id) > (?, ?) ORDER BY {column}, a.id LIMIT 51",
+        ("submitted", "", 0),
+    ))
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,18 @@
+import app as app_module
+from assets import DIST_DIRNAME
+
+
+def test_only_hashed_bundle_names_are_immutable(tmp_path, monkeypatch):
+    (tmp_path / "app.0123456789ab.js").write_text("console.log(1);")
+    (tmp_path / "manifest.json").write_text('{"app.js": "app.0123456789ab.js"}')
+    monkeypatch.setattr(app_module, "STATIC_DIST_DIR", tmp_path)
+    client = app_module.app.test_client()
+
+    bundle = client.get(f"/static/{DIST_DIRNAME}/app.0123456789ab.js")
+    assert bundle.cache_control.immutable
+    assert bundle.cache_control.max_age == app_module.STATIC_IMMUTABLE_MAX_AGE_SECONDS
+
+    manifest = client.get(f"/static/{DIST_DIRNAME}/manifest.json")
+    assert manifest.status_code == 200
+    assert not manifest.cache_control.immutable
+    assert manifest.cache_control.no_cache
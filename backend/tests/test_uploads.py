@@ -0,0 +1,64 @@
+import os
+import time
+
+from uploads import UPLOAD_URL_PREFIX, UploadSpool, sweep_orphan_uploads
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+DAY = 24 * 3600
+
+
+def _upload(upload_dir, data: bytes) -> str:
+    spool = UploadSpool(upload_dir, max_bytes=1024 * 1024)
+    spool.write(data)
+    return spool.commit(".png")
+
+
+def _age(path, seconds: float) -> None:
+    old = time.time() - seconds
+    os.utime(path, (old, old))
+
+
+def test_reupload_of_old_orphan_survives_sweep(db_conn, tmp_path):
+    upload_dir = tmp_path / "uploads"
+    file_name = _upload(upload_dir, PNG)
+    _age(upload_dir / file_name, 2 * DAY)
+
+    # Same bytes again: deduplicated onto the old file, which must now count as new.
+    assert _upload(upload_dir, PNG) == file_name
+    removed = sweep_orphan_uploads(db_conn, upload_dir, grace_seconds=DAY)
+
+    assert removed == []
+    assert (upload_dir / file_name).exists()
+
+
+def test_sweep_removes_orphan_variants(db_conn, tmp_path):
+    upload_dir = tmp_path / "uploads"
+    variant_dir = tmp_path / "variants"
+    variant_dir.mkdir()
+    orphan = _upload(upload_dir, PNG)
+    kept = _upload(upload_dir, PNG + b"kept")
+    for path in upload_dir.iterdir():
+        _age(path, 2 * DAY)
+    db_conn.execute(
+        "INSERT INTO site_content (content_key, content_value) VALUES ('hero', ?)",
+        (f'{{"image": "{UPLOAD_URL_PREFIX}{kept}"}}',),
+    )
+    variants = {
+        f"{UPLOAD_URL_PREFIX}{orphan}": ["orphan-480.webp", "shared-480.webp"],
+        f"{UPLOAD_URL_PREFIX}{kept}": ["kept-480.webp", "shared-480.webp"],
+    }
+    for source, names in variants.items():
+        for width, name in enumerate(names, start=1):
+            (variant_dir / name).write_bytes(b"x")
+            db_conn.execute(
+                "INSERT INTO image_variants (source, format, width, url, bytes) VALUES (?, 'webp', ?, ?, 1)",
+                (source, width, f"../static/variants/{name}"),
+            )
+    db_conn.commit()
+
+    removed = sweep_orphan_uploads(db_conn, upload_dir, grace_seconds=DAY, variant_dir=variant_dir)
+
+    assert removed == [orphan]
+    sources = {row["source"] for row in db_conn.execute("SELECT source FROM image_variants")}
+    assert sources == {f"{UPLOAD_URL_PREFIX}{kept}"}
+    assert sorted(path.name for path in variant_dir.iterdir()) == ["kept-480.webp", "shared-480.webp"]
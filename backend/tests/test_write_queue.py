@@ -0,0 +1,52 @@
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from write_queue import GroupCommitWriter
+
+
+class SlowWriter:
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.started = threading.Event()
+        self.written = []
+
+    def __call__(self, items: list) -> list:
+        self.started.set()
+        time.sleep(self.delay)
+        self.written.extend(items)
+        return [f"id-{item}" for item in items]
+
+
+def test_timed_out_write_in_progress_reports_its_outcome():
+    write = SlowWriter(delay=0.3)
+    writer = GroupCommitWriter(write, max_batch=1, max_delay=0, timeout=0.2)
+
+    assert writer.submit("a") == "id-a"
+    assert write.written == ["a"]
+
+
+def test_stuck_write_in_progress_still_times_out():
+    write = SlowWriter(delay=1.0)
+    writer = GroupCommitWriter(write, max_batch=1, max_delay=0, timeout=0.1)
+
+    started = time.monotonic()
+    with pytest.raises(FutureTimeoutError):
+        writer.submit("a")
+    assert time.monotonic() - started < 0.5
+
+
+def test_timed_out_queued_write_is_withdrawn():
+    write = SlowWriter(delay=0.3)
+    writer = GroupCommitWriter(write, max_batch=1, max_delay=0, timeout=0.2)
+    first = threading.Thread(target=writer.submit, args=("a",))
+    first.start()
+    assert write.started.wait(1)
+
+    with pytest.raises(FutureTimeoutError):
+        writer.submit("b")
+    first.join()
+    time.sleep(0.1)
+    assert write.written == ["a"]
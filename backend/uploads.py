@@ -0,0 +1,209 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from werkzeug.exceptions import RequestEntityTooLarge
+
+UPLOAD_CHUNK_BYTES = 64 * 1024
+UPLOAD_URL_PREFIX = "../static/uploads/site-content/"
+
+# Different spellings of one format would defeat deduplication.
+_CANONICAL_EXTENSIONS = {".jpeg": ".jpg"}
+_REFERENCE_PATTERN = re.compile(r"uploads/site-content/([A-Za-z0-9._-]+)")
+
+# Leading bytes of each accepted format; the browser-supplied name and
+# Content-Type are not trusted.
+_SNIFF_BYTES = 16
+_IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+
+
+class UploadTooLarge(RequestEntityTooLarge):
+    pass
+
+
+def canonical_extension(extension: str) -> str:
+    extension = extension.lower()
+    return _CANONICAL_EXTENSIONS.get(extension, extension)
+
+
+def content_addressed_name(digest: str, extension: str) -> str:
+    return f"{digest}{canonical_extension(extension)}"
+
+
+def sniff_image_extension(head: bytes) -> Optional[str]:
+    for signature, extension in _IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+class UploadSpool:
+    # File object handed to Werkzeug's multipart parser as the container for a
+    # file part. Chunks go straight to a temp file beside their final location
+    # and are hashed and counted on the way, so memory use does not depend on
+    # the upload size and an oversized body is cut off while it streams in.
+    def __init__(self, upload_dir: Path, max_bytes: int) -> None:
+        upload_dir.mkdir(parents=True, exist_ok=True)
+        self.upload_dir = upload_dir
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.head = b""
+        self._digest = hashlib.sha256()
+        self._file = tempfile.NamedTemporaryFile(dir=upload_dir, prefix=".upload-", delete=False)
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.discard()
+            raise UploadTooLarge(f"Uploads are limited to {self.max_bytes} bytes.")
+        if len(self.head) < _SNIFF_BYTES:
+            self.head = (self.head + data[:_SNIFF_BYTES])[:_SNIFF_BYTES]
+        self._digest.update(data)
+        return self._file.write(data)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._file.seek(offset, whence)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def commit(self, extension: str) -> str:
+        # Rename into place under the content hash, or drop the copy when the
+        # same bytes are already stored. os.replace keeps readers from ever
+        # seeing a partially written file.
+        self._file.close()
+        file_name = content_addressed_name(self._digest.hexdigest(), extension)
+        target = self.upload_dir / file_name
+        if target.exists():
+            os.unlink(self._file.name)
+            # The existing file may be an old orphan; touching it restarts the
+            # sweep's grace period so it survives until the section is saved.
+            os.utime(target)
+        else:
+            os.replace(self._file.name, target)
+        return file_name
+
+    def discard(self) -> None:
+        self._file.close()
+        try:
+            os.unlink(self._file.name)
+        except FileNotFoundError:
+            pass
+
+
+def referenced_upload_names(conn) -> set:
+    names = set()
+    for row in conn.execute("SELECT content_value FROM site_content"):
+        names.update(_REFERENCE_PATTERN.findall(row["content_value"] or ""))
+    return names
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        while True:
+            chunk = handle.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dedupe_uploads(conn, upload_dir: Path, dry_run: bool = False) -> dict:
+    # Moves legacy "{prefix}-{uuid}.ext" files to their content-addressed name
+    # and rewrites site_content references, so byte-identical copies collapse
+    # into one file. The old names are left for sweep_orphan_uploads.
+    renames = {}
+    if not upload_dir.exists():
+        return renames
+    for path in sorted(upload_dir.iterdir()):
+        if not path.is_file() or path.name.startswith("."):
+            continue
+        file_name = content_addressed_name(_file_digest(path), path.suffix)
+        if file_name == path.name:
+            continue
+        renames[path.name] = file_name
+        target = upload_dir / file_name
+        if not dry_run and not target.exists():
+            try:
+                os.link(path, target)
+            except OSError:
+                shutil.copy2(path, target)
+
+    if dry_run or not renames:
+        return renames
+
+    updated_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    rows = conn.execute("SELECT content_key, content_value FROM site_content").fetchall()
+    for row in rows:
+        value = row["content_value"] or ""
+        updated = _REFERENCE_PATTERN.sub(lambda match: f"uploads/site-content/{renames.get(match.group(1), match.group(1))}", value)
+        if updated != value:
+            conn.execute(
+                "UPDATE site_content SET content_value = ?, updated_at = ? WHERE content_key = ?",
+                (updated, updated_at, row["content_key"]),
+            )
+    conn.commit()
+    return renames
+
+
+def _remove_variants(conn, source: str, variant_dir: Path) -> None:
+    # Drops the image_variants rows of a deleted upload and every variant file
+    # no other source still points at (identical bytes share variant files).
+    urls = [row["url"] for row in conn.execute("SELECT url FROM image_variants WHERE source = ?", (source,)).fetchall()]
+    conn.execute("DELETE FROM image_variants WHERE source = ?", (source,))
+    for url in urls:
+        if conn.execute("SELECT 1 FROM image_variants WHERE url = ? LIMIT 1", (url,)).fetchone():
+            continue
+        try:
+            (variant_dir / url.rsplit("/", 1)[-1]).unlink()
+        except FileNotFoundError:
+            pass
+
+
+def sweep_orphan_uploads(
+    conn, upload_dir: Path, grace_seconds: float, dry_run: bool = False, variant_dir: Optional[Path] = None
+) -> list:
+    # Files younger than the grace period are kept: an admin may have uploaded
+    # an image and not saved the section that refers to it yet. With
+    # variant_dir, the resized copies of each removed upload go too.
+    if not upload_dir.exists():
+        return []
+    referenced = referenced_upload_names(conn)
+    cutoff = time.time() - grace_seconds
+    removed = []
+    for path in sorted(upload_dir.iterdir()):
+        if not path.is_file() or path.name in referenced:
+            continue
+        if path.stat().st_mtime > cutoff:
+            continue
+        removed.append(path.name)
+        if not dry_run:
+            path.unlink()
+            if variant_dir is not None:
+                _remove_variants(conn, f"{UPLOAD_URL_PREFIX}{path.name}", variant_dir)
+    if removed and not dry_run:
+        conn.commit()
+    return removed
@@ -0,0 +1,95 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable
+
+
+class GroupCommitWriter:
+    # Funnels writes from many request threads through one writer thread that
+    # commits them in batches. `write_batch(items)` must persist every item in a
+    # single transaction and return one result per item, in order.
+    def __init__(self, write_batch: Callable, max_batch: int, max_delay: float, timeout: float) -> None:
+        self.write_batch = write_batch
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max(0.0, max_delay)
+        self.timeout = timeout
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stats = {"batches": 0, "items": 0, "largest_batch": 0, "fallbacks": 0}
+
+    def submit(self, item):
+        future: Future = Future()
+        self._ensure_thread()
+        self._queue.put((item, future))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # Still queued: withdraw it, so a retry cannot write it twice. Once
+            # the writer has picked it up it may well commit, so give it one
+            # more timeout to report what actually happened; a batch stuck
+            # longer than that (say, on a locked database) times the caller
+            # out rather than holding its thread forever.
+            if future.cancel():
+                raise
+            return future.result(timeout=self.timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+    def _ensure_thread(self) -> None:
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            # A forked worker inherits the object but not the thread.
+            if self._pid != pid:
+                self._queue = queue.Queue()
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch: list) -> None:
+        try:
+            results = self.write_batch([item for item, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # One bad item must not fail everyone it was batched with: retry
+            # each on its own so only the offending request sees the error.
+            with self._lock:
+                self._stats["fallbacks"] += 1
+            for entry in batch:
+                self._flush([entry])
+            return
+
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["items"] += len(batch)
+            self._stats["largest_batch"] = max(self._stats["largest_batch"], len(batch))
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)